@@ -0,0 +1,231 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+
+from compression import BEST, ENCODINGS, FILE_SUFFIXES, compress
+from config import get_settings
+from constants import DETAIL_ZOOM
+from db.database import AsyncSessionLocal, engine
+from db.repository import MapDataRepository
+from models import NetworkResponse
+from network_binary import encode_network
+
+logger = logging.getLogger(__name__)
+
+PACK_FORMATS = ("json", "binary")
+STORED_ENCODINGS = (*ENCODINGS, None)
+_SUFFIXES = {"json": ".json", "binary": ".bin"}
+
+
+@dataclass(frozen=True)
+class City:
+    id: str
+    name: str
+    south: float
+    west: float
+    north: float
+    east: float
+
+    @property
+    def bbox(self) -> tuple[float, float, float, float]:
+        return self.south, self.west, self.north, self.east
+
+    def overlaps(self, extent: tuple[float, float, float, float]) -> bool:
+        min_lat, min_lng, max_lat, max_lng = extent
+        return (
+            min_lat <= self.north
+            and max_lat >= self.south
+            and min_lng <= self.east
+            and max_lng >= self.west
+        )
+
+
+def load_cities(path: str | Path) -> dict[str, City]:
+    entries = json.loads((Path(__file__).parent / path).read_text())
+    return {
+        entry["id"]: City(entry["id"], entry["name"], **entry["bounds"]) for entry in entries
+    }
+
+
+CITIES = load_cities(get_settings().cities_file)
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:24]
+
+
+class CityPacks:
+    def __init__(self, repository: MapDataRepository, directory: str | Path, sql_json: bool = True):
+        self.repository = repository
+        self.directory = Path(directory)
+        self.sql_json = sql_json
+        self.meta: dict[str, dict] = {}
+        for city_id in CITIES:
+            try:
+                meta = json.loads(self._meta_path(city_id).read_text())
+            except (FileNotFoundError, ValueError):
+                continue
+            if "build" in meta:
+                self.meta[city_id] = meta
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._pending = False
+
+    def _meta_path(self, city_id: str) -> Path:
+        return self.directory / f"{city_id}.meta.json"
+
+    def _build_dir(self, city_id: str, build: str) -> Path:
+        return self.directory / city_id / build
+
+    def _path(self, city_id: str, build: str, pack_format: str, encoding: str | None) -> Path:
+        name = f"{city_id}{_SUFFIXES[pack_format]}{FILE_SUFFIXES.get(encoding, '')}"
+        return self._build_dir(city_id, build) / name
+
+    def built(self, city_id: str) -> bool:
+        return city_id in self.meta
+
+    def pack(
+        self, city_id: str, pack_format: str, encoding: str | None
+    ) -> tuple[Path, str] | None:
+        meta = self.meta.get(city_id)
+        if meta is None:
+            return None
+        path = self._path(city_id, meta["build"], pack_format, encoding)
+        if not path.exists():
+            return None
+        return path, f'"{meta["hashes"][pack_format]}-{encoding or "identity"}"'
+
+    def _paths(self, city_id: str, build: str) -> list[Path]:
+        return [self._path(city_id, build, f, e) for f in PACK_FORMATS for e in STORED_ENCODINGS]
+
+    def _remove_old_builds(self, city_id: str, keep: set[str]) -> None:
+        for child in (self.directory / city_id).iterdir():
+            if child.is_dir() and child.name not in keep:
+                shutil.rmtree(child, ignore_errors=True)
+
+    async def _network_json(self, city: City) -> bytes:
+        if self.sql_json:
+            return await self.repository.fetch_network_json(*city.bbox, DETAIL_ZOOM)
+        network = await self.repository.fetch_network(*city.bbox, DETAIL_ZOOM)
+        return network.model_dump_json().encode()
+
+    async def _write_build(self, city_id: str, build: str, packs: dict[str, bytes]) -> list[str]:
+        self._build_dir(city_id, build).mkdir(parents=True, exist_ok=True)
+        sizes = []
+        for pack_format, data in packs.items():
+            for encoding in STORED_ENCODINGS:
+                body = data
+                if encoding is not None:
+                    body = await asyncio.to_thread(compress, data, encoding, BEST)
+                path = self._path(city_id, build, pack_format, encoding)
+                await asyncio.to_thread(_write_atomic, path, body)
+                sizes.append(f"{pack_format}/{encoding or 'identity'} {len(body)}")
+        return sizes
+
+    async def build(self, city: City, version: int) -> None:
+        content = await self._network_json(city)
+        network = await asyncio.to_thread(NetworkResponse.model_validate_json, content)
+        packs = {"json": content, "binary": await asyncio.to_thread(encode_network, network)}
+        hashes = {f: _content_hash(data) for f, data in packs.items()}
+        build = f"v{version}-{hashes['json'][:12]}"
+        sizes = await self._write_build(city.id, build, packs)
+
+        previous = self.meta.get(city.id)
+        self._store_meta(city.id, {"build": build, "version": version, "hashes": hashes})
+        keep = {build} | ({previous["build"]} if previous else set())
+        await asyncio.to_thread(self._remove_old_builds, city.id, keep)
+        logger.info(
+            f"Built city pack {city.id} at dataset version {version} (bytes: {', '.join(sizes)})"
+        )
+
+    def _store_meta(self, city_id: str, meta: dict) -> None:
+        _write_atomic(self._meta_path(city_id), json.dumps(meta).encode())
+        self.meta[city_id] = meta
+
+    async def refresh(self, city: City) -> None:
+        meta = self.meta.get(city.id)
+        if meta and not all(path.exists() for path in self._paths(city.id, meta["build"])):
+            meta = None
+        since = meta["version"] if meta else None
+        latest, extents = await self.repository.fetch_dataset_changes(since)
+        if meta and latest == since:
+            return
+        if meta and extents is not None and not any(city.overlaps(e) for e in extents):
+            self._store_meta(city.id, {**meta, "version": latest})
+            return
+        await self.build(city, latest)
+
+    async def refresh_all(self) -> None:
+        async with self._lock:
+            for city in CITIES.values():
+                try:
+                    await self.refresh(city)
+                except Exception:
+                    logger.exception(f"Failed to build city pack {city.id}")
+
+    def schedule_refresh(self, *_) -> None:
+        if self._task is not None and not self._task.done():
+            self._pending = True
+            return
+
+        async def run() -> None:
+            self._pending = True
+            while self._pending:
+                self._pending = False
+                await self.refresh_all()
+
+        self._task = asyncio.create_task(run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+async def build_packs(directory: Path, city_ids: list[str]) -> None:
+    settings = get_settings()
+    packs = CityPacks(MapDataRepository(AsyncSessionLocal), directory, settings.network_sql_json)
+    try:
+        latest, _ = await packs.repository.fetch_dataset_changes(None)
+        for city_id in city_ids:
+            await packs.build(CITIES[city_id], latest)
+    finally:
+        await engine.dispose()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Build city packs for /cities.")
+    parser.add_argument(
+        "cities", nargs="*", help=f"Cities to build: {', '.join(CITIES)} (default: all)"
+    )
+    parser.add_argument(
+        "--dir",
+        type=Path,
+        default=get_settings().city_packs_dir,
+        help="Output directory (default: CITY_PACKS_DIR)",
+    )
+    args = parser.parse_args(argv)
+    unknown = sorted(set(args.cities) - set(CITIES))
+    if unknown:
+        parser.error(f"unknown cities: {', '.join(unknown)}")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    asyncio.run(build_packs(args.dir, args.cities or list(CITIES)))
+
+
+if __name__ == "__main__":
+    main()
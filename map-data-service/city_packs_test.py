@@ -0,0 +1,94 @@
+import asyncio
+import json
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+import main
+from city_packs import CITIES, STORED_ENCODINGS, CityPacks, load_cities
+from compression import decompress
+
+NETWORK = b'{"nodes":[],"links":[],"buildings":[],"transport_routes":[]}'
+CORK = CITIES["cork"]
+
+
+class FakeRepository:
+    def __init__(self, latest: int = 1, extents=None):
+        self.latest = latest
+        self.extents = extents
+        self.builds = 0
+
+    async def fetch_network_json(self, *args) -> bytes:
+        self.builds += 1
+        return NETWORK
+
+    async def fetch_dataset_changes(self, since):
+        return self.latest, self.extents
+
+
+def built_packs(tmp_path: Path, repository: FakeRepository | None = None) -> CityPacks:
+    packs = CityPacks(repository or FakeRepository(), tmp_path)
+    asyncio.run(packs.build(CORK, 1))
+    return packs
+
+
+def test_cities_are_read_from_the_frontend_list(tmp_path):
+    entries = [{"id": "x", "name": "X", "bounds": dict(south=1, west=2, north=3, east=4)}]
+    (tmp_path / "cities.json").write_text(json.dumps(entries))
+
+    cities = load_cities(tmp_path / "cities.json")
+
+    assert cities["x"].bbox == (1, 2, 3, 4)
+    assert set(CITIES) == {"cork", "dublin"}
+
+
+def test_build_stores_every_encoding_and_identity(tmp_path):
+    packs = built_packs(tmp_path)
+
+    for encoding in STORED_ENCODINGS:
+        path, etag = packs.pack("cork", "json", encoding)
+        body = path.read_bytes()
+        assert (decompress(body, encoding) if encoding else body) == NETWORK
+        assert etag.endswith(f'-{encoding or "identity"}"')
+
+
+def test_pack_is_none_until_built_or_when_its_file_is_gone(tmp_path):
+    packs = CityPacks(FakeRepository(), tmp_path)
+    assert packs.pack("cork", "json", None) is None
+
+    packs = built_packs(tmp_path)
+    path, _ = packs.pack("cork", "binary", "br")
+    path.unlink()
+
+    assert packs.pack("cork", "binary", "br") is None
+    assert packs.pack("cork", "binary", None) is not None
+
+
+def test_refresh_skips_changes_outside_the_city(tmp_path):
+    repository = FakeRepository(latest=2, extents=[(53.3, -6.3, 53.4, -6.2)])
+    packs = built_packs(tmp_path, repository)
+
+    asyncio.run(packs.refresh(CORK))
+    assert repository.builds == 1 and packs.meta["cork"]["version"] == 2
+
+    repository.latest, repository.extents = 3, [(51.9, -8.5, 51.91, -8.4)]
+    asyncio.run(packs.refresh(CORK))
+    assert repository.builds == 2 and packs.meta["cork"]["version"] == 3
+
+
+def test_city_network_serves_identity_from_disk(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "city_packs", built_packs(tmp_path))
+    client = TestClient(main.app)
+
+    response = client.get("/cities/cork/network", headers={"Accept-Encoding": "identity"})
+
+    assert response.status_code == 200 and response.content == NETWORK
+    assert "Content-Encoding" not in response.headers
+
+
+def test_city_network_is_unavailable_until_built(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "city_packs", CityPacks(FakeRepository(), tmp_path))
+    client = TestClient(main.app)
+
+    assert client.get("/cities/cork/network").status_code == 503
+    assert client.get("/cities/nowhere/network").status_code == 404
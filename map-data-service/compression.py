@@ -0,0 +1,117 @@
+import gzip
+import zlib
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Callable, Hashable
+
+import brotli
+import zstandard
+
+ENCODINGS = ("zstd", "br", "gzip")
+FILE_SUFFIXES = {"zstd": ".zst", "br": ".br", "gzip": ".gz"}
+
+MIN_COMPRESS_SIZE = 1024
+
+FAST = {"zstd": 3, "br": 4, "gzip": 6}
+BEST = {"zstd": 19, "br": 11, "gzip": 9}
+
+
+def negotiate(accept_encoding: str | None) -> str | None:
+    if not accept_encoding:
+        return None
+    weights: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name.strip().lower()] = q
+    wildcard = weights.get("*", 0.0)
+    candidates = [
+        (weights.get(encoding, wildcard), -rank, encoding)
+        for rank, encoding in enumerate(ENCODINGS)
+    ]
+    q, _, encoding = max(candidates)
+    return encoding if q > 0 else None
+
+
+def compress(data: bytes, encoding: str, levels: dict[str, int] = FAST) -> bytes:
+    level = levels[encoding]
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    if encoding == "br":
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def decompress(data: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    if encoding == "br":
+        return brotli.decompress(data)
+    return gzip.decompress(data)
+
+
+def _stream_compressor(encoding: str) -> tuple[Callable, Callable, Callable]:
+    level = FAST[encoding]
+    if encoding == "zstd":
+        compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        return (
+            compressor.compress,
+            lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK),
+            compressor.flush,
+        )
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=level)
+        return compressor.process, compressor.flush, compressor.finish
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+
+async def compress_stream(
+    chunks: AsyncIterator[bytes], encoding: str
+) -> AsyncIterator[bytes]:
+    process, flush, finish = _stream_compressor(encoding)
+    async for chunk in chunks:
+        data = process(chunk) + flush()
+        if data:
+            yield data
+    yield finish()
+
+
+def encode_body(data: bytes, encoding: str | None) -> tuple[bytes, str | None]:
+    if encoding is None or len(data) < MIN_COMPRESS_SIZE:
+        return data, None
+    return compress(data, encoding), encoding
+
+
+class CompressedCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[Hashable, tuple[bytes, str | None]] = OrderedDict()
+
+    def get(self, key: Hashable) -> tuple[bytes, str | None] | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: Hashable, entry: tuple[bytes, str | None]) -> None:
+        if len(entry[0]) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous[0])
+        self._entries[key] = entry
+        self.size += len(entry[0])
+        while self.size > self.max_bytes:
+            _, (body, _) = self._entries.popitem(last=False)
+            self.size -= len(body)
+
+    def __len__(self) -> int:
+        return len(self._entries)
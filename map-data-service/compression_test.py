@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from compression import (
+    MIN_COMPRESS_SIZE,
+    CompressedCache,
+    compress,
+    compress_stream,
+    decompress,
+    encode_body,
+    negotiate,
+)
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, None),
+        ("", None),
+        ("identity", None),
+        ("gzip", "gzip"),
+        ("gzip, deflate, br", "br"),
+        ("gzip, br, zstd", "zstd"),
+        ("GZIP", "gzip"),
+        ("br;q=0.5, gzip", "gzip"),
+        ("br; q=0.9, gzip;q=0.8", "br"),
+        ("*", "zstd"),
+        ("*;q=0.5, gzip", "gzip"),
+        ("*, zstd;q=0", "br"),
+        ("gzip;q=0", None),
+        ("gzip;q=abc", None),
+    ],
+)
+def test_negotiate(header, expected):
+    assert negotiate(header) == expected
+
+
+@pytest.mark.parametrize("encoding", ["zstd", "br", "gzip"])
+def test_compress_round_trip(encoding):
+    data = b"network " * 1000
+
+    assert decompress(compress(data, encoding), encoding) == data
+
+
+def test_gzip_is_deterministic():
+    data = b"network " * 1000
+
+    assert compress(data, "gzip") == compress(data, "gzip")
+
+
+@pytest.mark.parametrize("encoding", ["zstd", "br", "gzip"])
+def test_compress_stream_round_trip(encoding):
+    chunks = [b"first " * 100, b"", b"second " * 100]
+
+    async def body():
+        for chunk in chunks:
+            yield chunk
+
+    async def collect():
+        return [part async for part in compress_stream(body(), encoding)]
+
+    assert decompress(b"".join(asyncio.run(collect())), encoding) == b"".join(chunks)
+
+
+def test_encode_body_leaves_small_or_unnegotiated_bodies_alone():
+    small = b"x" * (MIN_COMPRESS_SIZE - 1)
+    large = b"x" * MIN_COMPRESS_SIZE
+
+    assert encode_body(small, "gzip") == (small, None)
+    assert encode_body(large, None) == (large, None)
+    body, encoding = encode_body(large, "gzip")
+    assert encoding == "gzip" and decompress(body, "gzip") == large
+
+
+def test_compressed_cache_evicts_least_recently_used_by_size():
+    cache = CompressedCache(max_bytes=10)
+    cache.put("a", (b"aaaa", "gzip"))
+    cache.put("b", (b"bbbb", "gzip"))
+    cache.get("a")
+    cache.put("c", (b"cccc", "gzip"))
+
+    assert cache.get("b") is None
+    assert cache.get("a") == (b"aaaa", "gzip")
+    assert cache.size == 8 and len(cache) == 2
+
+
+def test_compressed_cache_skips_bodies_larger_than_the_bound():
+    cache = CompressedCache(max_bytes=4)
+    cache.put("a", (b"aaaaa", None))
+
+    assert len(cache) == 0 and cache.size == 0
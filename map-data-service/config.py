@@ -4,6 +4,21 @@ from functools import lru_cache
 
 class Settings(BaseSettings):
     database_url: str
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    network_sql_json: bool = True
+    network_cache_enabled: bool = False
+    network_cache_zoom: int = 13
+    network_cache_max_tiles: int = 1024
+    network_cache_max_mb: int = 256
+    network_cache_dir: str | None = None
+    network_region: str | None = None
+    network_region_cache_mb: int = 64
+    response_cache_max_mb: int = 64
+    dataset_poll_seconds: float = 30.0
+    city_packs_enabled: bool = False
+    city_packs_dir: str = "city_packs"
+    cities_file: str = "../trafficjam-fe/src/constants/cities.json"
 
     class Config:
         env_file = ".env"
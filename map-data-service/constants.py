@@ -21,6 +21,8 @@ ROUTE_TAG_KEYS = frozenset(
 
 VALID_MEMBER_ROLES = frozenset({"", "forward", "backward"})
 
+NETWORK_LAYERS = ("nodes", "links", "buildings", "transport_routes")
+
 VALID_BUILDING_TYPES = frozenset(
     {"retail", "apartments", "supermarket", "school", "kindergarten", "parking"}
 )
@@ -53,3 +55,21 @@ ROUTE_TAG_MAPPING = {
     "to": "to",
     "colour": "colour",
 }
+
+HIGHWAY_MIN_ZOOM = {
+    "motorway": 0,
+    "motorway_link": 0,
+    "trunk": 0,
+    "trunk_link": 0,
+    "primary": 9,
+    "primary_link": 9,
+    "secondary": 11,
+    "secondary_link": 11,
+    "tertiary": 12,
+    "tertiary_link": 12,
+    "residential": 14,
+    "unclassified": 14,
+    "living_street": 14,
+}
+
+DETAIL_ZOOM = 15
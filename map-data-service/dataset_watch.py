@@ -0,0 +1,57 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+
+from db.repository import MapDataRepository
+
+logger = logging.getLogger(__name__)
+
+Extents = list[tuple[float, float, float, float]] | None
+Subscriber = Callable[[int, Extents], Awaitable[None] | None]
+
+
+class DatasetWatcher:
+    def __init__(self, repository: MapDataRepository, poll_seconds: float):
+        self.repository = repository
+        self.poll_seconds = poll_seconds
+        self.version: int | None = None
+        self._subscribers: list[Subscriber] = []
+        self._task: asyncio.Task | None = None
+
+    def subscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.append(subscriber)
+
+    async def poll(self) -> None:
+        latest, extents = await self.repository.fetch_dataset_changes(self.version)
+        if latest == self.version:
+            return
+        previous, self.version = self.version, latest
+        logger.info(f"Dataset version {previous} -> {latest}")
+        for subscriber in self._subscribers:
+            result = subscriber(latest, extents)
+            if asyncio.iscoroutine(result):
+                await result
+
+    async def _check(self) -> None:
+        try:
+            await self.poll()
+        except Exception:
+            logger.exception("Failed to check the dataset version")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            await self._check()
+
+    async def start(self, version: int | None = None) -> None:
+        self.version = version
+        await self._check()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
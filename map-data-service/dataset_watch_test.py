@@ -0,0 +1,59 @@
+import asyncio
+
+from dataset_watch import DatasetWatcher
+
+
+class Repository:
+    def __init__(self, *changes):
+        self.changes = list(changes)
+        self.calls = []
+
+    async def fetch_dataset_changes(self, since):
+        self.calls.append(since)
+        if not self.changes:
+            raise ConnectionError("database is down")
+        return self.changes.pop(0)
+
+
+def test_start_seeds_the_version_before_serving():
+    repository = Repository((5, None))
+    watcher = DatasetWatcher(repository, poll_seconds=3600)
+    notified = []
+    watcher.subscribe(lambda version, extents: notified.append((version, extents)))
+
+    async def run():
+        await watcher.start(3)
+        version = watcher.version
+        await watcher.stop()
+        return version
+
+    assert asyncio.run(run()) == 5
+    assert repository.calls == [3]
+    assert notified == [(5, None)]
+
+
+def test_start_survives_an_unreachable_database():
+    watcher = DatasetWatcher(Repository(), poll_seconds=3600)
+
+    async def run():
+        await watcher.start()
+        await watcher.stop()
+
+    asyncio.run(run())
+
+    assert watcher.version is None
+
+
+def test_poll_reports_only_new_versions():
+    extents = [(-8.48, 51.89, -8.46, 51.91)]
+    watcher = DatasetWatcher(Repository((5, extents), (5, [])), poll_seconds=3600)
+    notified = []
+
+    async def subscriber(version, changed):
+        notified.append((version, changed))
+
+    watcher.subscribe(subscriber)
+    asyncio.run(watcher.poll())
+    asyncio.run(watcher.poll())
+
+    assert notified == [(5, extents)]
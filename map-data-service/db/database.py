@@ -5,6 +5,7 @@ from sqlalchemy.ext.asyncio import (
 )
 from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
 from config import get_settings
+from db import pool_stats
 
 settings = get_settings()
 
@@ -17,11 +18,17 @@ def _build_engine(url: str):
     clean_url = urlunparse(parsed._replace(query=urlencode({k: v[0] for k, v in params.items()})))
     connect_args = {"statement_cache_size": 0, **({"ssl": True} if ssl_mode else {})}
     return create_async_engine(
-        clean_url, pool_pre_ping=True, pool_size=5, max_overflow=10, pool_recycle=300, connect_args=connect_args
+        clean_url,
+        pool_pre_ping=True,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_recycle=300,
+        connect_args=connect_args,
     )
 
 
 engine = _build_engine(settings.database_url)
+pool_stats.install(engine)
 
 AsyncSessionLocal = async_sessionmaker(
     engine,
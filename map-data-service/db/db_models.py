@@ -1,5 +1,5 @@
 from sqlalchemy import Column, BigInteger, Integer, Text
-from sqlalchemy.dialects.postgresql import JSON
+from sqlalchemy.dialects.postgresql import ARRAY, JSON
 from geoalchemy2 import Geometry
 from sqlalchemy.orm import DeclarativeBase
 
@@ -30,6 +30,8 @@ class LinkDB(Base):
     surface = Column(Text)
     oneway = Column(Text)
     geom = Column(Geometry(geometry_type="LINESTRING", srid=4326))
+    node_ids = Column(ARRAY(BigInteger))
+    way_id = Column(BigInteger)
 
 
 class BuildingDB(Base):
@@ -44,6 +46,7 @@ class BuildingDB(Base):
     addr_street = Column(Text)
     shop = Column(Text)
     geom = Column(Geometry(geometry_type="POINT", srid=4326), nullable=False)
+    node_ids = Column(ARRAY(BigInteger))
 
 
 class TransportRouteDB(Base):
@@ -60,3 +63,19 @@ class TransportRouteDB(Base):
     route = Column(Text)
     to = Column(Text)
     geom = Column(Geometry(geometry_type="LINESTRING", srid=4326))
+    relation_id = Column(BigInteger)
+
+
+class TransportRouteGroupDB(Base):
+    __tablename__ = "transport_route_groups"
+
+    id = Column(BigInteger, primary_key=True)
+    colour = Column(Text)
+    from_ = Column("from", Text)
+    name = Column(Text)
+    network = Column(Text)
+    operator = Column(Text)
+    ref = Column(Text)
+    route = Column(Text)
+    to = Column(Text)
+    geom = Column(Geometry(geometry_type="MULTILINESTRING", srid=4326), nullable=False)
@@ -0,0 +1,161 @@
+from collections.abc import Collection
+
+from constants import (
+    BUILDING_TAG_MAPPING,
+    DETAIL_ZOOM,
+    LINK_TAG_MAPPING,
+    NETWORK_LAYERS,
+    ROUTE_TAG_MAPPING,
+    VALID_BUILDING_TYPES,
+)
+from db.db_models import BuildingDB, LinkDB, TransportRouteGroupDB
+from tiles import highways_for_zoom, simplify_tolerance
+
+BBOX = "ST_MakeEnvelope(:min_lng, :min_lat, :max_lng, :max_lat, 4326)"
+KNOWN = "ST_UnaryUnion(ST_GeomFromText(CAST(:known AS text), 4326))"
+AREA = f"""CASE WHEN CAST(:known AS text) IS NULL THEN {BBOX}
+           ELSE ST_Difference({BBOX}, {KNOWN}) END"""
+EMPTY_ARRAY = "CAST('[]' AS json)"
+HIGHWAYS = "CAST(:highways AS text[])"
+HIGHWAY_FILTER = f"({HIGHWAYS} IS NULL OR l.highway = ANY({HIGHWAYS}))"
+
+
+def envelopes_wkt(bboxes: Collection[tuple[float, float, float, float]]) -> str:
+    polygons = ",".join(
+        f"POLYGON(({w} {s},{e} {s},{e} {n},{w} {n},{w} {s}))" for s, w, n, e in bboxes
+    )
+    return f"GEOMETRYCOLLECTION({polygons})"
+
+
+def _in_area(geom: str) -> str:
+    return f"""ST_Intersects({geom}, {AREA})
+          AND (CAST(:known AS text) IS NULL OR NOT ST_Intersects({geom}, {KNOWN}))"""
+
+
+def lod_params(lod: int) -> dict:
+    return {
+        "highways": highways_for_zoom(lod),
+        "tolerance": simplify_tolerance(lod),
+        "building_outlines": lod >= DETAIL_ZOOM,
+        "building_types": sorted(VALID_BUILDING_TYPES),
+    }
+
+
+def network_params(
+    min_lat: float,
+    min_lng: float,
+    max_lat: float,
+    max_lng: float,
+    lod: int = DETAIL_ZOOM,
+    building_types: Collection[str] = VALID_BUILDING_TYPES,
+    known: Collection[tuple[float, float, float, float]] = (),
+) -> dict:
+    return {
+        "min_lat": min_lat,
+        "min_lng": min_lng,
+        "max_lat": max_lat,
+        "max_lng": max_lng,
+        **lod_params(lod),
+        "building_types": sorted(building_types),
+        "known": envelopes_wkt(known) if known else None,
+    }
+
+
+def _simplified(geom: str) -> str:
+    return f"""CASE WHEN CAST(:tolerance AS float8) > 0
+                 THEN ST_SimplifyPreserveTopology({geom}, :tolerance)
+                 ELSE {geom} END"""
+
+
+def _column(model, attr: str) -> str:
+    return model.__mapper__.attrs[attr].columns[0].name
+
+
+def tags_sql(alias: str, model, mapping: dict[str, str]) -> str:
+    pairs = ", ".join(
+        f"'{key}', NULLIF({alias}.\"{_column(model, attr)}\", '')"
+        for attr, key in mapping.items()
+    )
+    return f"json_strip_nulls(json_build_object({pairs}))"
+
+
+def nodes_sql() -> str:
+    return f"""
+        SELECT json_build_object(
+            'id', n.id,
+            'position', json_build_array(ST_X(n.geom), ST_Y(n.geom)),
+            'connection_count', n.connection_count
+        ) AS feature
+        FROM nodes n
+        WHERE {_in_area("n.geom")}
+          AND ({HIGHWAYS} IS NULL OR n.id IN (
+              SELECT unnest(ARRAY[l.from_node, l.to_node])
+              FROM links l
+              WHERE ST_Intersects(l.geom, {BBOX}) AND {HIGHWAY_FILTER}
+          ))
+    """
+
+
+def links_sql() -> str:
+    return f"""
+        SELECT json_build_object(
+            'id', l.id,
+            'from_node', l.from_node,
+            'to_node', l.to_node,
+            'geometry', CAST(ST_AsGeoJSON({_simplified("l.geom")}) AS json) -> 'coordinates',
+            'tags', {tags_sql("l", LinkDB, LINK_TAG_MAPPING)}
+        ) AS feature
+        FROM links l
+        WHERE {_in_area("l.geom")} AND ST_NPoints(l.geom) >= 2
+          AND {HIGHWAY_FILTER}
+    """
+
+
+def buildings_sql() -> str:
+    geometry = f"""CASE WHEN NOT :building_outlines THEN {EMPTY_ARRAY}
+                 WHEN json_typeof(b.geometry) = 'string'
+                 THEN CAST(b.geometry #>> '{{}}' AS json)
+                 ELSE b.geometry END"""
+    return f"""
+        SELECT json_build_object(
+            'id', b.id,
+            'position', json_build_array(ST_X(b.geom), ST_Y(b.geom)),
+            'geometry', {geometry},
+            'type', b.type,
+            'tags', {tags_sql("b", BuildingDB, BUILDING_TAG_MAPPING)}
+        ) AS feature
+        FROM buildings b
+        WHERE {_in_area("b.geom")} AND b.type = ANY(CAST(:building_types AS text[]))
+    """
+
+
+def transport_routes_sql() -> str:
+    return f"""
+        SELECT json_build_object(
+            'id', g.id,
+            'geometry', CAST(ST_AsGeoJSON({_simplified("g.geom")}) AS json) -> 'coordinates',
+            'tags', {tags_sql("g", TransportRouteGroupDB, ROUTE_TAG_MAPPING)}
+        ) AS feature
+        FROM transport_route_groups g
+        WHERE {_in_area("g.geom")}
+    """
+
+
+LAYER_SQL = {
+    "nodes": nodes_sql,
+    "links": links_sql,
+    "buildings": buildings_sql,
+    "transport_routes": transport_routes_sql,
+}
+
+
+def _aggregated(features: str) -> str:
+    return f"SELECT COALESCE(json_agg(f.feature), {EMPTY_ARRAY}) FROM ({features}) AS f"
+
+
+def network_sql(layers: Collection[str] = NETWORK_LAYERS) -> str:
+    columns = ",\n".join(
+        f"'{name}', ({_aggregated(sql())})" if name in layers else f"'{name}', {EMPTY_ARRAY}"
+        for name, sql in LAYER_SQL.items()
+    )
+    return f"SELECT json_build_object({columns})"
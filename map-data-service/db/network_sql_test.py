@@ -0,0 +1,77 @@
+import re
+
+from constants import DETAIL_ZOOM, NETWORK_LAYERS, VALID_BUILDING_TYPES
+from db.db_models import LinkDB
+from db.network_sql import (
+    EMPTY_ARRAY,
+    LAYER_SQL,
+    envelopes_wkt,
+    lod_params,
+    network_params,
+    network_sql,
+    tags_sql,
+)
+
+
+def _bind_names(sql: str) -> set[str]:
+    return set(re.findall(r"(?<!:):(\w+)", re.sub(r"'[^']*'", "''", sql)))
+
+
+def test_envelopes_wkt_orders_coordinates_as_lng_lat():
+    wkt = envelopes_wkt([(51.0, -8.0, 52.0, -7.0)])
+
+    assert wkt == "GEOMETRYCOLLECTION(POLYGON((-8.0 51.0,-7.0 51.0,-7.0 52.0,-8.0 52.0,-8.0 51.0)))"
+
+
+def test_lod_params():
+    full, low = lod_params(DETAIL_ZOOM), lod_params(8)
+
+    assert full["highways"] is None and full["tolerance"] == 0.0
+    assert full["building_outlines"] is True
+    assert low["highways"] and low["tolerance"] > 0
+    assert low["building_outlines"] is False
+
+
+def test_network_params():
+    params = network_params(51.0, -8.0, 52.0, -7.0, building_types=["school", "retail"])
+
+    assert params["building_types"] == ["retail", "school"]
+    assert params["known"] is None
+    assert network_params(51.0, -8.0, 52.0, -7.0, known=[(51.0, -8.0, 51.5, -7.5)])["known"]
+
+
+def test_every_statement_binds_only_network_params():
+    params = network_params(51.0, -8.0, 52.0, -7.0, known=[(51.0, -8.0, 51.5, -7.5)])
+
+    assert _bind_names(network_sql()) <= set(params)
+    for sql in LAYER_SQL.values():
+        assert _bind_names(sql()) <= set(params)
+
+
+def test_network_sql_leaves_out_unrequested_layers():
+    sql = network_sql(["links"])
+
+    assert "FROM links l" in sql
+    assert "FROM buildings b" not in sql and "FROM nodes n" not in sql
+    for layer in NETWORK_LAYERS:
+        assert f"'{layer}'," in sql
+    assert sql.count(EMPTY_ARRAY) >= len(NETWORK_LAYERS) - 1
+
+
+def test_tags_sql_reads_mapped_columns():
+    sql = tags_sql("l", LinkDB, {"highway": "highway", "maxspeed": "maxspeed"})
+
+    assert "'highway', NULLIF(l.\"highway\", '')" in sql
+    assert sql.startswith("json_strip_nulls(")
+
+
+def test_default_building_types():
+    assert network_params(0, 0, 1, 1)["building_types"] == sorted(VALID_BUILDING_TYPES)
+
+
+def test_transport_routes_read_the_route_groups():
+    sql = LAYER_SQL["transport_routes"]()
+
+    assert "FROM transport_route_groups g" in sql
+    assert "ST_LineMerge" not in sql
+    assert "GROUP BY" not in sql
@@ -0,0 +1,57 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+@dataclass
+class _Usage:
+    checkouts: int = 0
+    streamed: bool = False
+
+
+_usage: ContextVar[_Usage | None] = ContextVar("db_usage", default=None)
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+    usage = _usage.get()
+    if usage is not None:
+        usage.checkouts += 1
+
+
+def install(engine: AsyncEngine) -> None:
+    event.listen(engine.sync_engine.pool, "checkout", _on_checkout)
+
+
+@contextmanager
+def track_connections():
+    token = _usage.set(_Usage())
+    try:
+        yield
+    finally:
+        _usage.reset(token)
+
+
+def mark_streamed() -> None:
+    usage = _usage.get()
+    if usage is not None:
+        usage.streamed = True
+
+
+def connections_used() -> int | None:
+    usage = _usage.get()
+    if usage is None or usage.streamed:
+        return None
+    return usage.checkouts
+
+
+def pool_status(engine: AsyncEngine) -> dict[str, int]:
+    pool = engine.sync_engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": pool._max_overflow,
+    }
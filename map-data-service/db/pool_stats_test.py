@@ -0,0 +1,48 @@
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from db import pool_stats
+
+
+def make_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}", poolclass=QueuePool)
+    wrapped = SimpleNamespace(sync_engine=engine)
+    pool_stats.install(wrapped)
+    return engine, wrapped
+
+
+def test_checkouts_are_counted_per_request(tmp_path):
+    engine, _ = make_engine(tmp_path)
+
+    with pool_stats.track_connections():
+        for _ in range(2):
+            with engine.connect():
+                pass
+        assert pool_stats.connections_used() == 2
+        with pool_stats.track_connections():
+            assert pool_stats.connections_used() == 0
+        assert pool_stats.connections_used() == 2
+
+    assert pool_stats.connections_used() is None
+
+
+def test_streamed_requests_report_no_count(tmp_path):
+    engine, _ = make_engine(tmp_path)
+
+    with pool_stats.track_connections():
+        with engine.connect():
+            pass
+        pool_stats.mark_streamed()
+        assert pool_stats.connections_used() is None
+
+
+def test_pool_status(tmp_path):
+    engine, wrapped = make_engine(tmp_path)
+
+    with engine.connect():
+        status = pool_stats.pool_status(wrapped)
+
+    assert status["checked_out"] == 1
+    assert status["size"] == 5 and status["max_overflow"] == 10
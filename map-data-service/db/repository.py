@@ -2,12 +2,14 @@ from __future__ import annotations
 
 import asyncio
 import json
+from collections.abc import AsyncIterator, Collection
 
-from sqlalchemy import select, func
+from sqlalchemy import select, func, text
 from sqlalchemy.ext.asyncio import async_sessionmaker
 from geoalchemy2.functions import ST_Intersects, ST_MakeEnvelope, ST_X, ST_Y, ST_AsGeoJSON
 
-from db.db_models import NodeDB, LinkDB, BuildingDB, TransportRouteDB
+from db.db_models import NodeDB, LinkDB, BuildingDB, TransportRouteGroupDB
+from db.network_sql import LAYER_SQL, envelopes_wkt, network_params, network_sql
 from models import (
     TrafficNode,
     TrafficLink,
@@ -15,7 +17,11 @@ from models import (
     TransportRoute,
     NetworkResponse,
 )
-from constants import VALID_BUILDING_TYPES, LINK_TAG_MAPPING, BUILDING_TAG_MAPPING, ROUTE_TAG_MAPPING
+from constants import DETAIL_ZOOM, NETWORK_LAYERS, VALID_BUILDING_TYPES, LINK_TAG_MAPPING, BUILDING_TAG_MAPPING, ROUTE_TAG_MAPPING
+from tiles import TileLayer, highways_for_zoom, simplify_tolerance, tile_params, tile_sql
+
+STREAM_BATCH_ROWS = 2000
+
 
 def _parse_geometry(raw) -> list[tuple[float, float]]:
     if isinstance(raw, str):
@@ -29,6 +35,14 @@ def _pick_tags(row, mapping: dict[str, str]) -> dict[str, str]:
     return {key: getattr(row, attr) for attr, key in mapping.items() if getattr(row, attr)}
 
 
+def _simplify(geom, tolerance: float):
+    return func.ST_SimplifyPreserveTopology(geom, tolerance) if tolerance > 0 else geom
+
+
+def _outside(stmt, geom, known):
+    return stmt if known is None else stmt.where(~ST_Intersects(geom, known))
+
+
 class MapDataRepository:
     def __init__(self, session_factory: async_sessionmaker):
         self.session_factory = session_factory
@@ -39,14 +53,36 @@ class MapDataRepository:
         min_lng: float,
         max_lat: float,
         max_lng: float,
+        lod: int = DETAIL_ZOOM,
+        layers: Collection[str] = NETWORK_LAYERS,
+        building_types: Collection[str] = VALID_BUILDING_TYPES,
+        known: Collection[tuple[float, float, float, float]] = (),
     ) -> NetworkResponse:
         bbox = ST_MakeEnvelope(min_lng, min_lat, max_lng, max_lat, 4326)
+        known = (
+            func.ST_UnaryUnion(func.ST_GeomFromText(envelopes_wkt(known), 4326))
+            if known
+            else None
+        )
+        highways = highways_for_zoom(lod)
+        tolerance = simplify_tolerance(lod)
+
+        async def skipped():
+            return []
 
+        fetches = {
+            "nodes": lambda: self._fetch_nodes(bbox, highways, known),
+            "links": lambda: self._fetch_links(bbox, highways, tolerance, known),
+            "buildings": lambda: self._fetch_buildings(
+                bbox, building_types, outlines=lod >= DETAIL_ZOOM, known=known
+            ),
+            "transport_routes": lambda: self._fetch_transport_routes(bbox, tolerance, known),
+        }
         nodes, links, buildings, transport_routes = await asyncio.gather(
-            self._fetch_nodes(bbox),
-            self._fetch_links(bbox),
-            self._fetch_buildings(bbox),
-            self._fetch_transport_routes(bbox),
+            *(
+                fetch() if name in layers else skipped()
+                for name, fetch in fetches.items()
+            )
         )
 
         return NetworkResponse(
@@ -56,7 +92,101 @@ class MapDataRepository:
             transport_routes=transport_routes,
         )
 
-    async def _fetch_nodes(self, bbox) -> list[TrafficNode]:
+    async def fetch_network_json(
+        self,
+        min_lat: float,
+        min_lng: float,
+        max_lat: float,
+        max_lng: float,
+        lod: int = DETAIL_ZOOM,
+        layers: Collection[str] = NETWORK_LAYERS,
+        building_types: Collection[str] = VALID_BUILDING_TYPES,
+        known: Collection[tuple[float, float, float, float]] = (),
+    ) -> bytes:
+        params = network_params(
+            min_lat, min_lng, max_lat, max_lng, lod, building_types, known
+        )
+        async with self.session_factory() as session:
+            result = await session.execute(text(network_sql(layers)), params)
+            return result.scalar().encode()
+
+    async def fetch_network_from_json(
+        self,
+        min_lat: float,
+        min_lng: float,
+        max_lat: float,
+        max_lng: float,
+        lod: int = DETAIL_ZOOM,
+        layers: Collection[str] = NETWORK_LAYERS,
+        building_types: Collection[str] = VALID_BUILDING_TYPES,
+        known: Collection[tuple[float, float, float, float]] = (),
+    ) -> NetworkResponse:
+        raw = await self.fetch_network_json(
+            min_lat, min_lng, max_lat, max_lng, lod, layers, building_types, known
+        )
+        return NetworkResponse.model_validate_json(raw)
+
+    async def stream_network(
+        self,
+        min_lat: float,
+        min_lng: float,
+        max_lat: float,
+        max_lng: float,
+        lod: int = DETAIL_ZOOM,
+        layers: Collection[str] = NETWORK_LAYERS,
+        building_types: Collection[str] = VALID_BUILDING_TYPES,
+    ) -> AsyncIterator[tuple[str, list[bytes]]]:
+        params = network_params(min_lat, min_lng, max_lat, max_lng, lod, building_types)
+        async with self.session_factory() as session:
+            for name in NETWORK_LAYERS:
+                if name not in layers:
+                    yield name, []
+                    continue
+                stmt = text(LAYER_SQL[name]()).execution_options(yield_per=STREAM_BATCH_ROWS)
+                result = await session.stream(stmt, params)
+                yield name, []
+                async for rows in result.partitions():
+                    yield name, [row.feature.encode() for row in rows]
+
+    async def fetch_dataset_changes(
+        self, since: int | None
+    ) -> tuple[int, list[tuple[float, float, float, float]] | None]:
+        async with self.session_factory() as session:
+            result = await session.execute(
+                text(
+                    """SELECT v.version, v.extent IS NULL AS full_change,
+                              ST_YMin(d.geom) AS min_lat, ST_XMin(d.geom) AS min_lng,
+                              ST_YMax(d.geom) AS max_lat, ST_XMax(d.geom) AS max_lng
+                       FROM dataset_versions v
+                       LEFT JOIN LATERAL ST_Dump(v.extent) d ON TRUE
+                       WHERE v.version > COALESCE(:since, 0)
+                          OR v.version = (SELECT MAX(version) FROM dataset_versions)
+                       ORDER BY v.version"""
+                ),
+                {"since": since},
+            )
+            rows = result.all()
+
+        latest = rows[-1].version if rows else 0
+        changed = [row for row in rows if since is not None and row.version > since]
+        if since is None or any(row.full_change for row in changed):
+            return latest, None
+        return latest, [
+            (row.min_lat, row.min_lng, row.max_lat, row.max_lng) for row in changed
+        ]
+
+    async def fetch_tile(self, layer: TileLayer, z: int, x: int, y: int) -> bytes:
+        if z < layer.min_zoom:
+            return b""
+        async with self.session_factory() as session:
+            result = await session.execute(
+                text(tile_sql(layer)), tile_params(layer, z, x, y)
+            )
+            return bytes(result.scalar() or b"")
+
+    async def _fetch_nodes(
+        self, bbox, highways: list[str] | None = None, known=None
+    ) -> list[TrafficNode]:
         async with self.session_factory() as session:
             stmt = select(
                 NodeDB.id,
@@ -64,6 +194,16 @@ class MapDataRepository:
                 ST_Y(NodeDB.geom).label("latitude"),
                 NodeDB.connection_count,
             ).where(ST_Intersects(NodeDB.geom, bbox))
+            if highways is not None:
+                shown = [ST_Intersects(LinkDB.geom, bbox), LinkDB.highway.in_(highways)]
+                stmt = stmt.where(
+                    NodeDB.id.in_(
+                        select(LinkDB.from_node).where(*shown).union(
+                            select(LinkDB.to_node).where(*shown)
+                        )
+                    )
+                )
+            stmt = _outside(stmt, NodeDB.geom, known)
             result = await session.execute(stmt)
             rows = result.all()
 
@@ -76,13 +216,15 @@ class MapDataRepository:
             for row in rows
         ]
 
-    async def _fetch_links(self, bbox) -> list[TrafficLink]:
+    async def _fetch_links(
+        self, bbox, highways: list[str] | None = None, tolerance: float = 0.0, known=None
+    ) -> list[TrafficLink]:
         async with self.session_factory() as session:
             stmt = select(
                 LinkDB.id,
                 LinkDB.from_node,
                 LinkDB.to_node,
-                ST_AsGeoJSON(LinkDB.geom).label("geom_json"),
+                ST_AsGeoJSON(_simplify(LinkDB.geom, tolerance)).label("geom_json"),
                 LinkDB.highway,
                 LinkDB.lanes,
                 LinkDB.maxspeed,
@@ -91,6 +233,9 @@ class MapDataRepository:
                 LinkDB.ref,
                 LinkDB.surface,
             ).where(ST_Intersects(LinkDB.geom, bbox))
+            if highways is not None:
+                stmt = stmt.where(LinkDB.highway.in_(highways))
+            stmt = _outside(stmt, LinkDB.geom, known)
             result = await session.execute(stmt)
             rows = result.all()
 
@@ -111,7 +256,13 @@ class MapDataRepository:
             )
         return links
 
-    async def _fetch_buildings(self, bbox) -> list[Building]:
+    async def _fetch_buildings(
+        self,
+        bbox,
+        building_types: Collection[str] = VALID_BUILDING_TYPES,
+        outlines: bool = True,
+        known=None,
+    ) -> list[Building]:
         async with self.session_factory() as session:
             stmt = select(
                 BuildingDB.id,
@@ -124,16 +275,17 @@ class MapDataRepository:
                 BuildingDB.name,
                 BuildingDB.addr_street,
                 BuildingDB.shop,
-            ).where(ST_Intersects(BuildingDB.geom, bbox))
+            ).where(
+                ST_Intersects(BuildingDB.geom, bbox),
+                BuildingDB.type.in_(sorted(building_types)),
+            )
+            stmt = _outside(stmt, BuildingDB.geom, known)
             result = await session.execute(stmt)
             rows = result.all()
 
         buildings = []
         for row in rows:
-            if row.type not in VALID_BUILDING_TYPES:
-                continue
-
-            geometry = _parse_geometry(row.geometry)
+            geometry = _parse_geometry(row.geometry) if outlines else []
 
             buildings.append(
                 Building(
@@ -146,61 +298,40 @@ class MapDataRepository:
             )
         return buildings
 
-    async def _fetch_transport_routes(self, bbox) -> list[TransportRoute]:
+    async def _fetch_transport_routes(
+        self, bbox, tolerance: float = 0.0, known=None
+    ) -> list[TransportRoute]:
         async with self.session_factory() as session:
-            T = TransportRouteDB
-            stmt = (
-                select(
-                    func.min(T.id).label("id"),
-                    func.ST_AsGeoJSON(
-                        func.ST_LineMerge(func.ST_Collect(T.geom))
-                    ).label("merged_geom"),
-                    T.colour,
-                    T.from_,
-                    T.name,
-                    T.network,
-                    T.operator,
-                    T.ref,
-                    T.route,
-                    T.to,
-                )
-                .where(ST_Intersects(T.geom, bbox))
-                .group_by(
-                    T.name, T.ref, T.route, T.colour,
-                    T.network, T.operator, T.from_, T.to,
-                )
-            )
+            G = TransportRouteGroupDB
+            stmt = select(
+                G.id,
+                ST_AsGeoJSON(_simplify(G.geom, tolerance)).label("merged_geom"),
+                G.colour,
+                G.from_,
+                G.name,
+                G.network,
+                G.operator,
+                G.ref,
+                G.route,
+                G.to,
+            ).where(ST_Intersects(G.geom, bbox))
+            stmt = _outside(stmt, G.geom, known)
             result = await session.execute(stmt)
             rows = result.all()
 
-        routes = []
-        for row in rows:
-            geojson = json.loads(row.merged_geom)
-            if geojson["type"] == "LineString":
-                geometry = [[(c[0], c[1]) for c in geojson["coordinates"]]]
-            elif geojson["type"] == "MultiLineString":
-                geometry = [
+        return [
+            TransportRoute(
+                id=row.id,
+                geometry=[
                     [(c[0], c[1]) for c in line]
-                    for line in geojson["coordinates"]
-                ]
-            else:
-                continue
-
-            tags = {}
-            if row.route: tags["route"] = row.route
-            if row.ref: tags["ref"] = row.ref
-            if row.name: tags["name"] = row.name
-            if row.operator: tags["operator"] = row.operator
-            if row.network: tags["network"] = row.network
-            if row.from_: tags["from"] = row.from_
-            if row.to: tags["to"] = row.to
-            if row.colour: tags["colour"] = row.colour
-
-            routes.append(
-                TransportRoute(
-                    id=row.id,
-                    geometry=geometry,
-                    tags=tags,
-                )
+                    for line in json.loads(row.merged_geom)["coordinates"]
+                ],
+                tags=_pick_tags(row, ROUTE_TAG_MAPPING),
             )
-        return routes
+            for row in rows
+        ]
+
+    async def refresh_transport_routes(self) -> None:
+        async with self.session_factory() as session:
+            await session.execute(text("SELECT refresh_transport_route_groups()"))
+            await session.commit()
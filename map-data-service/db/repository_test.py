@@ -0,0 +1,61 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+from db.repository import MapDataRepository
+
+
+def _group(**tags):
+    columns = dict.fromkeys(
+        ("colour", "from_", "name", "network", "operator", "ref", "route", "to")
+    )
+    return SimpleNamespace(
+        id=7,
+        merged_geom=json.dumps(
+            {
+                "type": "MultiLineString",
+                "coordinates": [[[-8.47, 51.9], [-8.46, 51.9]], [[-8.45, 51.91], [-8.44, 51.91]]],
+            }
+        ),
+        **{**columns, **tags},
+    )
+
+
+def _repository(rows, statements):
+    class Session:
+        async def execute(self, stmt):
+            statements.append(str(stmt))
+            return SimpleNamespace(all=lambda: rows)
+
+        async def commit(self):
+            statements.append("COMMIT")
+
+    @asynccontextmanager
+    async def session_factory():
+        yield Session()
+
+    return MapDataRepository(session_factory)
+
+
+def test_transport_routes_are_read_from_the_route_groups():
+    statements = []
+    repository = _repository(
+        [_group(route="bus", ref="208", from_="Kent Station", name="")], statements
+    )
+
+    [route] = asyncio.run(repository._fetch_transport_routes(bbox="POLYGON EMPTY"))
+
+    assert "FROM transport_route_groups" in statements[0]
+    assert "GROUP BY" not in statements[0]
+    assert route.id == 7
+    assert route.geometry == [[(-8.47, 51.9), (-8.46, 51.9)], [(-8.45, 51.91), (-8.44, 51.91)]]
+    assert route.tags == {"route": "bus", "ref": "208", "from": "Kent Station"}
+
+
+def test_refresh_transport_routes_rebuilds_the_groups():
+    statements = []
+
+    asyncio.run(_repository([], statements).refresh_transport_routes())
+
+    assert statements == ["SELECT refresh_transport_route_groups()", "COMMIT"]
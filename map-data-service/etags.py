@@ -0,0 +1,48 @@
+import hashlib
+
+BBOX_DECIMALS = 7
+
+
+def _etag(*parts) -> str:
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{parts[0]}-{digest}"'
+
+
+def network_key(
+    bbox: tuple[float, float, float, float],
+    lod: int,
+    layers,
+    building_types,
+    media_type: str,
+    known=(),
+) -> tuple:
+    return (
+        tuple(round(value, BBOX_DECIMALS) for value in bbox),
+        lod,
+        tuple(sorted(layers)),
+        tuple(sorted(building_types)),
+        media_type,
+        tuple(tuple(round(value, BBOX_DECIMALS) for value in area) for area in known),
+    )
+
+
+def network_etag(version: int, key: tuple, encoding: str | None) -> str:
+    return _etag(version, *key, encoding)
+
+
+def tile_etag(
+    version: int, layer: str, z: int, x: int, y: int, encoding: str | None
+) -> str:
+    return _etag(version, layer, z, x, y, encoding)
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
@@ -0,0 +1,43 @@
+from etags import etag_matches, network_etag, network_key, tile_etag
+
+BBOX = (51.89, -8.48, 51.91, -8.46)
+
+
+def test_network_key_ignores_order_and_float_noise():
+    key = network_key(BBOX, 14, ["links", "nodes"], ["retail"], "application/json")
+
+    noisy = tuple(value + 1e-9 for value in BBOX)
+    same = network_key(noisy, 14, ["nodes", "links"], ["retail"], "application/json")
+    assert same == key
+
+
+def test_network_key_tells_requests_apart():
+    key = network_key(BBOX, 14, ["links"], [], "application/json")
+
+    assert network_key(BBOX, 13, ["links"], [], "application/json") != key
+    assert network_key(BBOX, 14, ["links"], [], "application/x-ndjson") != key
+    assert network_key(BBOX, 14, ["links"], [], "application/json", known=[BBOX]) != key
+
+
+def test_etags_are_weak_and_depend_on_version_and_encoding():
+    key = network_key(BBOX, 14, ["links"], [], "application/json")
+    etag = network_etag(3, key, None)
+
+    assert etag.startswith('W/"3-')
+    assert network_etag(3, key, None) == etag
+    assert network_etag(4, key, None) != etag
+    assert network_etag(3, key, "gzip") != etag
+    tile = tile_etag(3, "links", 14, 1, 2, None)
+    assert tile_etag(3, "links", 14, 2, 1, None) != tile
+
+
+def test_etag_matches():
+    etag = tile_etag(1, "links", 14, 7, 9, "br")
+
+    assert not etag_matches(None, etag)
+    assert not etag_matches("", etag)
+    assert etag_matches("*", etag)
+    assert etag_matches(etag, etag)
+    assert etag_matches(etag.removeprefix("W/"), etag)
+    assert etag_matches(f'"other", {etag}', etag)
+    assert not etag_matches('W/"other"', etag)
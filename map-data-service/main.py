@@ -1,21 +1,106 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
 
-from fastapi import FastAPI, Query, HTTPException, Response
+from fastapi import FastAPI, Header, Path, Query, HTTPException, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
 
 logger = logging.getLogger(__name__)
 from fastapi.middleware.cors import CORSMiddleware
 
+from config import get_settings
 from models import NetworkResponse
 from db import engine, MapDataRepository
 from db.database import AsyncSessionLocal
+from db.pool_stats import connections_used, mark_streamed, pool_status, track_connections
+from city_packs import CITIES, CityPacks
+from compression import (
+    CompressedCache,
+    compress_stream,
+    encode_body,
+    negotiate,
+)
+from dataset_watch import DatasetWatcher
+from etags import etag_matches, network_etag, network_key, tile_etag
+from network_binary import NETWORK_BINARY_MEDIA_TYPE, encode_network
+from network_cache import NetworkTileCache
+from region_index import InMemoryRegion, parse_region
+from single_flight import SingleFlight
+from constants import DETAIL_ZOOM, NETWORK_LAYERS, VALID_BUILDING_TYPES
+from tiles import (
+    MAX_ZOOM,
+    MVT_MEDIA_TYPE,
+    TILE_LAYERS,
+    lod_for_bbox,
+    tile_bounds,
+    validate_tile,
+)
 
 CACHE_MAX_AGE = 3600
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+DELTA_MEDIA_TYPES = {"binary": NETWORK_BINARY_MEDIA_TYPE, "json": "application/json"}
+NETWORK_MEDIA_TYPES = {"ndjson": NDJSON_MEDIA_TYPE, **DELTA_MEDIA_TYPES}
+MAX_KNOWN_AREAS = 256
+TILE_CACHE_MAX_AGE = 7 * 24 * 3600
+
+settings = get_settings()
+repository = MapDataRepository(AsyncSessionLocal)
+network_cache = (
+    NetworkTileCache(
+        repository.fetch_network_from_json
+        if settings.network_sql_json
+        else repository.fetch_network,
+        zoom=settings.network_cache_zoom,
+        max_tiles=settings.network_cache_max_tiles,
+        max_bytes=settings.network_cache_max_mb * 2**20,
+        disk_dir=settings.network_cache_dir,
+    )
+    if settings.network_cache_enabled
+    else None
+)
+network_flights: SingleFlight[tuple[bytes, str | None]] = SingleFlight()
+response_cache = CompressedCache(settings.response_cache_max_mb * 2**20)
+dataset_watcher = DatasetWatcher(repository, settings.dataset_poll_seconds)
+region = (
+    InMemoryRegion(
+        repository,
+        parse_region(settings.network_region),
+        settings.network_sql_json,
+        settings.network_region_cache_mb * 2**20,
+    )
+    if settings.network_region
+    else None
+)
+city_packs = (
+    CityPacks(repository, settings.city_packs_dir, settings.network_sql_json)
+    if settings.city_packs_enabled
+    else None
+)
+
+
+def _invalidate_network_cache(version: int, extents) -> None:
+    network_cache.invalidate(extents)
+    network_cache.mark_version(version)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    if region is not None:
+        dataset_watcher.subscribe(region.schedule_reload)
+    if city_packs is not None:
+        dataset_watcher.subscribe(city_packs.schedule_refresh)
+    if network_cache is not None:
+        dataset_watcher.subscribe(_invalidate_network_cache)
+        await dataset_watcher.start(network_cache.stored_version())
+    else:
+        await dataset_watcher.start()
     yield
+    await dataset_watcher.stop()
+    if city_packs is not None:
+        await city_packs.stop()
+    if region is not None:
+        await region.stop()
     await engine.dispose()
 
 
@@ -24,6 +109,14 @@ TAGS_METADATA = [
         "name": "network",
         "description": "Spatial queries returning road network, buildings, and public transport data for a geographic bounding box.",
     },
+    {
+        "name": "cities",
+        "description": "Prebuilt full networks of the frontend's predefined cities.",
+    },
+    {
+        "name": "tiles",
+        "description": "Mapbox Vector Tiles of the network layers for map rendering.",
+    },
     {
         "name": "ops",
         "description": "Operational endpoints for monitoring service health.",
@@ -36,7 +129,9 @@ app = FastAPI(
         "Serves OpenStreetMap-derived network data (nodes, links, buildings, transport routes) "
         "from a PostGIS database for use by the TrafficJam simulation frontend.\n\n"
         "All coordinates are in **WGS 84** (EPSG:4326) as `[longitude, latitude]` pairs. "
-        "Responses are cached for 1 hour (`Cache-Control: public, max-age=3600`)."
+        "Responses are cached for 1 hour (`Cache-Control: public, max-age=3600`) and carry "
+        "an `ETag` tied to the dataset version; send it back in `If-None-Match` to get "
+        "`304 Not Modified` while the data is unchanged."
     ),
     version="2.0.0",
     openapi_tags=TAGS_METADATA,
@@ -49,9 +144,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-DB-Connections", "ETag"],
 )
 
 
+@app.middleware("http")
+async def count_db_connections(request: Request, call_next):
+    with track_connections():
+        response = await call_next(request)
+        used = connections_used()
+        if used is not None:
+            response.headers["X-DB-Connections"] = str(used)
+    return response
+
+
 def _validate_bounds(min_lat: float, min_lng: float, max_lat: float, max_lng: float):
     if min_lat >= max_lat:
         raise HTTPException(status_code=400, detail="min_lat must be less than max_lat")
@@ -59,6 +165,16 @@ def _validate_bounds(min_lat: float, min_lng: float, max_lat: float, max_lng: fl
         raise HTTPException(status_code=400, detail="min_lng must be less than max_lng")
 
 
+def _parse_subset(value: str | None, allowed, name: str) -> list[str] | None:
+    if value is None:
+        return None
+    items = [item.strip() for item in value.split(",") if item.strip()]
+    unknown = sorted(set(items) - set(allowed))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown {name}: {', '.join(unknown)}")
+    return items
+
+
 @app.get(
     "/network",
     response_model=NetworkResponse,
@@ -70,23 +186,488 @@ def _validate_bounds(min_lat: float, min_lng: float, max_lat: float, max_lng: fl
         "The bounding box must have `min_lat < max_lat` and `min_lng < max_lng`."
     ),
     response_description="Network data (nodes, links, buildings, transport routes) within the requested bounding box",
+    responses={
+        200: {
+            "content": {NETWORK_BINARY_MEDIA_TYPE: {}, NDJSON_MEDIA_TYPE: {}},
+            "description": (
+                "JSON, or the columnar binary layout documented in the README "
+                f"for `Accept: {NETWORK_BINARY_MEDIA_TYPE}` or `format=binary`, or "
+                f"streamed NDJSON for `Accept: {NDJSON_MEDIA_TYPE}` or `format=ndjson`"
+            ),
+        }
+    },
 )
 async def get_network(
-    response: Response,
     min_lat: float = Query(..., ge=-90, le=90, description="South boundary latitude"),
     min_lng: float = Query(..., ge=-180, le=180, description="West boundary longitude"),
     max_lat: float = Query(..., ge=-90, le=90, description="North boundary latitude"),
     max_lng: float = Query(..., ge=-180, le=180, description="East boundary longitude"),
+    lod: int | None = Query(
+        None,
+        ge=0,
+        le=DETAIL_ZOOM,
+        description=(
+            "Level of detail as a map zoom level; derived from the bbox size when omitted. "
+            f"Below {DETAIL_ZOOM}, links are limited to major highway classes, line geometries "
+            "are simplified and buildings have no outline (`geometry` is empty)."
+        ),
+    ),
+    layers: str | None = Query(
+        None,
+        description=(
+            f"Comma-separated layers to return (`{'`, `'.join(NETWORK_LAYERS)}`); "
+            "the others come back empty"
+        ),
+    ),
+    building_types: str | None = Query(
+        None,
+        description=(
+            f"Comma-separated building types to return (`{'`, `'.join(sorted(VALID_BUILDING_TYPES))}`)"
+        ),
+    ),
+    format: str | None = Query(
+        None,
+        pattern="^(json|binary|ndjson)$",
+        description=(
+            "Response encoding; overrides the `Accept` header. `ndjson` streams one "
+            '`{"layer": ..., "feature": ...}` line per feature'
+        ),
+    ),
+    stream: bool = Query(
+        False,
+        description=(
+            "Stream the JSON response layer by layer as PostGIS returns rows, for very "
+            "large areas; implied by `ndjson`"
+        ),
+    ),
+    accept: str | None = Header(None, include_in_schema=False),
+    accept_encoding: str | None = Header(None, include_in_schema=False),
+    if_none_match: str | None = Header(None, include_in_schema=False),
 ):
     _validate_bounds(min_lat, min_lng, max_lat, max_lng)
-    response.headers["Cache-Control"] = f"public, max-age={CACHE_MAX_AGE}"
+    media_type = _media_type(format, accept, NETWORK_MEDIA_TYPES)
+    if media_type == NETWORK_BINARY_MEDIA_TYPE and stream:
+        raise HTTPException(status_code=400, detail="Binary responses can't be streamed")
+    request = _network_request(
+        (min_lat, min_lng, max_lat, max_lng),
+        lod,
+        layers,
+        building_types,
+        media_type,
+        accept_encoding,
+    )
+    if _not_modified(request, if_none_match):
+        return Response(status_code=304, headers=request.headers)
+    if stream or media_type == NDJSON_MEDIA_TYPE:
+        return await _stream_network(request)
+    return await _network(request)
+
+
+@dataclass
+class _NetworkRequest:
+    bbox: tuple[float, float, float, float]
+    lod: int
+    filters: dict
+    cacheable: bool
+    media_type: str
+    key: tuple
+    encoding: str | None
+    headers: dict
+    known: list = field(default_factory=list)
+
+    @property
+    def binary(self) -> bool:
+        return self.media_type == NETWORK_BINARY_MEDIA_TYPE
 
+
+def _media_type(format: str | None, accept: str | None, media_types: dict[str, str]) -> str:
+    if format is not None:
+        return media_types[format]
+    for media_type in media_types.values():
+        if media_type in (accept or ""):
+            return media_type
+    return "application/json"
+
+
+def _network_filters(layers: str | None, building_types: str | None) -> tuple[dict, bool]:
+    layer_subset = _parse_subset(layers, NETWORK_LAYERS, "layers")
+    type_subset = _parse_subset(building_types, VALID_BUILDING_TYPES, "building types")
+    filters = {
+        "layers": layer_subset if layer_subset is not None else NETWORK_LAYERS,
+        "building_types": type_subset if type_subset is not None else VALID_BUILDING_TYPES,
+    }
+    return filters, layer_subset is None and type_subset is None
+
+
+def _network_request(
+    bbox, lod: int | None, layers, building_types, media_type: str, accept_encoding, known=()
+) -> _NetworkRequest:
+    filters, cacheable = _network_filters(layers, building_types)
+    lod = lod_for_bbox(*bbox) if lod is None else lod
+    key = network_key(bbox, lod, **filters, media_type=media_type, known=known)
+    encoding = negotiate(accept_encoding)
+    headers = {
+        "Cache-Control": f"public, max-age={CACHE_MAX_AGE}",
+        "Vary": "Accept, Accept-Encoding",
+    }
+    if dataset_watcher.version is not None:
+        headers["ETag"] = network_etag(dataset_watcher.version, key, encoding)
+    return _NetworkRequest(
+        bbox=bbox,
+        lod=lod,
+        filters=filters,
+        cacheable=cacheable and not known,
+        media_type=media_type,
+        key=key,
+        encoding=encoding,
+        headers=headers,
+        known=list(known),
+    )
+
+
+def _not_modified(request: _NetworkRequest, if_none_match: str | None) -> bool:
+    etag = request.headers.get("ETag")
+    return etag is not None and etag_matches(if_none_match, etag)
+
+
+async def _network(request: _NetworkRequest, cache_body: bool = True) -> Response:
+    version = dataset_watcher.version
+    body_key = None
+    if cache_body and version is not None:
+        body_key = (version, request.key, request.encoding)
+    entry = response_cache.get(body_key) if body_key is not None else None
+    if entry is None:
+
+        async def fetch() -> tuple[bytes, str | None]:
+            content = await _network_content(request)
+            encoded = await asyncio.to_thread(encode_body, content, request.encoding)
+            if body_key is not None:
+                response_cache.put(body_key, encoded)
+            return encoded
+
+        try:
+            entry = await network_flights.run((request.key, request.encoding), fetch)
+        except Exception:
+            logger.exception("Failed to fetch network data")
+            raise HTTPException(status_code=500, detail="Failed to fetch network data")
+
+    body, content_encoding = entry
+    headers = dict(request.headers)
+    if content_encoding is not None:
+        headers["Content-Encoding"] = content_encoding
+    return Response(content=body, media_type=request.media_type, headers=headers)
+
+
+async def _network_content(request: _NetworkRequest) -> bytes:
+    bbox, lod, filters, known = request.bbox, request.lod, request.filters, request.known
+    if region is not None and region.covers(*bbox):
+        index = region.index
+        if not request.binary:
+            return await asyncio.to_thread(index.network_json, *bbox, lod, **filters, known=known)
+        network = await asyncio.to_thread(index.network, *bbox, lod, **filters, known=known)
+    elif request.cacheable and network_cache is not None and network_cache.covers(*bbox, lod):
+        network = await network_cache.get_network(*bbox, lod)
+    elif settings.network_sql_json and not request.binary:
+        return await repository.fetch_network_json(*bbox, lod, **filters, known=known)
+    elif settings.network_sql_json:
+        network = await repository.fetch_network_from_json(*bbox, lod, **filters, known=known)
+    else:
+        network = await repository.fetch_network(*bbox, lod, **filters, known=known)
+
+    if request.binary:
+        return await asyncio.to_thread(encode_network, network)
+    return network.model_dump_json().encode()
+
+
+async def _network_chunks(rows, ndjson: bool):
+    if ndjson:
+        async for layer, features in rows:
+            if features:
+                prefix = b'{"layer":"%s","feature":' % layer.encode()
+                yield b"".join(prefix + feature + b"}\n" for feature in features)
+        return
+
+    current, empty = None, True
+    async for layer, features in rows:
+        parts = []
+        if layer != current:
+            parts.append(b'%s"%s":[' % (b"{" if current is None else b"],", layer.encode()))
+            current, empty = layer, True
+        if features:
+            parts.append(b"" if empty else b",")
+            parts.append(b",".join(features))
+            empty = False
+        yield b"".join(parts)
+    yield b"]}"
+
+
+async def _primed(primed: list, rows):
+    for item in primed:
+        yield item
+    async for item in rows:
+        yield item
+
+
+async def _first_rows(rows, layers) -> list:
+    primed = []
     try:
-        repository = MapDataRepository(AsyncSessionLocal)
-        return await repository.fetch_network(min_lat, min_lng, max_lat, max_lng)
+        async for layer, features in rows:
+            primed.append((layer, features))
+            if layer in layers:
+                break
     except Exception:
+        await rows.aclose()
         logger.exception("Failed to fetch network data")
         raise HTTPException(status_code=500, detail="Failed to fetch network data")
+    return primed
+
+
+async def _stream_network(request: _NetworkRequest) -> Response:
+    rows = repository.stream_network(*request.bbox, request.lod, **request.filters)
+    primed = await _first_rows(rows, request.filters["layers"])
+    ndjson = request.media_type == NDJSON_MEDIA_TYPE
+    chunks = _network_chunks(_primed(primed, rows), ndjson)
+    headers = dict(request.headers)
+    if request.encoding is not None:
+        chunks = compress_stream(chunks, request.encoding)
+        headers["Content-Encoding"] = request.encoding
+
+    async def body():
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()
+            await rows.aclose()
+
+    mark_streamed()
+    return StreamingResponse(body(), media_type=request.media_type, headers=headers)
+
+
+def _parse_known(value: str) -> list[tuple[float, float, float, float]]:
+    areas = []
+    for item in filter(None, (part.strip() for part in value.split(";"))):
+        try:
+            if "/" in item:
+                z, x, y = (int(part) for part in item.split("/"))
+                validate_tile(z, x, y)
+                areas.append(tile_bounds(z, x, y))
+            else:
+                area = tuple(float(part) for part in item.split(","))
+                if len(area) != 4:
+                    raise ValueError
+                _validate_bounds(*area)
+                areas.append(area)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid known area: {item}")
+    if not areas:
+        raise HTTPException(status_code=400, detail="known must list at least one area")
+    if len(areas) > MAX_KNOWN_AREAS:
+        raise HTTPException(
+            status_code=400, detail=f"known is limited to {MAX_KNOWN_AREAS} areas"
+        )
+    return areas
+
+
+@app.get(
+    "/network/delta",
+    response_model=NetworkResponse,
+    tags=["network"],
+    summary="Fetch the network data new to a client after a pan",
+    description=(
+        "Like `/network`, but leaves out every feature intersecting one of the `known` "
+        "areas: the bboxes or tiles the client has already loaded at the same level of "
+        "detail. Only the features in the rest of the bbox are returned. Feature ids are "
+        "stable, so clients merge the result into what they hold by id."
+    ),
+    response_description="Network data within the bbox and outside the known areas",
+    responses={
+        200: {
+            "content": {NETWORK_BINARY_MEDIA_TYPE: {}},
+            "description": "As for `/network`",
+        }
+    },
+)
+async def get_network_delta(
+    min_lat: float = Query(..., ge=-90, le=90, description="South boundary latitude"),
+    min_lng: float = Query(..., ge=-180, le=180, description="West boundary longitude"),
+    max_lat: float = Query(..., ge=-90, le=90, description="North boundary latitude"),
+    max_lng: float = Query(..., ge=-180, le=180, description="East boundary longitude"),
+    known: str = Query(
+        ...,
+        description=(
+            "Areas already loaded, separated by `;`: `min_lat,min_lng,max_lat,max_lng` "
+            f"boxes (e.g. the previous bbox) or `z/x/y` tiles; at most {MAX_KNOWN_AREAS}"
+        ),
+    ),
+    lod: int | None = Query(
+        None,
+        ge=0,
+        le=DETAIL_ZOOM,
+        description=(
+            "Level of detail, as for `/network`; must match the one the known areas were "
+            "loaded at"
+        ),
+    ),
+    layers: str | None = Query(None, description="As for `/network`"),
+    building_types: str | None = Query(None, description="As for `/network`"),
+    format: str | None = Query(
+        None,
+        pattern="^(json|binary)$",
+        description="Response encoding; overrides the `Accept` header",
+    ),
+    accept: str | None = Header(None, include_in_schema=False),
+    accept_encoding: str | None = Header(None, include_in_schema=False),
+    if_none_match: str | None = Header(None, include_in_schema=False),
+):
+    _validate_bounds(min_lat, min_lng, max_lat, max_lng)
+    request = _network_request(
+        (min_lat, min_lng, max_lat, max_lng),
+        lod,
+        layers,
+        building_types,
+        _media_type(format, accept, DELTA_MEDIA_TYPES),
+        accept_encoding,
+        _parse_known(known),
+    )
+    if _not_modified(request, if_none_match):
+        return Response(status_code=304, headers=request.headers)
+    return await _network(request, cache_body=False)
+
+
+@app.get(
+    "/cities",
+    tags=["cities"],
+    summary="List predefined cities",
+    response_description="Cities with their bounds and whether their pack is built",
+)
+async def list_cities():
+    return [
+        {
+            "id": city.id,
+            "name": city.name,
+            "bounds": {
+                "south": city.south,
+                "west": city.west,
+                "north": city.north,
+                "east": city.east,
+            },
+            "available": city_packs is not None and city_packs.built(city.id),
+        }
+        for city in CITIES.values()
+    ]
+
+
+@app.get(
+    "/cities/{city_id}/network",
+    tags=["cities"],
+    summary="Fetch a city's full network",
+    description=(
+        "Returns the prebuilt `/network` response for a predefined city's bounds at full "
+        "detail, as JSON or, for `Accept: "
+        f"{NETWORK_BINARY_MEDIA_TYPE}` or `format=binary`, the binary layout. "
+        "Packs are stored precompressed (zstd, br, gzip, as negotiated) and rebuilt when "
+        "the data inside the city changes; revalidate with `If-None-Match`."
+    ),
+    response_class=Response,
+    responses={
+        200: {"content": {"application/json": {}, NETWORK_BINARY_MEDIA_TYPE: {}}},
+        503: {"description": "The city's pack hasn't been built yet"},
+    },
+)
+async def get_city_network(
+    city_id: str = Path(..., description="City id, as listed by `/cities`"),
+    format: str | None = Query(
+        None,
+        pattern="^(json|binary)$",
+        description="Response encoding; overrides the `Accept` header",
+    ),
+    accept: str | None = Header(None, include_in_schema=False),
+    accept_encoding: str | None = Header(None, include_in_schema=False),
+    if_none_match: str | None = Header(None, include_in_schema=False),
+):
+    if city_id not in CITIES:
+        raise HTTPException(status_code=404, detail=f"Unknown city: {city_id}")
+    binary = format == "binary" or (
+        format is None and NETWORK_BINARY_MEDIA_TYPE in (accept or "")
+    )
+    pack_format = "binary" if binary else "json"
+    encoding = negotiate(accept_encoding)
+    pack = city_packs.pack(city_id, pack_format, encoding) if city_packs is not None else None
+    if pack is None:
+        raise HTTPException(status_code=503, detail=f"City pack {city_id} is not built yet")
+    path, etag = pack
+
+    headers = {
+        "Cache-Control": f"public, max-age={CACHE_MAX_AGE}",
+        "Vary": "Accept, Accept-Encoding",
+        "ETag": etag,
+    }
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    media_type = NETWORK_BINARY_MEDIA_TYPE if binary else "application/json"
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+
+@app.get(
+    "/tiles/{layer}/{z}/{x}/{y}.mvt",
+    tags=["tiles"],
+    summary="Fetch a vector tile",
+    description=(
+        "Returns one XYZ (Web Mercator) Mapbox Vector Tile for a network layer: "
+        f"`{'`, `'.join(TILE_LAYERS)}`. Layers have a minimum zoom below which tiles "
+        "are empty, and links are filtered by highway class at low zoom. "
+        f"Tiles are cached for {TILE_CACHE_MAX_AGE // 86400} days."
+    ),
+    response_class=Response,
+    responses={200: {"content": {MVT_MEDIA_TYPE: {}}}},
+)
+async def get_tile(
+    layer: str = Path(..., description="Layer name"),
+    z: int = Path(..., ge=0, le=MAX_ZOOM, description="Zoom level"),
+    x: int = Path(..., ge=0, description="Tile column"),
+    y: int = Path(..., ge=0, description="Tile row"),
+    accept_encoding: str | None = Header(None, include_in_schema=False),
+    if_none_match: str | None = Header(None, include_in_schema=False),
+):
+    tile_layer = TILE_LAYERS.get(layer)
+    if tile_layer is None:
+        raise HTTPException(status_code=404, detail=f"Unknown layer: {layer}")
+    try:
+        validate_tile(z, x, y)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    headers = {
+        "Cache-Control": f"public, max-age={TILE_CACHE_MAX_AGE}",
+        "Vary": "Accept-Encoding",
+    }
+    encoding = negotiate(accept_encoding)
+    version = dataset_watcher.version
+    if version is not None:
+        headers["ETag"] = tile_etag(version, layer, z, x, y, encoding)
+        if etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+
+    body_key = ("tile", version, layer, z, x, y, encoding) if version is not None else None
+    entry = response_cache.get(body_key) if body_key is not None else None
+    if entry is None:
+        try:
+            tile = await repository.fetch_tile(tile_layer, z, x, y)
+        except Exception:
+            logger.exception("Failed to fetch tile")
+            raise HTTPException(status_code=500, detail="Failed to fetch tile")
+        entry = await asyncio.to_thread(encode_body, tile, encoding)
+        if body_key is not None:
+            response_cache.put(body_key, entry)
+
+    body, content_encoding = entry
+    if content_encoding is not None:
+        headers["Content-Encoding"] = content_encoding
+    return Response(content=body, media_type=MVT_MEDIA_TYPE, headers=headers)
 
 
 @app.get(
@@ -96,4 +677,20 @@ async def get_network(
     response_description="Service status",
 )
 async def health():
-    return {"status": "ok"}
+    status = {
+        "status": "ok",
+        "db_pool": pool_status(engine),
+        "dataset_version": dataset_watcher.version,
+        "response_cache": {"entries": len(response_cache), "bytes": response_cache.size},
+        "network_requests": {
+            "in_flight": len(network_flights),
+            "coalesced": network_flights.coalesced,
+        },
+    }
+    if network_cache is not None:
+        status["network_cache"] = {
+            "tiles": len(network_cache),
+            "estimated_bytes": network_cache.size,
+            "shared_tile_loads": network_cache.shared_loads,
+        }
+    return status
@@ -0,0 +1,202 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import main
+from constants import NETWORK_LAYERS
+from network_binary import NETWORK_BINARY_MEDIA_TYPE
+from tiles import tile_bounds
+
+BBOX = {"min_lat": 51.89, "min_lng": -8.48, "max_lat": 51.91, "max_lng": -8.46}
+EMPTY = b'{"nodes": [], "links": [], "buildings": [], "transport_routes": []}'
+
+
+async def _stream_network(*args, **kwargs):
+    for layer in NETWORK_LAYERS:
+        yield layer, []
+
+
+def test_db_connections_header_is_left_off_streamed_responses(monkeypatch):
+    monkeypatch.setattr(main.repository, "stream_network", _stream_network)
+    client = TestClient(main.app)
+
+    assert client.get("/openapi.json").headers["X-DB-Connections"] == "0"
+    streamed = client.get("/network", params={**BBOX, "stream": "true"})
+    assert streamed.status_code == 200
+    assert "X-DB-Connections" not in streamed.headers
+
+
+def test_parse_subset():
+    assert main._parse_subset(None, NETWORK_LAYERS, "layers") is None
+    assert main._parse_subset(" nodes, ,links ", NETWORK_LAYERS, "layers") == ["nodes", "links"]
+    with pytest.raises(HTTPException) as error:
+        main._parse_subset("nodes,roads", NETWORK_LAYERS, "layers")
+    assert error.value.status_code == 400
+    assert error.value.detail == "Unknown layers: roads"
+
+
+def test_network_passes_filters_to_the_query(monkeypatch):
+    calls = []
+
+    async def fetch_network_json(*args, **kwargs):
+        calls.append(kwargs)
+        return EMPTY
+
+    monkeypatch.setattr(main.repository, "fetch_network_json", fetch_network_json)
+    client = TestClient(main.app)
+
+    response = client.get(
+        "/network", params={**BBOX, "layers": "buildings", "building_types": "retail,school"}
+    )
+
+    assert response.status_code == 200
+    assert calls[0]["layers"] == ["buildings"]
+    assert calls[0]["building_types"] == ["retail", "school"]
+
+
+def test_network_rejects_unknown_building_types():
+    response = TestClient(main.app).get("/network", params={**BBOX, "building_types": "castle"})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown building types: castle"
+
+
+def test_filtered_requests_skip_the_tile_cache(monkeypatch):
+    class Cache:
+        def covers(self, *args):
+            return True
+
+        async def get_network(self, *args):
+            raise AssertionError("filtered request read the tile cache")
+
+    async def fetch_network_json(*args, **kwargs):
+        return EMPTY
+
+    monkeypatch.setattr(main, "network_cache", Cache())
+    monkeypatch.setattr(main.repository, "fetch_network_json", fetch_network_json)
+
+    response = TestClient(main.app).get("/network", params={**BBOX, "layers": "nodes"})
+
+    assert response.status_code == 200
+
+
+def test_parse_known_boxes_and_tiles():
+    areas = main._parse_known(" 51.89,-8.48,51.9,-8.47 ; 14/7806/5419;")
+
+    assert areas == [(51.89, -8.48, 51.9, -8.47), tile_bounds(14, 7806, 5419)]
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "",
+        " ; ",
+        "51.89,-8.48,51.9",
+        "51.9,-8.48,51.89,-8.47",
+        "a,b,c,d",
+        "14/7806",
+        "14/99999/0",
+        "x/1/1",
+    ],
+)
+def test_parse_known_rejects_bad_areas(value):
+    with pytest.raises(HTTPException) as error:
+        main._parse_known(value)
+
+    assert error.value.status_code == 400
+
+
+def test_parse_known_limits_the_number_of_areas():
+    value = ";".join(["0/0/0"] * (main.MAX_KNOWN_AREAS + 1))
+
+    with pytest.raises(HTTPException) as error:
+        main._parse_known(value)
+
+    assert "limited" in error.value.detail
+
+
+def test_media_type_prefers_format_then_accept():
+    accept = f"{NETWORK_BINARY_MEDIA_TYPE}, application/json"
+
+    assert main._media_type("json", accept, main.NETWORK_MEDIA_TYPES) == "application/json"
+    assert main._media_type(None, accept, main.DELTA_MEDIA_TYPES) == NETWORK_BINARY_MEDIA_TYPE
+    assert main._media_type(None, main.NDJSON_MEDIA_TYPE, main.DELTA_MEDIA_TYPES) == (
+        "application/json"
+    )
+
+
+def test_delta_shares_the_network_etag_and_filters(monkeypatch):
+    calls = []
+
+    async def fetch_network_json(*args, **kwargs):
+        calls.append(kwargs)
+        return EMPTY
+
+    monkeypatch.setattr(main.repository, "fetch_network_json", fetch_network_json)
+    monkeypatch.setattr(main.dataset_watcher, "version", 7)
+    client = TestClient(main.app)
+    params = {**BBOX, "known": "51.89,-8.48,51.9,-8.47", "layers": "links"}
+
+    response = client.get("/network/delta", params=params)
+    revalidated = client.get(
+        "/network/delta", params=params, headers={"If-None-Match": response.headers["ETag"]}
+    )
+
+    assert response.content == EMPTY and revalidated.status_code == 304
+    assert len(calls) == 1 and calls[0]["layers"] == ["links"]
+    assert calls[0]["known"] == [(51.89, -8.48, 51.9, -8.47)]
+    assert response.headers["ETag"] != client.get("/network", params=BBOX).headers["ETag"]
+
+
+async def _rows(*rows):
+    for row in rows:
+        yield row
+
+
+def _chunks(rows, ndjson: bool) -> bytes:
+    async def collect():
+        return b"".join([chunk async for chunk in main._network_chunks(_rows(*rows), ndjson)])
+
+    return asyncio.run(collect())
+
+
+def test_network_chunks_join_batches_into_one_json_document():
+    rows = [
+        ("nodes", [b'{"id":1}']),
+        ("nodes", [b'{"id":2}', b'{"id":3}']),
+        ("links", []),
+        ("buildings", [b'{"id":4}']),
+        ("transport_routes", []),
+    ]
+
+    body = json.loads(_chunks(rows, ndjson=False))
+
+    assert body == {
+        "nodes": [{"id": 1}, {"id": 2}, {"id": 3}],
+        "links": [],
+        "buildings": [{"id": 4}],
+        "transport_routes": [],
+    }
+
+
+def test_network_chunks_write_one_ndjson_line_per_feature():
+    rows = [("nodes", [b'{"id":1}', b'{"id":2}']), ("links", []), ("buildings", [b'{"id":4}'])]
+
+    lines = _chunks(rows, ndjson=True).decode().splitlines()
+
+    assert [json.loads(line) for line in lines] == [
+        {"layer": "nodes", "feature": {"id": 1}},
+        {"layer": "nodes", "feature": {"id": 2}},
+        {"layer": "buildings", "feature": {"id": 4}},
+    ]
+
+
+def test_streamed_network_is_valid_json(monkeypatch):
+    monkeypatch.setattr(main.repository, "stream_network", _stream_network)
+
+    response = TestClient(main.app).get("/network", params={**BBOX, "stream": "true"})
+
+    assert response.json() == {layer: [] for layer in NETWORK_LAYERS}
@@ -0,0 +1,11 @@
+-- Partial spatial indexes for the building types served by /network; the
+-- planner uses them for `type = ANY(...)` filters on those types
+CREATE INDEX IF NOT EXISTS idx_buildings_geom_served ON buildings USING GIST (geom)
+    WHERE type IN ('apartments', 'kindergarten', 'parking', 'retail', 'school', 'supermarket');
+
+CREATE INDEX IF NOT EXISTS idx_buildings_geom_apartments ON buildings USING GIST (geom) WHERE type = 'apartments';
+CREATE INDEX IF NOT EXISTS idx_buildings_geom_kindergarten ON buildings USING GIST (geom) WHERE type = 'kindergarten';
+CREATE INDEX IF NOT EXISTS idx_buildings_geom_parking ON buildings USING GIST (geom) WHERE type = 'parking';
+CREATE INDEX IF NOT EXISTS idx_buildings_geom_retail ON buildings USING GIST (geom) WHERE type = 'retail';
+CREATE INDEX IF NOT EXISTS idx_buildings_geom_school ON buildings USING GIST (geom) WHERE type = 'school';
+CREATE INDEX IF NOT EXISTS idx_buildings_geom_supermarket ON buildings USING GIST (geom) WHERE type = 'supermarket';
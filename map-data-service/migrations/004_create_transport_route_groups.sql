@@ -0,0 +1,39 @@
+-- Transport routes merged per route group (all eight tag columns), so that
+-- /network reads them with an indexed intersect instead of running
+-- ST_LineMerge(ST_Collect(...)) per request. Rebuilt after every OSM import by
+-- refresh_transport_route_groups().
+CREATE TABLE IF NOT EXISTS transport_route_groups (
+    id BIGINT PRIMARY KEY,
+    colour TEXT,
+    "from" TEXT,
+    name TEXT,
+    network TEXT,
+    operator TEXT,
+    ref TEXT,
+    route TEXT,
+    "to" TEXT,
+    geom GEOMETRY(MULTILINESTRING, 4326) NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_transport_route_groups_geom
+    ON transport_route_groups USING GIST (geom);
+
+CREATE OR REPLACE FUNCTION refresh_transport_route_groups() RETURNS void AS $$
+BEGIN
+    -- DELETE rather than TRUNCATE so readers keep seeing the old rows until
+    -- the refreshing transaction commits
+    DELETE FROM transport_route_groups;
+    INSERT INTO transport_route_groups
+        (id, colour, "from", name, network, operator, ref, route, "to", geom)
+    SELECT id, colour, "from", name, network, operator, ref, route, "to", ST_Multi(merged)
+    FROM (
+        SELECT MIN(id) AS id, colour, "from", name, network, operator, ref, route, "to",
+               ST_LineMerge(ST_Collect(geom)) AS merged
+        FROM transport_routes
+        GROUP BY colour, "from", name, network, operator, ref, route, "to"
+    ) groups
+    WHERE GeometryType(merged) IN ('LINESTRING', 'MULTILINESTRING');
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT refresh_transport_route_groups();
@@ -0,0 +1,67 @@
+-- Node lists of links and source relations of route rows, so that OSM change
+-- files can be applied without reloading everything
+ALTER TABLE links ADD COLUMN IF NOT EXISTS node_ids BIGINT[];
+CREATE INDEX IF NOT EXISTS idx_links_node_ids ON links USING GIN (node_ids);
+
+ALTER TABLE transport_routes ADD COLUMN IF NOT EXISTS relation_id BIGINT;
+CREATE INDEX IF NOT EXISTS idx_transport_routes_relation_id ON transport_routes (relation_id);
+CREATE INDEX IF NOT EXISTS idx_transport_routes_way_id ON transport_routes (way_id);
+
+-- One row per data change; `extent` covers the changed features, NULL means
+-- everything may have changed (full import). The latest version is the
+-- current dataset version.
+CREATE TABLE IF NOT EXISTS dataset_versions (
+    version BIGINT PRIMARY KEY,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    extent GEOMETRY(GEOMETRY, 4326)
+);
+
+INSERT INTO dataset_versions (version, extent) VALUES (1, NULL) ON CONFLICT DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_dataset_version(changed GEOMETRY) RETURNS BIGINT AS $$
+DECLARE
+    next_version BIGINT;
+BEGIN
+    LOCK TABLE dataset_versions IN EXCLUSIVE MODE;
+    INSERT INTO dataset_versions (version, extent)
+    SELECT COALESCE(MAX(version), 0) + 1, changed FROM dataset_versions
+    RETURNING version INTO next_version;
+    RETURN next_version;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Rebuild only the route groups with members in `area`, before or after the
+-- change
+CREATE OR REPLACE FUNCTION refresh_transport_route_groups_in(area GEOMETRY) RETURNS void AS $$
+BEGIN
+    CREATE TEMP TABLE affected_route_groups ON COMMIT DROP AS
+        SELECT colour, "from", name, network, operator, ref, route, "to"
+        FROM transport_routes WHERE geom && area
+        UNION
+        SELECT colour, "from", name, network, operator, ref, route, "to"
+        FROM transport_route_groups WHERE geom && area;
+
+    DELETE FROM transport_route_groups g
+    USING affected_route_groups a
+    WHERE (g.colour, g."from", g.name, g.network, g.operator, g.ref, g.route, g."to")
+          IS NOT DISTINCT FROM
+          (a.colour, a."from", a.name, a.network, a.operator, a.ref, a.route, a."to");
+
+    INSERT INTO transport_route_groups
+        (id, colour, "from", name, network, operator, ref, route, "to", geom)
+    SELECT id, colour, "from", name, network, operator, ref, route, "to", ST_Multi(merged)
+    FROM (
+        SELECT MIN(t.id) AS id, t.colour, t."from", t.name, t.network, t.operator,
+               t.ref, t.route, t."to", ST_LineMerge(ST_Collect(t.geom)) AS merged
+        FROM transport_routes t
+        JOIN affected_route_groups a
+          ON (t.colour, t."from", t.name, t.network, t.operator, t.ref, t.route, t."to")
+             IS NOT DISTINCT FROM
+             (a.colour, a."from", a.name, a.network, a.operator, a.ref, a.route, a."to")
+        GROUP BY t.colour, t."from", t.name, t.network, t.operator, t.ref, t.route, t."to"
+    ) groups
+    WHERE GeometryType(merged) IN ('LINESTRING', 'MULTILINESTRING');
+
+    DROP TABLE affected_route_groups;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,4 @@
+-- Outline node lists of buildings from closed ways, so that change files
+-- moving a building's nodes without touching its way can redraw it
+ALTER TABLE buildings ADD COLUMN IF NOT EXISTS node_ids BIGINT[];
+CREATE INDEX IF NOT EXISTS idx_buildings_node_ids ON buildings USING GIN (node_ids);
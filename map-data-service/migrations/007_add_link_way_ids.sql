@@ -0,0 +1,6 @@
+-- Links are ways split at the nodes they share with other highway ways; each
+-- segment keeps the id of its way, so that change files can rewrite a way's
+-- segments together
+ALTER TABLE links ADD COLUMN IF NOT EXISTS way_id BIGINT;
+UPDATE links SET way_id = id WHERE way_id IS NULL;
+CREATE INDEX IF NOT EXISTS idx_links_way_id ON links (way_id);
@@ -0,0 +1,258 @@
+import struct
+import sys
+from array import array
+
+from models import Building, NetworkResponse, TrafficLink, TrafficNode, TransportRoute
+
+NETWORK_BINARY_MEDIA_TYPE = "application/vnd.trafficjam.network"
+MAGIC = b"TJNB"
+VERSION = 1
+COORDINATE_SCALE = 1_000_000
+
+COLUMNS = (
+    ("strings.offsets", "I"),
+    ("strings.data", "B"),
+    ("nodes.id", "q"),
+    ("nodes.position", "i"),
+    ("nodes.connection_count", "I"),
+    ("links.id", "q"),
+    ("links.from_node", "q"),
+    ("links.to_node", "q"),
+    ("links.geometry_offsets", "I"),
+    ("links.geometry", "i"),
+    ("links.tag_offsets", "I"),
+    ("links.tags", "I"),
+    ("buildings.id", "q"),
+    ("buildings.position", "i"),
+    ("buildings.type", "i"),
+    ("buildings.geometry_offsets", "I"),
+    ("buildings.geometry", "i"),
+    ("buildings.tag_offsets", "I"),
+    ("buildings.tags", "I"),
+    ("transport_routes.id", "q"),
+    ("transport_routes.line_offsets", "I"),
+    ("transport_routes.geometry_offsets", "I"),
+    ("transport_routes.geometry", "i"),
+    ("transport_routes.tag_offsets", "I"),
+    ("transport_routes.tags", "I"),
+)
+
+_HEADER = struct.Struct("<4sIII")
+_COLUMN = struct.Struct("<IB3xII")
+
+
+def _pad(n: int) -> int:
+    return -n % 8
+
+
+class _Strings:
+    def __init__(self):
+        self.index: dict[str, int] = {}
+
+    def __call__(self, value: str) -> int:
+        return self.index.setdefault(value, len(self.index))
+
+    def columns(self) -> tuple[array, array]:
+        offsets, data = array("I", [0]), bytearray()
+        for value in self.index:
+            data += value.encode()
+            offsets.append(len(data))
+        return offsets, array("B", data)
+
+
+class _Coordinates:
+    def __init__(self):
+        self.values = array("i")
+        self.offsets = array("I", [0])
+        self._last = (0, 0)
+
+    def add(self, lng: float, lat: float) -> None:
+        x, y = round(lng * COORDINATE_SCALE), round(lat * COORDINATE_SCALE)
+        self.values.extend((x - self._last[0], y - self._last[1]))
+        self._last = (x, y)
+
+    def add_line(self, points) -> None:
+        for point in points:
+            self.add(*point)
+        self.offsets.append(len(self.values) // 2)
+
+
+class _Tags:
+    def __init__(self, strings: _Strings):
+        self.strings = strings
+        self.values = array("I")
+        self.offsets = array("I", [0])
+
+    def add(self, tags: dict[str, str]) -> None:
+        for key, value in tags.items():
+            self.values.extend((self.strings(key), self.strings(value)))
+        self.offsets.append(len(self.values) // 2)
+
+
+def encode_network(network: NetworkResponse) -> bytes:
+    strings = _Strings()
+    columns: dict[str, array] = {}
+
+    positions = _Coordinates()
+    for node in network.nodes:
+        positions.add(*node.position)
+    columns["nodes.id"] = array("q", (n.id for n in network.nodes))
+    columns["nodes.position"] = positions.values
+    columns["nodes.connection_count"] = array(
+        "I", (n.connection_count for n in network.nodes)
+    )
+
+    geometry, tags = _Coordinates(), _Tags(strings)
+    for link in network.links:
+        geometry.add_line(link.geometry)
+        tags.add(link.tags)
+    columns["links.id"] = array("q", (link.id for link in network.links))
+    columns["links.from_node"] = array("q", (link.from_node for link in network.links))
+    columns["links.to_node"] = array("q", (link.to_node for link in network.links))
+    columns["links.geometry_offsets"] = geometry.offsets
+    columns["links.geometry"] = geometry.values
+    columns["links.tag_offsets"] = tags.offsets
+    columns["links.tags"] = tags.values
+
+    positions, geometry, tags = _Coordinates(), _Coordinates(), _Tags(strings)
+    for building in network.buildings:
+        positions.add(*building.position)
+        geometry.add_line(building.geometry)
+        tags.add(building.tags)
+    columns["buildings.id"] = array("q", (b.id for b in network.buildings))
+    columns["buildings.position"] = positions.values
+    columns["buildings.type"] = array(
+        "i", (-1 if b.type is None else strings(b.type) for b in network.buildings)
+    )
+    columns["buildings.geometry_offsets"] = geometry.offsets
+    columns["buildings.geometry"] = geometry.values
+    columns["buildings.tag_offsets"] = tags.offsets
+    columns["buildings.tags"] = tags.values
+
+    geometry, tags = _Coordinates(), _Tags(strings)
+    line_offsets = array("I", [0])
+    for route in network.transport_routes:
+        for line in route.geometry:
+            geometry.add_line(line)
+        line_offsets.append(len(geometry.offsets) - 1)
+        tags.add(route.tags)
+    columns["transport_routes.id"] = array("q", (r.id for r in network.transport_routes))
+    columns["transport_routes.line_offsets"] = line_offsets
+    columns["transport_routes.geometry_offsets"] = geometry.offsets
+    columns["transport_routes.geometry"] = geometry.values
+    columns["transport_routes.tag_offsets"] = tags.offsets
+    columns["transport_routes.tags"] = tags.values
+
+    columns["strings.offsets"], columns["strings.data"] = strings.columns()
+
+    out = bytearray(_HEADER.pack(MAGIC, VERSION, COORDINATE_SCALE, len(COLUMNS)))
+    for name, dtype in COLUMNS:
+        values = columns[name]
+        if sys.byteorder == "big":
+            values = array(dtype, values)
+            values.byteswap()
+        encoded_name = name.encode("ascii")
+        out += _COLUMN.pack(len(encoded_name), ord(dtype), len(values), 0)
+        out += encoded_name + bytes(_pad(len(encoded_name)))
+        data = values.tobytes()
+        out += data + bytes(_pad(len(data)))
+    return bytes(out)
+
+
+def _read_columns(data: bytes) -> tuple[int, dict[str, array]]:
+    magic, version, scale, count = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a version 1 binary network")
+    offset = _HEADER.size
+    columns = {}
+    for _ in range(count):
+        name_len, dtype, length, _ = _COLUMN.unpack_from(data, offset)
+        offset += _COLUMN.size
+        name = data[offset : offset + name_len].decode("ascii")
+        offset += name_len + _pad(name_len)
+        values = array(chr(dtype))
+        size = length * values.itemsize
+        values.frombytes(data[offset : offset + size])
+        if sys.byteorder == "big":
+            values.byteswap()
+        columns[name] = values
+        offset += size + _pad(size)
+    return scale, columns
+
+
+def _points(values: array, scale: int) -> list[tuple[float, float]]:
+    points, x, y = [], 0, 0
+    for i in range(0, len(values), 2):
+        x += values[i]
+        y += values[i + 1]
+        points.append((x / scale, y / scale))
+    return points
+
+
+def decode_network(data: bytes) -> NetworkResponse:
+    scale, c = _read_columns(data)
+    string_offsets, string_data = c["strings.offsets"], c["strings.data"].tobytes()
+    strings = [
+        string_data[string_offsets[i] : string_offsets[i + 1]].decode()
+        for i in range(len(string_offsets) - 1)
+    ]
+
+    def tags(layer: str, row: int) -> dict[str, str]:
+        offsets, pairs = c[f"{layer}.tag_offsets"], c[f"{layer}.tags"]
+        return {
+            strings[pairs[2 * i]]: strings[pairs[2 * i + 1]]
+            for i in range(offsets[row], offsets[row + 1])
+        }
+
+    def lines(layer: str) -> list[list[tuple[float, float]]]:
+        points = _points(c[f"{layer}.geometry"], scale)
+        offsets = c[f"{layer}.geometry_offsets"]
+        return [points[offsets[i] : offsets[i + 1]] for i in range(len(offsets) - 1)]
+
+    node_positions = _points(c["nodes.position"], scale)
+    nodes = [
+        TrafficNode(id=node_id, position=position, connection_count=connections)
+        for node_id, position, connections in zip(
+            c["nodes.id"], node_positions, c["nodes.connection_count"]
+        )
+    ]
+
+    link_lines = lines("links")
+    links = [
+        TrafficLink(
+            id=c["links.id"][i],
+            from_node=c["links.from_node"][i],
+            to_node=c["links.to_node"][i],
+            geometry=link_lines[i],
+            tags=tags("links", i),
+        )
+        for i in range(len(c["links.id"]))
+    ]
+
+    building_positions = _points(c["buildings.position"], scale)
+    building_lines = lines("buildings")
+    buildings = [
+        Building(
+            id=c["buildings.id"][i],
+            position=building_positions[i],
+            geometry=building_lines[i],
+            type=strings[c["buildings.type"][i]] if c["buildings.type"][i] >= 0 else None,
+            tags=tags("buildings", i),
+        )
+        for i in range(len(c["buildings.id"]))
+    ]
+
+    route_lines = lines("transport_routes")
+    line_offsets = c["transport_routes.line_offsets"]
+    routes = [
+        TransportRoute(
+            id=c["transport_routes.id"][i],
+            geometry=route_lines[line_offsets[i] : line_offsets[i + 1]],
+            tags=tags("transport_routes", i),
+        )
+        for i in range(len(c["transport_routes.id"]))
+    ]
+
+    return NetworkResponse(
+        nodes=nodes, links=links, buildings=buildings, transport_routes=routes
+    )
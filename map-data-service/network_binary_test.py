@@ -0,0 +1,79 @@
+import pytest
+
+from models import Building, NetworkResponse, TrafficLink, TrafficNode, TransportRoute
+from network_binary import COORDINATE_SCALE, decode_network, encode_network
+
+NETWORK = NetworkResponse(
+    nodes=[
+        TrafficNode(id=1, position=(-8.4701234, 51.8987654), connection_count=1),
+        TrafficNode(id=2**40, position=(-8.461, 51.902), connection_count=3),
+    ],
+    links=[
+        TrafficLink(
+            id=10,
+            from_node=1,
+            to_node=2**40,
+            geometry=[(-8.4701234, 51.8987654), (-8.465, 51.9), (-8.461, 51.902)],
+            tags={"highway": "residential", "name": "Sráid an Phápa"},
+        ),
+        TrafficLink(id=11, from_node=2**40, to_node=1, geometry=[(-8.461, 51.902), (-8.47, 51.899)], tags={}),
+    ],
+    buildings=[
+        Building(
+            id=20,
+            position=(-8.4655, 51.9005),
+            geometry=[(-8.466, 51.9), (-8.465, 51.9), (-8.465, 51.901), (-8.466, 51.9)],
+            type="retail",
+            tags={"building": "retail", "shop": "bakery"},
+        ),
+        Building(id=21, position=(-8.46, 51.89), geometry=[], type=None, tags={"building": "yes"}),
+    ],
+    transport_routes=[
+        TransportRoute(
+            id=30,
+            geometry=[[(-8.47, 51.9), (-8.46, 51.9)], [(-8.46, 51.9), (-8.45, 51.91)]],
+            tags={"route": "bus", "ref": "208"},
+        ),
+        TransportRoute(id=31, geometry=[], tags={"route": "tram"}),
+    ],
+)
+
+
+def _rounded(network: NetworkResponse) -> dict:
+    def point(p):
+        return tuple(round(v * COORDINATE_SCALE) for v in p)
+
+    data = network.model_dump()
+    for node in data["nodes"]:
+        node["position"] = point(node["position"])
+    for feature in (*data["links"], *data["buildings"]):
+        feature["geometry"] = [point(p) for p in feature["geometry"]]
+    for building in data["buildings"]:
+        building["position"] = point(building["position"])
+    for route in data["transport_routes"]:
+        route["geometry"] = [[point(p) for p in line] for line in route["geometry"]]
+    return data
+
+
+def test_round_trip():
+    decoded = decode_network(encode_network(NETWORK))
+
+    assert _rounded(decoded) == _rounded(NETWORK)
+
+
+def test_round_trip_of_an_empty_network():
+    empty = NetworkResponse(nodes=[], links=[], buildings=[], transport_routes=[])
+
+    assert decode_network(encode_network(empty)) == empty
+
+
+def test_blocks_are_eight_byte_aligned():
+    assert len(encode_network(NETWORK)) % 8 == 0
+
+
+def test_rejects_other_formats():
+    data = bytearray(encode_network(NETWORK))
+    data[:4] = b"NOPE"
+
+    with pytest.raises(ValueError):
+        decode_network(bytes(data))
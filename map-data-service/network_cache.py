@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import logging
+import os
+import shutil
+import zlib
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterable
+from pathlib import Path
+
+from pydantic import ValidationError
+
+from constants import DETAIL_ZOOM
+from models import Building, NetworkResponse, TrafficLink, TrafficNode, TransportRoute
+from single_flight import SingleFlight
+from tiles import tile_bounds, tiles_covering
+
+logger = logging.getLogger(__name__)
+
+TileKey = tuple[int, int, int, int]
+BBox = tuple[float, float, float, float]
+FetchBBox = Callable[[float, float, float, float, int], Awaitable[NetworkResponse]]
+
+MAX_CONCURRENT_TILE_FETCHES = 2
+
+MAX_INVALIDATED_TILES = 50_000
+
+FEATURE_BYTES = 600
+COORDINATE_BYTES = 120
+
+
+def tile_size(tile: NetworkResponse) -> int:
+    coordinates = (
+        len(tile.nodes)
+        + sum(len(link.geometry) for link in tile.links)
+        + sum(len(building.geometry) + 1 for building in tile.buildings)
+        + sum(len(line) for route in tile.transport_routes for line in route.geometry)
+    )
+    features = len(tile.nodes) + len(tile.links) + len(tile.buildings) + len(tile.transport_routes)
+    return features * FEATURE_BYTES + coordinates * COORDINATE_BYTES
+
+
+def _in_bbox(lng: float, lat: float, bbox: tuple[float, float, float, float]) -> bool:
+    min_lat, min_lng, max_lat, max_lng = bbox
+    return min_lat <= lat <= max_lat and min_lng <= lng <= max_lng
+
+
+def _envelope_hits(
+    points: Iterable[tuple[float, float]], bbox: tuple[float, float, float, float]
+) -> bool:
+    lngs, lats = zip(*points)
+    min_lat, min_lng, max_lat, max_lng = bbox
+    return (
+        min(lngs) <= max_lng
+        and max(lngs) >= min_lng
+        and min(lats) <= max_lat
+        and max(lats) >= min_lat
+    )
+
+
+def _merge_route(
+    routes: dict[tuple, TransportRoute],
+    route: TransportRoute,
+    bbox: tuple[float, float, float, float],
+) -> None:
+    key = tuple(sorted(route.tags.items()))
+    lines = [line for line in route.geometry if _envelope_hits(line, bbox)]
+    if not lines:
+        return
+    existing = routes.get(key)
+    if existing is None:
+        routes[key] = route.model_copy(update={"geometry": lines})
+        return
+    merged = existing.geometry + [g for g in lines if g not in existing.geometry]
+    routes[key] = existing.model_copy(
+        update={"id": min(existing.id, route.id), "geometry": merged}
+    )
+
+
+def merge_tiles(
+    tiles: Iterable[NetworkResponse], bbox: tuple[float, float, float, float]
+) -> NetworkResponse:
+    nodes: dict[int, TrafficNode] = {}
+    links: dict[int, TrafficLink] = {}
+    buildings: dict[int, Building] = {}
+    routes: dict[tuple, TransportRoute] = {}
+
+    for tile in tiles:
+        for node in tile.nodes:
+            if node.id not in nodes and _in_bbox(*node.position, bbox):
+                nodes[node.id] = node
+        for link in tile.links:
+            if link.id not in links and _envelope_hits(link.geometry, bbox):
+                links[link.id] = link
+        for building in tile.buildings:
+            if building.id not in buildings and _in_bbox(*building.position, bbox):
+                buildings[building.id] = building
+        for route in tile.transport_routes:
+            _merge_route(routes, route, bbox)
+
+    return NetworkResponse(
+        nodes=list(nodes.values()),
+        links=list(links.values()),
+        buildings=list(buildings.values()),
+        transport_routes=list(routes.values()),
+    )
+
+
+class NetworkTileCache:
+    def __init__(
+        self,
+        fetch_bbox: FetchBBox,
+        zoom: int,
+        max_tiles: int,
+        max_bytes: int,
+        disk_dir: str | Path | None = None,
+    ):
+        self.fetch_bbox = fetch_bbox
+        self.zoom = zoom
+        self.max_tiles = max_tiles
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self._memory: OrderedDict[TileKey, tuple[NetworkResponse, int]] = OrderedDict()
+        self._loads: SingleFlight[NetworkResponse] = SingleFlight()
+        self._fetch_slots = asyncio.Semaphore(MAX_CONCURRENT_TILE_FETCHES)
+        self._generation = 0
+
+    def _disk_path(self, key: TileKey) -> Path:
+        lod, z, x, y = key
+        return self.disk_dir / f"lod{lod}" / str(z) / str(x) / f"{y}.json.gz"
+
+    def _read_disk(self, key: TileKey) -> NetworkResponse | None:
+        path = self._disk_path(key)
+        try:
+            return NetworkResponse.model_validate_json(gzip.decompress(path.read_bytes()))
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, zlib.error, ValidationError):
+            logger.warning(f"Discarding unreadable cached tile {path}")
+            path.unlink(missing_ok=True)
+            return None
+
+    def _write_disk(self, key: TileKey, tile: NetworkResponse) -> None:
+        path = self._disk_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(gzip.compress(tile.model_dump_json().encode()))
+        os.replace(tmp, path)
+
+    def _forget(self, key: TileKey) -> None:
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def _remember(self, key: TileKey, tile: NetworkResponse) -> None:
+        size = tile_size(tile)
+        if size > self.max_bytes:
+            return
+        self._forget(key)
+        self._memory[key] = (tile, size)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (_, evicted) = self._memory.popitem(last=False)
+            self.size -= evicted
+
+    async def _tile(self, key: TileKey) -> NetworkResponse:
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            return entry[0]
+        return await self._loads.run((self._generation, key), lambda: self._load(key))
+
+    async def _load(self, key: TileKey) -> NetworkResponse:
+        generation = self._generation
+        tile = None
+        if self.disk_dir is not None:
+            tile = await asyncio.to_thread(self._read_disk, key)
+
+        if tile is None:
+            async with self._fetch_slots:
+                lod, z, x, y = key
+                tile = await self.fetch_bbox(*tile_bounds(z, x, y), lod)
+            if self.disk_dir is not None and generation == self._generation:
+                await asyncio.to_thread(self._write_disk, key, tile)
+
+        if generation == self._generation:
+            self._remember(key, tile)
+        return tile
+
+    def _keys(
+        self, min_lat: float, min_lng: float, max_lat: float, max_lng: float, lod: int
+    ) -> list[TileKey]:
+        z = min(self.zoom, lod)
+        return [
+            (lod, z, x, y)
+            for x, y in tiles_covering(min_lat, min_lng, max_lat, max_lng, z)
+        ]
+
+    def covers(
+        self, min_lat: float, min_lng: float, max_lat: float, max_lng: float, lod: int
+    ) -> bool:
+        return len(self._keys(min_lat, min_lng, max_lat, max_lng, lod)) <= self.max_tiles
+
+    async def get_network(
+        self, min_lat: float, min_lng: float, max_lat: float, max_lng: float, lod: int
+    ) -> NetworkResponse:
+        keys = self._keys(min_lat, min_lng, max_lat, max_lng, lod)
+        tiles = await asyncio.gather(*(self._tile(key) for key in keys))
+        return merge_tiles(tiles, (min_lat, min_lng, max_lat, max_lng))
+
+    def invalidate(self, extents: list[BBox] | None) -> None:
+        self._generation += 1
+        if extents is not None:
+            keys = {
+                key
+                for extent in extents
+                for lod in range(DETAIL_ZOOM + 1)
+                for key in self._keys(*extent, lod)
+            }
+        if extents is None or len(keys) > MAX_INVALIDATED_TILES:
+            self.clear()
+            if self.disk_dir is not None and self.disk_dir.exists():
+                for child in self.disk_dir.iterdir():
+                    if child.is_dir():
+                        shutil.rmtree(child, ignore_errors=True)
+            return
+
+        for key in keys:
+            self._forget(key)
+            if self.disk_dir is not None:
+                self._disk_path(key).unlink(missing_ok=True)
+        logger.info(f"Invalidated up to {len(keys)} cached tiles")
+
+    def stored_version(self) -> int | None:
+        if self.disk_dir is None:
+            return None
+        try:
+            return int((self.disk_dir / "VERSION").read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def mark_version(self, version: int) -> None:
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            (self.disk_dir / "VERSION").write_text(str(version))
+
+    def clear(self) -> None:
+        self._memory.clear()
+        self.size = 0
+
+    @property
+    def shared_loads(self) -> int:
+        return self._loads.coalesced
+
+    def __len__(self) -> int:
+        return len(self._memory)
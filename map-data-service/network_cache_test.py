@@ -0,0 +1,153 @@
+import asyncio
+import gzip
+
+from models import Building, NetworkResponse, TrafficLink, TrafficNode, TransportRoute
+from network_cache import NetworkTileCache, merge_tiles, tile_size
+from tiles import tile_bounds
+
+BBOX = (51.89, -8.48, 51.91, -8.46)
+EMPTY = NetworkResponse(nodes=[], links=[], buildings=[], transport_routes=[])
+
+
+def node(node_id: int, lng: float, lat: float) -> TrafficNode:
+    return TrafficNode(id=node_id, position=(lng, lat), connection_count=1)
+
+
+def link(link_id: int, *points: tuple[float, float]) -> TrafficLink:
+    return TrafficLink(id=link_id, from_node=1, to_node=2, geometry=list(points), tags={})
+
+
+def route(route_id: int, *lines: list[tuple[float, float]]) -> TransportRoute:
+    return TransportRoute(id=route_id, geometry=list(lines), tags={"route": "bus", "ref": "208"})
+
+
+def test_merge_drops_duplicates_and_features_outside_the_bbox():
+    inside, outside = node(1, -8.47, 51.9), node(2, -8.40, 51.9)
+    crossing = link(10, (-8.50, 51.9), (-8.47, 51.9))
+    away = link(11, (-8.40, 51.9), (-8.39, 51.9))
+    building = Building(id=20, position=(-8.47, 51.9), geometry=[], tags={})
+    tile = EMPTY.model_copy(
+        update={"nodes": [inside, outside], "links": [crossing, away], "buildings": [building]}
+    )
+
+    merged = merge_tiles([tile, tile], BBOX)
+
+    assert [n.id for n in merged.nodes] == [1]
+    assert [lk.id for lk in merged.links] == [10]
+    assert [b.id for b in merged.buildings] == [20]
+
+
+def test_merge_joins_route_copies_from_several_tiles():
+    west = [(-8.48, 51.9), (-8.47, 51.9)]
+    east = [(-8.47, 51.9), (-8.46, 51.9)]
+    elsewhere = [(-8.30, 51.9), (-8.29, 51.9)]
+    tiles = [
+        EMPTY.model_copy(update={"transport_routes": [route(7, west, elsewhere)]}),
+        EMPTY.model_copy(update={"transport_routes": [route(5, west, east)]}),
+    ]
+
+    [merged] = merge_tiles(tiles, BBOX).transport_routes
+
+    assert merged.id == 5
+    assert merged.geometry == [west, east]
+
+
+def test_tile_size_grows_with_features_and_coordinates():
+    small = EMPTY.model_copy(update={"nodes": [node(1, 0, 0)]})
+    large = small.model_copy(update={"links": [link(10, (0, 0), (1, 1), (2, 2))]})
+
+    assert 0 < tile_size(small) < tile_size(large)
+    assert tile_size(EMPTY) == 0
+
+
+class Fetcher:
+    def __init__(self):
+        self.calls: list[tuple] = []
+
+    async def __call__(self, min_lat, min_lng, max_lat, max_lng, lod):
+        self.calls.append((min_lat, min_lng, max_lat, max_lng, lod))
+        await asyncio.sleep(0)
+        return EMPTY.model_copy(update={"nodes": [node(len(self.calls), 0, 0)]})
+
+
+def make_cache(fetch, **kwargs) -> NetworkTileCache:
+    options = {"zoom": 14, "max_tiles": 64, "max_bytes": 1 << 20, **kwargs}
+    return NetworkTileCache(fetch, **options)
+
+
+def test_tiles_are_fetched_once_and_shared():
+    fetch = Fetcher()
+
+    async def main():
+        cache = make_cache(fetch)
+        await asyncio.gather(*(cache.get_network(*BBOX, 15) for _ in range(3)))
+        await cache.get_network(*BBOX, 15)
+        return cache
+
+    cache = asyncio.run(main())
+
+    assert len(fetch.calls) == len(cache) > 0
+    assert cache.shared_loads > 0
+
+
+def test_memory_is_bounded_by_estimated_size():
+    fetch = Fetcher()
+    one_tile = tile_size(EMPTY.model_copy(update={"nodes": [node(1, 0, 0)]}))
+
+    async def main():
+        cache = make_cache(fetch, max_bytes=2 * one_tile)
+        await cache.get_network(*BBOX, 15)
+        return cache
+
+    cache = asyncio.run(main())
+
+    assert len(fetch.calls) > 2
+    assert len(cache) == 2
+    assert cache.size == 2 * one_tile
+
+
+def test_invalidate_drops_only_overlapping_tiles():
+    fetch = Fetcher()
+    far = (51.5, -9.5, 51.51, -9.49)
+
+    async def main():
+        cache = make_cache(fetch)
+        await cache.get_network(*BBOX, 15)
+        await cache.get_network(*far, 15)
+        cached = len(cache)
+        cache.invalidate([far])
+        return cache, cached
+
+    cache, cached = asyncio.run(main())
+
+    assert 0 < len(cache) < cached
+    fetched = len(fetch.calls)
+    asyncio.run(cache.get_network(*BBOX, 15))
+    assert len(fetch.calls) == fetched
+
+    cache.invalidate(None)
+    assert len(cache) == 0 and cache.size == 0
+
+
+def test_disk_tier_survives_restarts_and_discards_bad_files(tmp_path):
+    fetch = Fetcher()
+    z, x, y = 14, 7806, 5419
+    bbox = tile_bounds(z, x, y)
+    inner = (bbox[0] + 1e-4, bbox[1] + 1e-4, bbox[2] - 1e-4, bbox[3] - 1e-4)
+
+    asyncio.run(make_cache(fetch, disk_dir=tmp_path).get_network(*inner, 15))
+    asyncio.run(make_cache(fetch, disk_dir=tmp_path).get_network(*inner, 15))
+    assert len(fetch.calls) == 1
+
+    path = tmp_path / "lod15" / str(z) / str(x) / f"{y}.json.gz"
+    path.write_bytes(gzip.compress(b"not json"))
+    asyncio.run(make_cache(fetch, disk_dir=tmp_path).get_network(*inner, 15))
+    assert len(fetch.calls) == 2
+
+
+def test_disk_version_marker(tmp_path):
+    cache = make_cache(Fetcher(), disk_dir=tmp_path)
+
+    assert cache.stored_version() is None
+    cache.mark_version(7)
+    assert cache.stored_version() == 7
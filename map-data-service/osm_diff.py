@@ -0,0 +1,455 @@
+import argparse
+import asyncio
+import logging
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import osmium
+
+from constants import LINK_TAG_MAPPING
+from db.database import engine
+from db.db_models import BuildingDB, LinkDB, NodeDB, TransportRouteDB
+from osm_features import (
+    building_tags,
+    building_type,
+    centroid,
+    connection_counts,
+    is_link,
+    is_transit_route,
+    join_segments,
+    linestring_ewkt,
+    link_row,
+    link_segments,
+    point_ewkt,
+    ring_json,
+    route_member_ways,
+    route_tags,
+    shared_nodes,
+)
+from osm_import import open_node_cache, table_columns, table_row
+
+logger = logging.getLogger(__name__)
+
+Point = tuple[float, float]
+Envelope = tuple[float, float, float, float]
+Way = tuple[dict[str, str], list[int]]
+ResolvedWay = tuple[dict[str, str], list[int], list[Point]]
+OldLink = tuple[int, int, int]
+
+
+@dataclass
+class ChangeSet:
+    nodes: dict[int, Point | None] = field(default_factory=dict)
+    ways: dict[int, Way | None] = field(default_factory=dict)
+    relations: dict[int, tuple[dict[str, str], list[tuple[str, int, str]]] | None] = field(
+        default_factory=dict
+    )
+
+
+def _final_state(obj):
+    if obj.deleted:
+        return None
+    if obj.is_node():
+        return obj.location.lon, obj.location.lat
+    tags = {t.k: t.v for t in obj.tags}
+    if obj.is_way():
+        return tags, [n.ref for n in obj.nodes]
+    return tags, [(m.type, m.ref, m.role) for m in obj.members]
+
+
+def read_changes(path: Path) -> ChangeSet:
+    changes = ChangeSet()
+    for obj in osmium.FileProcessor(str(path)):
+        kind = "nodes" if obj.is_node() else "ways" if obj.is_way() else "relations"
+        getattr(changes, kind)[obj.id] = _final_state(obj)
+    return changes
+
+
+def _envelope(points: list[Point]) -> Envelope:
+    xs, ys = zip(*points)
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _upsert_sql(model) -> str:
+    columns = table_columns(model)
+    values = ", ".join(
+        f"ST_GeomFromEWKT(CAST(${i} AS text))" if name == "geom" else f"${i}"
+        for i, name in enumerate(columns, start=1)
+    )
+    quoted = [f'"{name}"' for name in columns]
+    updates = ", ".join(f"{q} = EXCLUDED.{q}" for q in quoted[1:])
+    return (
+        f"INSERT INTO {model.__tablename__} ({', '.join(quoted)}) VALUES ({values}) "
+        f"ON CONFLICT (id) DO UPDATE SET {updates}"
+    )
+
+
+_ENVELOPE_SQL = "ST_XMin({g}), ST_YMin({g}), ST_XMax({g}), ST_YMax({g})"
+
+_LINK_TAG_COLUMNS = ", ".join(
+    f'"{LinkDB.__mapper__.attrs[attr].columns[0].name}" AS {attr}' for attr in LINK_TAG_MAPPING
+)
+
+
+def _ways_from_links(rows: Iterable[Mapping]) -> dict[int, Way]:
+    segments: dict[int, list[list[int]]] = {}
+    tags: dict[int, dict[str, str]] = {}
+    for row in rows:
+        segments.setdefault(row["way_id"], []).append(list(row["node_ids"]))
+        tags[row["way_id"]] = {
+            key: row[attr] for attr, key in LINK_TAG_MAPPING.items() if row[attr]
+        }
+    return {way_id: (tags[way_id], join_segments(s)) for way_id, s in segments.items()}
+
+
+def _segment_links(ways: Mapping[int, ResolvedWay], shared: set[int]) -> dict[int, dict]:
+    links = {}
+    for way_id, (tags, node_ids, points) in ways.items():
+        for segment, (start, end) in enumerate(link_segments(node_ids, shared)):
+            row = link_row(
+                way_id, segment, node_ids[start : end + 1], points[start : end + 1], tags
+            )
+            links[row["id"]] = row
+    return links
+
+
+def _affected_nodes(
+    changed: Iterable[int], links: Iterable[dict], removed: Iterable[OldLink]
+) -> set[int]:
+    affected = set(changed)
+    for link in links:
+        affected.update((link["from_node"], link["to_node"]))
+    for _, from_node, to_node in removed:
+        affected.update((from_node, to_node))
+    return affected
+
+
+def _end_counts(
+    affected: set[int], links: Iterable[dict], other_ends: Iterable[int]
+) -> dict[int, int]:
+    ends = connection_counts(link["node_ids"] for link in links)
+    ends.update(other_ends)
+    return {node_id: ends[node_id] for node_id in affected}
+
+
+def _is_outline(points: list[Point] | None) -> bool:
+    return points is not None and len(points) >= 4 and points[0] == points[-1]
+
+
+def _building_row(way_id: int, way: Way | None, locate: Callable) -> dict | None:
+    kind = building_type(way[0]) if way is not None else None
+    points = locate(way[1]) if kind is not None else None
+    if not _is_outline(points):
+        return None
+    return {
+        "id": way_id,
+        "geometry": ring_json(points),
+        "type": kind,
+        "geom": point_ewkt(centroid(points)),
+        "node_ids": way[1],
+        **building_tags(way[0]),
+    }
+
+
+class _DiffApplier:
+    def __init__(self, conn, changes: ChangeSet, node_cache):
+        self.conn = conn
+        self.changes = changes
+        self.node_cache = node_cache
+        self.extent: list[Envelope] = []
+
+    def location(self, node_id: int) -> Point | None:
+        try:
+            location = self.node_cache.get(node_id)
+        except KeyError:
+            return None
+        return (location.lon, location.lat) if location.valid() else None
+
+    def points(self, node_ids: list[int]) -> list[Point] | None:
+        points = [self.location(node_id) for node_id in node_ids]
+        return None if any(p is None for p in points) else points
+
+    def moved_nodes(self) -> list[int]:
+        return [n for n, point in self.changes.nodes.items() if point is not None]
+
+    async def record_envelopes(self, sql: str, *args) -> None:
+        for row in await self.conn.fetch(sql, *args):
+            if row[0] is not None:
+                self.extent.append(tuple(row))
+
+    async def stored_ways(self, where: str, *args) -> dict[int, Way]:
+        rows = await self.conn.fetch(
+            f"""SELECT way_id, node_ids, {_LINK_TAG_COLUMNS} FROM links
+                WHERE way_id IN (SELECT way_id FROM links WHERE {where})
+                ORDER BY id""",
+            *args,
+        )
+        return _ways_from_links(rows)
+
+    async def ways_to_rederive(self) -> dict[int, Way | None]:
+        old = await self.stored_ways("way_id = ANY($1)", list(self.changes.ways))
+        touched = set(self.moved_nodes())
+        for way in (*old.values(), *self.changes.ways.values()):
+            if way is not None and is_link(way[0]):
+                touched.update(way[1])
+        ways: dict[int, Way | None] = await self.stored_ways("node_ids && $1", list(touched))
+        ways.update(self.changes.ways)
+        return ways
+
+    async def apply_links(self, ways: dict[int, Way | None]) -> set[int]:
+        old = await self.old_links(list(ways))
+        resolved, skipped = self.resolve_ways(ways)
+        rewritten = [way_id for way_id in ways if way_id not in skipped]
+        links = _segment_links(resolved, await self.split_nodes(resolved, rewritten))
+        removed = [i for i, (way_id, *_) in old.items() if way_id not in skipped]
+        counts = await self.refresh_counts(links, [old[i] for i in removed], rewritten)
+        await self.upsert_links(links, counts)
+        await self.delete_links([i for i in removed if i not in links], counts)
+        logger.info(f"Updated {len(links)} links and {len(counts)} nodes")
+        return set(resolved) | {way_id for way_id, *_ in old.values()}
+
+    async def old_links(self, way_ids: list[int]) -> dict[int, OldLink]:
+        await self.record_envelopes(
+            f"SELECT {_ENVELOPE_SQL.format(g='geom')} FROM links WHERE way_id = ANY($1)", way_ids
+        )
+        rows = await self.conn.fetch(
+            "SELECT id, way_id, from_node, to_node FROM links WHERE way_id = ANY($1)", way_ids
+        )
+        return {row["id"]: (row["way_id"], row["from_node"], row["to_node"]) for row in rows}
+
+    def resolve_ways(
+        self, ways: Mapping[int, Way | None]
+    ) -> tuple[dict[int, ResolvedWay], set[int]]:
+        resolved: dict[int, ResolvedWay] = {}
+        skipped: set[int] = set()
+        for way_id, way in ways.items():
+            if way is None or not is_link(way[0]):
+                continue
+            points = self.points(way[1])
+            if points is None or len(points) < 2:
+                logger.warning(f"Skipping way {way_id}: node locations missing")
+                skipped.add(way_id)
+                continue
+            self.extent.append(_envelope(points))
+            resolved[way_id] = (*way, points)
+        return resolved, skipped
+
+    async def split_nodes(
+        self, ways: Mapping[int, ResolvedWay], rewritten: list[int]
+    ) -> set[int]:
+        candidates = {node_id for _, node_ids, _ in ways.values() for node_id in node_ids}
+        rows = await self.conn.fetch(
+            "SELECT node_ids FROM links WHERE node_ids && $1 AND NOT way_id = ANY($2)",
+            list(candidates),
+            rewritten,
+        )
+        others = {node_id for row in rows for node_id in row["node_ids"] if node_id in candidates}
+        return others | shared_nodes(node_ids for _, node_ids, _ in ways.values())
+
+    async def refresh_counts(
+        self, links: dict[int, dict], removed: list[OldLink], rewritten: list[int]
+    ) -> dict[int, int]:
+        affected = _affected_nodes(self.changes.nodes, links.values(), removed)
+        rows = await self.conn.fetch(
+            """SELECT from_node, to_node FROM links
+               WHERE (from_node = ANY($1) OR to_node = ANY($1)) AND NOT way_id = ANY($2)""",
+            list(affected),
+            rewritten,
+        )
+        other_ends = [node_id for row in rows for node_id in (row["from_node"], row["to_node"])]
+        return _end_counts(affected, links.values(), other_ends)
+
+    async def upsert_links(self, links: dict[int, dict], counts: dict[int, int]) -> None:
+        nodes = []
+        for node_id, count in counts.items():
+            point = self.location(node_id) if count else None
+            if point is not None:
+                values = {"id": node_id, "connection_count": count, "geom": point_ewkt(point)}
+                nodes.append(table_row(NodeDB, values))
+        await self.conn.executemany(_upsert_sql(NodeDB), nodes)
+        rows = [table_row(LinkDB, row) for row in links.values()]
+        await self.conn.executemany(_upsert_sql(LinkDB), rows)
+
+    async def delete_links(self, link_ids: list[int], counts: dict[int, int]) -> None:
+        await self.conn.execute("DELETE FROM links WHERE id = ANY($1)", link_ids)
+        unused = [node_id for node_id, count in counts.items() if not count]
+        await self.conn.execute("DELETE FROM nodes WHERE id = ANY($1)", unused)
+
+    async def apply_buildings(self) -> None:
+        way_ids = list(self.changes.ways)
+        await self.record_envelopes(
+            f"SELECT {_ENVELOPE_SQL.format(g='geom')} FROM buildings WHERE id = ANY($1)", way_ids
+        )
+        await self.redraw_buildings()
+        rows = {}
+        for way_id, way in self.changes.ways.items():
+            row = _building_row(way_id, way, self.points)
+            if row is not None:
+                rows[way_id] = table_row(BuildingDB, row)
+                self.extent.append(_envelope(self.points(way[1])))
+        removed = [way_id for way_id in way_ids if way_id not in rows]
+        await self.conn.execute("DELETE FROM buildings WHERE id = ANY($1)", removed)
+        await self.conn.executemany(_upsert_sql(BuildingDB), list(rows.values()))
+
+    async def redraw_buildings(self) -> None:
+        moved = self.moved_nodes()
+        if not moved:
+            return
+        rows = await self.conn.fetch(
+            f"SELECT id, node_ids, {_ENVELOPE_SQL.format(g='geom')} FROM buildings "
+            "WHERE node_ids && $1 AND NOT id = ANY($2)",
+            moved,
+            list(self.changes.ways),
+        )
+        updates = [update for update in map(self.redrawn, rows) if update is not None]
+        await self.conn.executemany(
+            "UPDATE buildings SET geometry = $2, geom = ST_GeomFromEWKT(CAST($3 AS text)) "
+            "WHERE id = $1",
+            updates,
+        )
+        logger.info(f"Redrew {len(updates)} buildings with moved nodes")
+
+    def redrawn(self, row) -> tuple[int, str, str] | None:
+        points = self.points(list(row["node_ids"]))
+        if not _is_outline(points):
+            logger.warning(f"Skipping building {row['id']}: node locations missing")
+            return None
+        self.extent.extend((tuple(row)[2:], _envelope(points)))
+        return row["id"], ring_json(points), point_ewkt(centroid(points))
+
+    async def way_geometry(self, way_id: int) -> str | None:
+        way = self.changes.ways.get(way_id)
+        if way is None and way_id not in self.changes.ways:
+            way = (await self.stored_ways("way_id = $1", way_id)).get(way_id)
+        if way is not None:
+            points = self.points(way[1])
+            return linestring_ewkt(points) if points and len(points) >= 2 else None
+        if way_id in self.changes.ways:
+            return None
+        return await self.conn.fetchval(
+            "SELECT ST_AsEWKT(geom) FROM transport_routes WHERE way_id = $1 LIMIT 1", way_id
+        )
+
+    async def apply_routes(self, changed_ways: set[int]) -> None:
+        await self.conn.execute("LOCK TABLE transport_routes IN SHARE ROW EXCLUSIVE MODE")
+        relation_ids = list(self.changes.relations)
+        await self.record_route_envelopes(relation_ids, changed_ways)
+        for way_id in changed_ways:
+            await self.update_route_geometry(way_id)
+        await self.conn.execute(
+            "DELETE FROM transport_routes WHERE relation_id = ANY($1)", relation_ids
+        )
+        next_id = await self.conn.fetchval("SELECT COALESCE(MAX(id), 0) + 1 FROM transport_routes")
+        rows = []
+        for relation_id, relation in self.changes.relations.items():
+            rows += await self.relation_routes(relation_id, relation, next_id + len(rows))
+        await self.conn.executemany(_upsert_sql(TransportRouteDB), rows)
+        await self.record_route_envelopes(relation_ids, changed_ways)
+
+    async def record_route_envelopes(self, relation_ids: list[int], way_ids: set[int]) -> None:
+        await self.record_envelopes(
+            f"SELECT {_ENVELOPE_SQL.format(g='geom')} FROM transport_routes "
+            "WHERE relation_id = ANY($1) OR way_id = ANY($2)",
+            relation_ids,
+            list(way_ids),
+        )
+
+    async def update_route_geometry(self, way_id: int) -> None:
+        if way_id in self.changes.ways and self.changes.ways[way_id] is None:
+            await self.conn.execute("DELETE FROM transport_routes WHERE way_id = $1", way_id)
+            return
+        geom = await self.way_geometry(way_id)
+        if geom is not None:
+            await self.conn.execute(
+                "UPDATE transport_routes SET geom = ST_GeomFromEWKT(CAST($2 AS text)) "
+                "WHERE way_id = $1",
+                way_id,
+                geom,
+            )
+
+    async def relation_routes(self, relation_id: int, relation, first_id: int) -> list[list]:
+        if relation is None or not is_transit_route(relation[0]):
+            return []
+        rows = []
+        for way_id in route_member_ways(relation[1]):
+            geom = await self.way_geometry(way_id)
+            if geom is not None:
+                values = {
+                    "id": first_id + len(rows),
+                    "way_id": way_id,
+                    "relation_id": relation_id,
+                    "geom": geom,
+                    **route_tags(relation[0]),
+                }
+                rows.append(table_row(TransportRouteDB, values))
+        return rows
+
+    async def finish(self) -> int | None:
+        if not self.extent:
+            return None
+        min_x, min_y, max_x, max_y = (list(column) for column in zip(*self.extent))
+        extent_sql = """(SELECT ST_Collect(ST_MakeEnvelope(a, b, c, d, 4326))
+                         FROM unnest(CAST($1 AS float8[]), CAST($2 AS float8[]),
+                                     CAST($3 AS float8[]), CAST($4 AS float8[])) AS e(a, b, c, d))"""
+        await self.conn.execute(
+            f"SELECT refresh_transport_route_groups_in({extent_sql})",
+            min_x, min_y, max_x, max_y,
+        )
+        return await self.conn.fetchval(
+            f"SELECT bump_dataset_version({extent_sql})", min_x, min_y, max_x, max_y
+        )
+
+
+def _update_node_cache(node_cache, changes: ChangeSet) -> None:
+    for node_id, point in changes.nodes.items():
+        if point is not None:
+            node_cache.set(node_id, osmium.osm.Location(*point))
+
+
+async def apply_change_file(path: Path, node_cache_path: Path) -> int | None:
+    changes = await asyncio.to_thread(read_changes, path)
+    logger.info(
+        f"Read {len(changes.nodes)} nodes, {len(changes.ways)} ways and "
+        f"{len(changes.relations)} relations from {path}"
+    )
+    node_cache = open_node_cache(node_cache_path)
+    await asyncio.to_thread(_update_node_cache, node_cache, changes)
+
+    async with engine.connect() as sa_connection:
+        raw = await sa_connection.get_raw_connection()
+        conn = raw.driver_connection
+        async with conn.transaction():
+            applier = _DiffApplier(conn, changes, node_cache)
+            changed_ways = await applier.apply_links(await applier.ways_to_rederive())
+            await applier.apply_buildings()
+            await applier.apply_routes(changed_ways | set(changes.ways))
+            version = await applier.finish()
+
+    logger.info(f"Applied {path}" + (f" as dataset version {version}" if version else ""))
+    return version
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Apply OSM change files to the map data tables, in order."
+    )
+    parser.add_argument("paths", type=Path, nargs="+", help="OSM change files (.osc[.gz])")
+    parser.add_argument(
+        "--node-cache",
+        type=Path,
+        required=True,
+        help="Node location cache written by osm_import --node-cache",
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    async def run() -> None:
+        for path in args.paths:
+            await apply_change_file(path, args.node_cache)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import pytest
+
+pytest.importorskip("osmium")
+
+from db.db_models import LinkDB
+from osm_diff import (
+    ChangeSet,
+    _affected_nodes,
+    _building_row,
+    _DiffApplier,
+    _end_counts,
+    _segment_links,
+    _upsert_sql,
+    _ways_from_links,
+)
+from osm_features import link_id
+
+LOCATIONS = {
+    1: (-8.470, 51.900),
+    2: (-8.469, 51.900),
+    3: (-8.468, 51.900),
+    4: (-8.469, 51.899),
+    5: (-8.469, 51.901),
+    6: (-8.460, 51.890),
+    7: (-8.459, 51.890),
+    8: (-8.459, 51.891),
+    9: (-8.460, 51.891),
+}
+
+
+class Location:
+    def __init__(self, lon: float, lat: float):
+        self.lon, self.lat = lon, lat
+
+    def valid(self) -> bool:
+        return True
+
+
+class NodeCache:
+    def __init__(self, locations: dict):
+        self.locations = dict(locations)
+
+    def get(self, node_id: int) -> Location:
+        return Location(*self.locations[node_id])
+
+
+class Record(dict):
+    def __iter__(self):
+        return iter(self.values())
+
+
+def applier(changes: ChangeSet | None = None, locations=LOCATIONS) -> _DiffApplier:
+    return _DiffApplier(None, changes or ChangeSet(), NodeCache(locations))
+
+
+def resolved(*ways: tuple[int, list[int]]) -> dict:
+    return {
+        way_id: ({"highway": "residential"}, node_ids, [LOCATIONS[n] for n in node_ids])
+        for way_id, node_ids in ways
+    }
+
+
+def test_ways_from_links_joins_segments_in_order():
+    tags = dict.fromkeys(LinkDB.__mapper__.attrs.keys())
+    rows = [
+        {**tags, "way_id": 10, "node_ids": [1, 2], "highway": "primary", "name": "Main Street"},
+        {**tags, "way_id": 10, "node_ids": [2, 3], "highway": "primary", "name": "Main Street"},
+        {**tags, "way_id": 20, "node_ids": [4, 2, 5], "highway": "service"},
+    ]
+
+    assert _ways_from_links(rows) == {
+        10: ({"highway": "primary", "name": "Main Street"}, [1, 2, 3]),
+        20: ({"highway": "service"}, [4, 2, 5]),
+    }
+
+
+def test_segment_links_split_ways_at_shared_nodes():
+    links = _segment_links(resolved((10, [1, 2, 3]), (20, [4, 2, 5])), {2})
+
+    assert {i: (link["from_node"], link["to_node"]) for i, link in links.items()} == {
+        link_id(10, 0): (1, 2),
+        link_id(10, 1): (2, 3),
+        link_id(20, 0): (4, 2),
+        link_id(20, 1): (2, 5),
+    }
+    assert links[link_id(10, 1)]["way_id"] == 10
+    assert links[link_id(10, 1)]["geom"] == (
+        "SRID=4326;LINESTRING(-8.4690000 51.9000000,-8.4680000 51.9000000)"
+    )
+
+
+def test_new_way_crossing_a_link_counts_both_at_the_shared_node():
+    links = _segment_links(resolved((10, [1, 2, 3]), (20, [4, 2, 5])), {2})
+    affected = _affected_nodes([], links.values(), [(10, 1, 3)])
+
+    assert _end_counts(affected, links.values(), []) == {1: 1, 2: 4, 3: 1, 4: 1, 5: 1}
+
+
+def test_deleted_way_drops_nodes_it_alone_needed():
+    links = _segment_links(resolved((10, [1, 2, 3])), set())
+    removed = [(10, 1, 2), (10, 2, 3), (20, 4, 2), (20, 2, 5)]
+
+    counts = _end_counts(_affected_nodes([], links.values(), removed), links.values(), [])
+
+    assert counts == {1: 1, 2: 0, 3: 1, 4: 0, 5: 0}
+
+
+def test_end_counts_include_links_of_other_ways():
+    assert _end_counts({2, 9}, [], [2, 2, 7]) == {2: 2, 9: 0}
+
+
+def test_resolve_ways_skips_ways_with_missing_locations():
+    locations = {k: v for k, v in LOCATIONS.items() if k != 3}
+    diff = applier(locations=locations)
+
+    ways, skipped = diff.resolve_ways(
+        {
+            10: ({"highway": "primary"}, [1, 2, 3]),
+            20: ({"highway": "service"}, [4, 2, 5]),
+            30: ({"building": "yes"}, [6, 7, 8, 9, 6]),
+            40: None,
+        }
+    )
+
+    assert set(ways) == {20} and skipped == {10}
+    assert ways[20][2] == [LOCATIONS[4], LOCATIONS[2], LOCATIONS[5]]
+    assert diff.extent == [(-8.469, 51.899, -8.469, 51.901)]
+
+
+def test_building_row_needs_a_typed_closed_outline():
+    locate = applier().points
+
+    row = _building_row(30, ({"building": "house"}, [6, 7, 8, 9, 6]), locate)
+
+    assert row["type"] == "apartments" and row["node_ids"] == [6, 7, 8, 9, 6]
+    assert row["geom"] == "SRID=4326;POINT(-8.4595000 51.8905000)"
+    assert _building_row(30, ({"building": "house"}, [6, 7, 8, 9]), locate) is None
+    assert _building_row(30, ({"building": "yes"}, [6, 7, 8, 9, 6]), locate) is None
+    assert _building_row(30, None, locate) is None
+
+
+def test_redrawn_moves_the_outline_and_extends_the_extent():
+    moved = (-8.4585, 51.8898)
+    diff = applier(ChangeSet(nodes={7: moved}), {**LOCATIONS, 7: moved})
+    row = Record(id=30, node_ids=[6, 7, 8, 9, 6], a=-8.46, b=51.89, c=-8.459, d=51.891)
+
+    building_id, geometry, _ = diff.redrawn(row)
+
+    assert building_id == 30 and "[-8.4585,51.8898]" in geometry
+    assert diff.extent == [(-8.46, 51.89, -8.459, 51.891), (-8.46, 51.8898, -8.4585, 51.891)]
+
+
+def test_upsert_sql_updates_every_column_but_the_id():
+    sql = _upsert_sql(LinkDB)
+
+    assert sql.startswith('INSERT INTO links ("id", ')
+    assert "ST_GeomFromEWKT(CAST($" in sql
+    assert '"id" = EXCLUDED' not in sql and '"way_id" = EXCLUDED."way_id"' in sql
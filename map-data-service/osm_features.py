@@ -0,0 +1,147 @@
+import json
+from collections import Counter
+from collections.abc import Container, Iterable, Mapping, Sequence
+
+from constants import (
+    BUILDING_TAG_MAPPING,
+    LINK_TAG_MAPPING,
+    ROUTE_TAG_MAPPING,
+    VALID_MEMBER_ROLES,
+)
+
+EXCLUDED_HIGHWAYS = frozenset(
+    {"proposed", "construction", "abandoned", "disused", "razed", "platform", "bus_stop"}
+)
+
+TRANSIT_ROUTES = frozenset(
+    {"bus", "trolleybus", "tram", "light_rail", "subway", "train", "ferry", "monorail"}
+)
+
+_BUILDING_TYPE_RULES = (
+    ("supermarket", lambda t: t.get("shop") == "supermarket"),
+    ("kindergarten", lambda t: t.get("amenity") == "kindergarten" or t.get("building") == "kindergarten"),
+    ("school", lambda t: t.get("amenity") == "school" or t.get("building") == "school"),
+    ("parking", lambda t: t.get("amenity") == "parking" or t.get("building") in ("parking", "garages")),
+    ("retail", lambda t: "shop" in t or t.get("building") in ("retail", "commercial")),
+    ("apartments", lambda t: t.get("building") in ("apartments", "residential", "house", "detached", "terrace")),
+)
+
+SEGMENT_ID_FACTOR = 4096
+
+Point = tuple[float, float]
+
+
+def is_link(tags: Mapping[str, str]) -> bool:
+    highway = tags.get("highway")
+    return highway is not None and highway not in EXCLUDED_HIGHWAYS
+
+
+def is_transit_route(tags: Mapping[str, str]) -> bool:
+    return tags.get("type") == "route" and tags.get("route") in TRANSIT_ROUTES
+
+
+def is_route_member(member_type: str, role: str) -> bool:
+    return member_type == "w" and role in VALID_MEMBER_ROLES
+
+
+def route_member_ways(members: Iterable[tuple[str, int, str]]) -> list[int]:
+    return list(
+        dict.fromkeys(ref for kind, ref, role in members if is_route_member(kind, role))
+    )
+
+
+def building_type(tags: Mapping[str, str]) -> str | None:
+    if "building" not in tags:
+        return None
+    for name, matches in _BUILDING_TYPE_RULES:
+        if matches(tags):
+            return name
+    return None
+
+
+def pick_tags(tags: Mapping[str, str], mapping: dict[str, str]) -> dict[str, str]:
+    return {attr: tags[key] for attr, key in mapping.items() if tags.get(key)}
+
+
+def link_tags(tags: Mapping[str, str]) -> dict[str, str]:
+    return pick_tags(tags, LINK_TAG_MAPPING)
+
+
+def building_tags(tags: Mapping[str, str]) -> dict[str, str]:
+    return pick_tags(tags, BUILDING_TAG_MAPPING)
+
+
+def route_tags(tags: Mapping[str, str]) -> dict[str, str]:
+    return pick_tags(tags, ROUTE_TAG_MAPPING)
+
+
+def link_segments(node_ids: Sequence[int], shared: Container[int]) -> list[tuple[int, int]]:
+    inner = (i for i in range(1, len(node_ids) - 1) if node_ids[i] in shared)
+    cuts = [0, *inner, len(node_ids) - 1]
+    return list(zip(cuts, cuts[1:]))
+
+
+def link_id(way_id: int, segment: int) -> int:
+    return way_id * SEGMENT_ID_FACTOR + segment
+
+
+def link_row(
+    way_id: int,
+    segment: int,
+    node_ids: Sequence[int],
+    points: Sequence[Point],
+    tags: Mapping[str, str],
+) -> dict:
+    return {
+        "id": link_id(way_id, segment),
+        "way_id": way_id,
+        "from_node": node_ids[0],
+        "to_node": node_ids[-1],
+        "node_ids": list(node_ids),
+        "geom": linestring_ewkt(points),
+        **link_tags(tags),
+    }
+
+
+def shared_nodes(ways: Iterable[Sequence[int]]) -> set[int]:
+    counts = Counter(node_id for node_ids in ways for node_id in node_ids)
+    return {node_id for node_id, count in counts.items() if count > 1}
+
+
+def connection_counts(links: Iterable[Sequence[int]]) -> Counter[int]:
+    return Counter(node_id for node_ids in links for node_id in (node_ids[0], node_ids[-1]))
+
+
+def join_segments(segments: Iterable[Sequence[int]]) -> list[int]:
+    node_ids: list[int] = []
+    for segment in segments:
+        node_ids.extend(segment[1:] if node_ids else segment)
+    return node_ids
+
+
+def centroid(ring: Sequence[Point]) -> Point:
+    area = cx = cy = 0.0
+    x0, y0 = ring[0]
+    for (x1, y1), (x2, y2) in zip(ring, ring[1:]):
+        x1, y1, x2, y2 = x1 - x0, y1 - y0, x2 - x0, y2 - y0
+        cross = x1 * y2 - x2 * y1
+        area += cross
+        cx += (x1 + x2) * cross
+        cy += (y1 + y2) * cross
+    if abs(area) < 1e-18:
+        xs, ys = zip(*ring)
+        return sum(xs) / len(xs), sum(ys) / len(ys)
+    return x0 + cx / (3 * area), y0 + cy / (3 * area)
+
+
+def point_ewkt(point: Point) -> str:
+    return f"SRID=4326;POINT({point[0]:.7f} {point[1]:.7f})"
+
+
+def linestring_ewkt(points: Sequence[Point]) -> str:
+    coords = ",".join(f"{x:.7f} {y:.7f}" for x, y in points)
+    return f"SRID=4326;LINESTRING({coords})"
+
+
+def ring_json(ring: Sequence[Point]) -> str:
+    return json.dumps([[round(x, 7), round(y, 7)] for x, y in ring], separators=(",", ":"))
@@ -0,0 +1,76 @@
+import pytest
+
+from osm_features import (
+    building_type,
+    centroid,
+    connection_counts,
+    join_segments,
+    link_id,
+    link_segments,
+    shared_nodes,
+)
+
+
+def test_centroid_of_a_square():
+    ring = [(0.0, 0.0), (2.0, 0.0), (2.0, 2.0), (0.0, 2.0), (0.0, 0.0)]
+
+    assert centroid(ring) == pytest.approx((1.0, 1.0))
+
+
+def test_centroid_weights_by_area_not_vertices():
+    ring = [(0, 0), (4, 0), (4, 1), (3, 1), (2, 1), (1, 1), (0, 1), (0, 0)]
+
+    assert centroid(ring) == pytest.approx((2.0, 0.5))
+
+
+def test_centroid_of_a_degenerate_ring_is_the_vertex_mean():
+    ring = [(-8.47, 51.9), (-8.46, 51.9), (-8.47, 51.9)]
+
+    assert centroid(ring) == pytest.approx((-8.4666667, 51.9))
+
+
+@pytest.mark.parametrize(
+    ("tags", "expected"),
+    [
+        ({"building": "yes", "shop": "supermarket"}, "supermarket"),
+        ({"building": "yes", "amenity": "school"}, "school"),
+        ({"building": "garages"}, "parking"),
+        ({"building": "yes", "shop": "bakery"}, "retail"),
+        ({"building": "house"}, "apartments"),
+        ({"building": "yes"}, None),
+        ({"shop": "bakery"}, None),
+    ],
+)
+def test_building_type(tags, expected):
+    assert building_type(tags) == expected
+
+
+def test_link_segments_split_at_shared_inner_nodes():
+    assert link_segments([1, 2, 3, 4, 5], {3, 5, 9}) == [(0, 2), (2, 4)]
+    assert link_segments([1, 2], {1, 2}) == [(0, 1)]
+
+
+def test_link_ids_are_unique_per_segment():
+    assert link_id(7, 0) != link_id(7, 1) != link_id(8, 0)
+
+
+def test_shared_nodes_counts_repeats_within_a_way():
+    assert shared_nodes([[1, 2, 3], [4, 2, 5], [6, 7, 8, 6]]) == {2, 6}
+
+
+def test_crossing_streets_connect_at_their_shared_node():
+    ways = [[1, 2, 3], [4, 2, 5]]
+    shared = shared_nodes(ways)
+    links = [
+        node_ids[start : end + 1]
+        for node_ids in ways
+        for start, end in link_segments(node_ids, shared)
+    ]
+
+    assert links == [[1, 2], [2, 3], [4, 2], [2, 5]]
+    assert connection_counts(links) == {1: 1, 2: 4, 3: 1, 4: 1, 5: 1}
+
+
+def test_join_segments_restores_the_way():
+    assert join_segments([[1, 2], [2, 3, 4], [4, 1]]) == [1, 2, 3, 4, 1]
+    assert join_segments([]) == []
@@ -0,0 +1,419 @@
+import argparse
+import asyncio
+import csv
+import io
+import logging
+import queue
+import re
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import osmium
+
+from db.database import engine
+from db.db_models import BuildingDB, LinkDB, TransportRouteDB
+from osm_features import (
+    building_tags,
+    building_type,
+    centroid,
+    is_link,
+    is_transit_route,
+    linestring_ewkt,
+    link_row,
+    link_segments,
+    point_ewkt,
+    ring_json,
+    route_member_ways,
+    route_tags,
+)
+
+logger = logging.getLogger(__name__)
+
+TABLES = ("nodes", "links", "buildings", "transport_routes")
+STAGING_SUFFIX = "_import"
+NODE_REFS_TABLE = "node_refs_import"
+NODE_REFS_COLUMNS = ("id", "lon", "lat")
+
+COPY_CHUNK_BYTES = 1 << 20
+COPY_QUEUE_CHUNKS = 16
+
+
+class ImportAborted(Exception):
+    pass
+
+
+def table_columns(model) -> list[str]:
+    return [attr.columns[0].name for attr in model.__mapper__.column_attrs]
+
+
+def table_row(model, values: dict) -> list:
+    return [values.get(attr.key) for attr in model.__mapper__.column_attrs]
+
+
+class _CopyStream:
+    def __init__(self, table: str, columns: list[str]):
+        self.table = table
+        self.columns = columns
+        self.rows = 0
+        self.cancelled = threading.Event()
+        self._queue: queue.Queue[bytes | None] = queue.Queue(maxsize=COPY_QUEUE_CHUNKS)
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    def write(self, row: list) -> None:
+        self._writer.writerow(row)
+        self.rows += 1
+        if self._buffer.tell() >= COPY_CHUNK_BYTES:
+            self._put(self._buffer.getvalue().encode())
+            self._buffer = io.StringIO()
+            self._writer = csv.writer(self._buffer)
+
+    def close(self) -> None:
+        if self._buffer.tell():
+            self._put(self._buffer.getvalue().encode())
+        self._put(None)
+
+    def _put(self, chunk: bytes | None) -> None:
+        while True:
+            if self.cancelled.is_set():
+                raise ImportAborted(f"COPY into {self.table} failed")
+            try:
+                self._queue.put(chunk, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    async def chunks(self):
+        while (chunk := await asyncio.to_thread(self._queue.get)) is not None:
+            yield chunk
+
+
+RouteMembers = dict[int, list[tuple[int, dict[str, str]]]]
+
+
+def read_route_members(path: Path) -> RouteMembers:
+    members: RouteMembers = defaultdict(list)
+    for relation in osmium.FileProcessor(str(path), osmium.osm.RELATION):
+        tags = {tag.k: tag.v for tag in relation.tags}
+        if not is_transit_route(tags):
+            continue
+        row_tags = route_tags(tags)
+        members_of = ((m.type, m.ref, m.role) for m in relation.members)
+        for way_id in route_member_ways(members_of):
+            members[way_id].append((relation.id, row_tags))
+    return members
+
+
+def read_shared_nodes(path: Path) -> osmium.index.IdSet:
+    seen, shared = osmium.index.IdSet(), osmium.index.IdSet()
+    for way in osmium.FileProcessor(str(path), osmium.osm.WAY):
+        if not is_link(way.tags):
+            continue
+        for node in way.nodes:
+            if node.ref in seen:
+                shared.set(node.ref)
+            else:
+                seen.set(node.ref)
+    return shared
+
+
+def _array(values: list[int]) -> str:
+    return "{" + ",".join(map(str, values)) + "}"
+
+
+def _way_points(way) -> tuple[list[int], list[tuple[float, float]]] | None:
+    ids, points = [], []
+    for node in way.nodes:
+        if not node.location.valid():
+            return None
+        ids.append(node.ref)
+        points.append((node.lon, node.lat))
+    return ids, points
+
+
+def open_node_cache(path: Path):
+    return osmium.index.create_map(f"dense_file_array,{path}")
+
+
+def _write_link(streams: dict[str, _CopyStream], way_id: int, tags, way, shared) -> None:
+    node_ids, points = way
+    for segment, (start, end) in enumerate(link_segments(node_ids, shared)):
+        row = link_row(way_id, segment, node_ids[start : end + 1], points[start : end + 1], tags)
+        streams["links"].write(table_row(LinkDB, {**row, "node_ids": _array(row["node_ids"])}))
+        for i in (start, end):
+            streams["nodes"].write([node_ids[i], *points[i]])
+
+
+def parse_pbf(
+    path: Path,
+    route_members: RouteMembers,
+    shared_nodes: osmium.index.IdSet,
+    streams: dict[str, _CopyStream],
+    node_cache: Path | None = None,
+) -> None:
+    processor = (
+        osmium.FileProcessor(str(path))
+        .with_locations(open_node_cache(node_cache) if node_cache else "flex_mem")
+        .with_areas(osmium.filter.KeyFilter("building"))
+        .with_filter(osmium.filter.EmptyTagFilter())
+        .with_filter(osmium.filter.EntityFilter(osmium.osm.WAY | osmium.osm.AREA))
+    )
+    route_id = 0
+    for obj in processor:
+        tags = {tag.k: tag.v for tag in obj.tags}
+
+        if obj.is_area():
+            kind = building_type(tags)
+            if kind is None:
+                continue
+            outer = next(iter(obj.outer_rings()), None)
+            ring = [(n.lon, n.lat) for n in outer] if outer is not None else []
+            if len(ring) < 4:
+                continue
+            streams["buildings"].write(
+                table_row(
+                    BuildingDB,
+                    {
+                        "id": obj.orig_id(),
+                        "geometry": ring_json(ring),
+                        "type": kind,
+                        "geom": point_ewkt(centroid(ring)),
+                        "node_ids": _array([n.ref for n in outer]) if obj.from_way() else None,
+                        **building_tags(tags),
+                    },
+                )
+            )
+            continue
+
+        members = route_members.get(obj.id)
+        if not (members or is_link(tags)):
+            continue
+        way = _way_points(obj)
+        if way is None or len(way[1]) < 2:
+            continue
+        geom = linestring_ewkt(way[1])
+
+        if is_link(tags):
+            _write_link(streams, obj.id, tags, way, shared_nodes)
+
+        for relation_id, row_tags in members or ():
+            route_id += 1
+            streams["transport_routes"].write(
+                table_row(
+                    TransportRouteDB,
+                    {
+                        "id": route_id,
+                        "way_id": obj.id,
+                        "relation_id": relation_id,
+                        "geom": geom,
+                        **row_tags,
+                    },
+                )
+            )
+
+
+async def _driver_connection(sa_connection):
+    raw = await sa_connection.get_raw_connection()
+    return raw.driver_connection
+
+
+async def _copy(sa_connection, stream: _CopyStream, table: str) -> None:
+    conn = await _driver_connection(sa_connection)
+    try:
+        await conn.copy_to_table(
+            table, source=stream.chunks(), columns=stream.columns, format="csv"
+        )
+    except BaseException:
+        stream.cancelled.set()
+        raise
+
+
+async def _create_staging(conn) -> None:
+    for table in (*map(_staging, TABLES), NODE_REFS_TABLE):
+        await conn.execute(f"DROP TABLE IF EXISTS {table} CASCADE")
+    for table in TABLES:
+        await conn.execute(f"CREATE TABLE {_staging(table)} (LIKE {table} INCLUDING DEFAULTS)")
+    await conn.execute(
+        f"""CREATE UNLOGGED TABLE {NODE_REFS_TABLE} (
+            id BIGINT NOT NULL,
+            lon DOUBLE PRECISION NOT NULL,
+            lat DOUBLE PRECISION NOT NULL
+        )"""
+    )
+
+
+def _staging(name: str) -> str:
+    return name + STAGING_SUFFIX
+
+
+def _retarget(definition: str) -> str:
+    return re.sub(
+        rf"REFERENCES ((?:\w+\.)?)({'|'.join(TABLES)})\(",
+        lambda m: f"REFERENCES {m.group(1)}{_staging(m.group(2))}(",
+        definition,
+    )
+
+
+def _retarget_index(definition: str, name: str, table: str) -> str:
+    return re.sub(
+        rf"INDEX {re.escape(name)} ON ((?:\w+\.)?){table} ",
+        lambda m: f"INDEX {_staging(name)} ON {m.group(1)}{_staging(table)} ",
+        definition,
+        count=1,
+    )
+
+
+Renames = dict[str, list[tuple[str, str]]]
+
+
+async def _derive_nodes(conn) -> None:
+    await conn.execute(
+        f"""INSERT INTO {_staging("nodes")} (id, connection_count, geom)
+            SELECT id, COUNT(*), ST_SetSRID(ST_MakePoint(MIN(lon), MIN(lat)), 4326)
+            FROM {NODE_REFS_TABLE}
+            GROUP BY id"""
+    )
+    await conn.execute(f"DROP TABLE {NODE_REFS_TABLE}")
+    await conn.execute(
+        f"""DELETE FROM {_staging("buildings")} a
+            USING {_staging("buildings")} b
+            WHERE a.id = b.id AND a.ctid > b.ctid"""
+    )
+
+
+async def _copy_constraints(conn, renames: Renames) -> None:
+    constraints = {
+        table: await conn.fetch(
+            """SELECT conname, contype, pg_get_constraintdef(oid) AS definition
+               FROM pg_constraint
+               WHERE conrelid = CAST($1 AS regclass) AND contype IN ('p', 'u', 'c', 'f')""",
+            table,
+        )
+        for table in TABLES
+    }
+    for foreign in (False, True):
+        for table, rows in constraints.items():
+            for row in (r for r in rows if (r["contype"] == "f") == foreign):
+                await conn.execute(
+                    f"ALTER TABLE {_staging(table)} ADD CONSTRAINT "
+                    f"{_staging(row['conname'])} {_retarget(row['definition'])}"
+                )
+                renames[table].append(("constraint", row["conname"]))
+
+
+async def _copy_indexes(conn, table: str, renames: Renames) -> None:
+    indexes = await conn.fetch(
+        """SELECT c.relname AS name, pg_get_indexdef(i.indexrelid) AS definition
+           FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+           WHERE i.indrelid = CAST($1 AS regclass)
+             AND NOT EXISTS (SELECT 1 FROM pg_constraint k WHERE k.conindid = i.indexrelid)""",
+        table,
+    )
+    for row in indexes:
+        await conn.execute(_retarget_index(row["definition"], row["name"], table))
+        renames[table].append(("index", row["name"]))
+
+
+async def _finish_staging(conn) -> Renames:
+    await _derive_nodes(conn)
+    renames: Renames = {table: [] for table in TABLES}
+    await _copy_constraints(conn, renames)
+    for table in TABLES:
+        await _copy_indexes(conn, table, renames)
+        await conn.execute(f"ANALYZE {_staging(table)}")
+    return renames
+
+
+async def _swap(conn, renames: Renames) -> None:
+    async with conn.transaction():
+        await conn.execute(f"DROP TABLE {', '.join(reversed(TABLES))}")
+        for table in TABLES:
+            await conn.execute(f"ALTER TABLE {_staging(table)} RENAME TO {table}")
+            for kind, name in renames[table]:
+                if kind == "constraint":
+                    await conn.execute(
+                        f"ALTER TABLE {table} RENAME CONSTRAINT {_staging(name)} TO {name}"
+                    )
+                else:
+                    await conn.execute(f"ALTER INDEX {_staging(name)} RENAME TO {name}")
+        await conn.execute("SELECT refresh_transport_route_groups()")
+        await conn.execute("SELECT bump_dataset_version(NULL)")
+
+
+async def import_pbf(path: Path, node_cache: Path | None = None) -> dict[str, int]:
+    started = time.monotonic()
+    route_members, shared_nodes = await asyncio.gather(
+        asyncio.to_thread(read_route_members, path),
+        asyncio.to_thread(read_shared_nodes, path),
+    )
+    logger.info(f"Read {len(route_members)} route member ways")
+
+    streams = {
+        "nodes": _CopyStream("nodes", list(NODE_REFS_COLUMNS)),
+        "links": _CopyStream("links", table_columns(LinkDB)),
+        "buildings": _CopyStream("buildings", table_columns(BuildingDB)),
+        "transport_routes": _CopyStream("transport_routes", table_columns(TransportRouteDB)),
+    }
+    targets = {
+        "nodes": NODE_REFS_TABLE,
+        "links": _staging("links"),
+        "buildings": _staging("buildings"),
+        "transport_routes": _staging("transport_routes"),
+    }
+
+    def parse() -> None:
+        try:
+            parse_pbf(path, route_members, shared_nodes, streams, node_cache)
+        finally:
+            for stream in streams.values():
+                if not stream.cancelled.is_set():
+                    stream.close()
+
+    async with engine.connect() as control:
+        conn = await _driver_connection(control)
+        await _create_staging(conn)
+
+        connections = [await engine.connect() for _ in streams]
+        try:
+            await asyncio.gather(
+                asyncio.to_thread(parse),
+                *(
+                    _copy(sa_connection, stream, targets[name])
+                    for sa_connection, (name, stream) in zip(connections, streams.items())
+                ),
+            )
+        finally:
+            for sa_connection in connections:
+                await sa_connection.close()
+        logger.info(
+            "Loaded "
+            + ", ".join(f"{s.rows} {name} rows" for name, s in streams.items())
+            + f" in {time.monotonic() - started:.0f}s"
+        )
+
+        renames = await _finish_staging(conn)
+        await _swap(conn, renames)
+
+    logger.info(f"Imported {path} in {time.monotonic() - started:.0f}s")
+    return {name: stream.rows for name, stream in streams.items()}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Import a local .osm.pbf extract into the map data tables."
+    )
+    parser.add_argument("path", type=Path, help="OSM PBF extract")
+    parser.add_argument(
+        "--node-cache",
+        type=Path,
+        help="Write node locations to this file, as needed by osm_diff",
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    asyncio.run(import_pbf(args.path, args.node_cache))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+import asyncio
+import json
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Collection, Hashable
+
+import numpy as np
+import shapely
+from shapely import STRtree
+
+from city_packs import CITIES
+from constants import DETAIL_ZOOM, NETWORK_LAYERS, VALID_BUILDING_TYPES
+from db.repository import MapDataRepository
+from models import NetworkResponse
+from tiles import highways_for_zoom, simplify_tolerance
+
+logger = logging.getLogger(__name__)
+
+BBox = tuple[float, float, float, float]
+
+
+def parse_region(value: str) -> BBox:
+    city = CITIES.get(value)
+    if city is not None:
+        return city.bbox
+    try:
+        min_lat, min_lng, max_lat, max_lng = (float(part) for part in value.split(","))
+    except ValueError:
+        raise ValueError(
+            f"NETWORK_REGION must be one of {', '.join(CITIES)} or min_lat,min_lng,max_lat,max_lng"
+        ) from None
+    if min_lat >= max_lat or min_lng >= max_lng:
+        raise ValueError("NETWORK_REGION bbox must have min_lat < max_lat and min_lng < max_lng")
+    return min_lat, min_lng, max_lat, max_lng
+
+
+def _dumps(value) -> bytes:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def _without_outline(_, features: list[dict]) -> None:
+    for feature in features:
+        feature["geometry"] = []
+
+
+def _lines(geometry: shapely.Geometry) -> list[list[list[float]]]:
+    return [shapely.get_coordinates(part).tolist() for part in shapely.get_parts(geometry)]
+
+
+class _VariantCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[Hashable, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> bytes | None:
+        with self._lock:
+            fragment = self._entries.get(key)
+            if fragment is not None:
+                self._entries.move_to_end(key)
+            return fragment
+
+    def put(self, key: Hashable, fragment: bytes) -> None:
+        if len(fragment) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._entries[key] = fragment
+            self.size += len(fragment)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class _Layer:
+    def __init__(
+        self, fragments: list[bytes], geometries: list[shapely.Geometry], cache: _VariantCache
+    ):
+        self.fragments = fragments
+        self.geometries = np.array(geometries, dtype=object)
+        self.tree = STRtree(self.geometries)
+        self._variants = cache
+
+    def query(self, box: shapely.Polygon) -> np.ndarray:
+        return np.sort(self.tree.query(box, predicate="intersects"))
+
+    def outside(self, indices: np.ndarray, known: shapely.Geometry | None) -> np.ndarray:
+        if known is None:
+            return indices
+        return indices[~shapely.intersects(self.geometries[indices], known)]
+
+    def render(
+        self,
+        indices: np.ndarray,
+        variant: Hashable | None = None,
+        rewrite: Callable[[np.ndarray, list[dict]], None] | None = None,
+    ) -> list[bytes]:
+        if variant is None:
+            return [self.fragments[i] for i in indices]
+        found = {i: self._variants.get((self, variant, i)) for i in indices.tolist()}
+        missing = np.array([i for i, f in found.items() if f is None], dtype=np.intp)
+        if len(missing):
+            features = [json.loads(self.fragments[i]) for i in missing]
+            rewrite(missing, features)
+            for i, fragment in zip(missing.tolist(), map(_dumps, features)):
+                self._variants.put((self, variant, i), fragment)
+                found[i] = fragment
+        return [found[i] for i in indices.tolist()]
+
+    def simplified(self, indices: np.ndarray, tolerance: float, multi: bool) -> list[bytes]:
+        def rewrite(missing: np.ndarray, features: list[dict]) -> None:
+            geometries = shapely.simplify(
+                self.geometries[missing], tolerance, preserve_topology=True
+            )
+            for feature, geometry in zip(features, geometries):
+                lines = _lines(geometry)
+                feature["geometry"] = lines if multi else lines[0]
+
+        return self.render(indices, ("simplified", tolerance), rewrite)
+
+
+class RegionIndex:
+    def __init__(self, bbox: BBox, network: NetworkResponse, cache_bytes: int = 64 * 2**20):
+        self.bbox = bbox
+        self.variants = _VariantCache(cache_bytes)
+        self.nodes = _Layer(
+            [node.model_dump_json().encode() for node in network.nodes],
+            [shapely.points(node.position) for node in network.nodes],
+            self.variants,
+        )
+        self.node_ids = np.array([node.id for node in network.nodes], dtype=np.int64)
+
+        links = [link for link in network.links if len(link.geometry) >= 2]
+        self.links = _Layer(
+            [link.model_dump_json().encode() for link in links],
+            [shapely.linestrings(link.geometry) for link in links],
+            self.variants,
+        )
+        self.link_highways = np.array([link.tags.get("highway", "") for link in links], dtype=str)
+        self.link_ends = np.array([(link.from_node, link.to_node) for link in links], dtype=np.int64)
+
+        self.buildings = _Layer(
+            [building.model_dump_json().encode() for building in network.buildings],
+            [shapely.points(building.position) for building in network.buildings],
+            self.variants,
+        )
+        self.building_types = np.array([b.type or "" for b in network.buildings], dtype=str)
+
+        routes = [
+            (route, [line for line in route.geometry if len(line) >= 2])
+            for route in network.transport_routes
+        ]
+        routes = [(route, lines) for route, lines in routes if lines]
+        self.routes = _Layer(
+            [route.model_dump_json().encode() for route, _ in routes],
+            [shapely.multilinestrings([shapely.linestrings(line) for line in lines]) for _, lines in routes],
+            self.variants,
+        )
+
+    def covers(self, min_lat: float, min_lng: float, max_lat: float, max_lng: float) -> bool:
+        region_min_lat, region_min_lng, region_max_lat, region_max_lng = self.bbox
+        return (
+            min_lat >= region_min_lat
+            and min_lng >= region_min_lng
+            and max_lat <= region_max_lat
+            and max_lng <= region_max_lng
+        )
+
+    def network_json(
+        self,
+        min_lat: float,
+        min_lng: float,
+        max_lat: float,
+        max_lng: float,
+        lod: int = DETAIL_ZOOM,
+        layers: Collection[str] = NETWORK_LAYERS,
+        building_types: Collection[str] = VALID_BUILDING_TYPES,
+        known: Collection[BBox] = (),
+    ) -> bytes:
+        box = shapely.box(min_lng, min_lat, max_lng, max_lat)
+        known = (
+            shapely.union_all([shapely.box(w, s, e, n) for s, w, n, e in known]) if known else None
+        )
+        highways = highways_for_zoom(lod)
+        tolerance = simplify_tolerance(lod)
+        parts: dict[str, list[bytes]] = {}
+
+        links = self.links.query(box)
+        if highways is not None:
+            links = links[np.isin(self.link_highways[links], highways)]
+        if "links" in layers:
+            new_links = self.links.outside(links, known)
+            parts["links"] = (
+                self.links.simplified(new_links, tolerance, multi=False)
+                if tolerance > 0
+                else self.links.render(new_links)
+            )
+
+        if "nodes" in layers:
+            nodes = self.nodes.outside(self.nodes.query(box), known)
+            if highways is not None:
+                nodes = nodes[np.isin(self.node_ids[nodes], self.link_ends[links])]
+            parts["nodes"] = self.nodes.render(nodes)
+
+        if "buildings" in layers:
+            buildings = self.buildings.outside(self.buildings.query(box), known)
+            buildings = buildings[
+                np.isin(self.building_types[buildings], np.array(list(building_types), dtype=str))
+            ]
+            if lod >= DETAIL_ZOOM:
+                parts["buildings"] = self.buildings.render(buildings)
+            else:
+                parts["buildings"] = self.buildings.render(
+                    buildings, "without_outline", _without_outline
+                )
+
+        if "transport_routes" in layers:
+            routes = self.routes.outside(self.routes.query(box), known)
+            parts["transport_routes"] = (
+                self.routes.simplified(routes, tolerance, multi=True)
+                if tolerance > 0
+                else self.routes.render(routes)
+            )
+
+        return b"{" + b",".join(
+            b'"%s":[%s]' % (name.encode(), b",".join(parts.get(name, ())))
+            for name in NETWORK_LAYERS
+        ) + b"}"
+
+    def network(self, *args, **kwargs) -> NetworkResponse:
+        return NetworkResponse.model_validate_json(self.network_json(*args, **kwargs))
+
+
+class InMemoryRegion:
+    def __init__(
+        self,
+        repository: MapDataRepository,
+        bbox: BBox,
+        sql_json: bool = True,
+        cache_bytes: int = 64 * 2**20,
+    ):
+        self.repository = repository
+        self.bbox = bbox
+        self.sql_json = sql_json
+        self.cache_bytes = cache_bytes
+        self.index: RegionIndex | None = None
+        self._task: asyncio.Task | None = None
+        self._pending = False
+
+    def covers(self, min_lat: float, min_lng: float, max_lat: float, max_lng: float) -> bool:
+        return self.index is not None and self.index.covers(min_lat, min_lng, max_lat, max_lng)
+
+    async def load(self) -> None:
+        if self.sql_json:
+            network = await self.repository.fetch_network_from_json(*self.bbox, DETAIL_ZOOM)
+        else:
+            network = await self.repository.fetch_network(*self.bbox, DETAIL_ZOOM)
+        self.index = await asyncio.to_thread(
+            RegionIndex, self.bbox, network, self.cache_bytes
+        )
+        logger.info(
+            f"Loaded region {self.bbox}: {len(network.nodes)} nodes, {len(network.links)} links, "
+            f"{len(network.buildings)} buildings, {len(network.transport_routes)} routes"
+        )
+
+    def schedule_reload(self, version: int, extents: list[BBox] | None) -> None:
+        if self.index is not None and extents is not None:
+            region = shapely.box(self.bbox[1], self.bbox[0], self.bbox[3], self.bbox[2])
+            changed = [shapely.box(e[1], e[0], e[3], e[2]) for e in extents]
+            if not shapely.intersects(region, changed).any():
+                return
+        if self._task is not None and not self._task.done():
+            self._pending = True
+            return
+
+        async def run() -> None:
+            self._pending = True
+            while self._pending:
+                self._pending = False
+                try:
+                    await self.load()
+                except Exception:
+                    logger.exception("Failed to load the in-memory region")
+
+        self._task = asyncio.create_task(run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
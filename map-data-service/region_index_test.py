@@ -0,0 +1,114 @@
+import pytest
+
+from models import Building, NetworkResponse, TrafficLink, TrafficNode, TransportRoute
+from region_index import RegionIndex, _VariantCache, parse_region
+
+REGION = (51.85, -8.55, 51.95, -8.38)
+WIGGLE = [(-8.47, 51.90), (-8.46999, 51.90001), (-8.46, 51.90)]
+
+
+def network() -> NetworkResponse:
+    return NetworkResponse(
+        nodes=[
+            TrafficNode(id=1, position=WIGGLE[0], connection_count=1),
+            TrafficNode(id=2, position=WIGGLE[-1], connection_count=2),
+            TrafficNode(id=3, position=(-8.45, 51.90), connection_count=1),
+        ],
+        links=[
+            TrafficLink(
+                id=10, from_node=1, to_node=2, geometry=WIGGLE, tags={"highway": "primary"}
+            ),
+            TrafficLink(
+                id=20,
+                from_node=2,
+                to_node=3,
+                geometry=[WIGGLE[-1], (-8.45, 51.90)],
+                tags={"highway": "residential"},
+            ),
+        ],
+        buildings=[
+            Building(
+                id=30,
+                position=(-8.455, 51.901),
+                geometry=[(-8.456, 51.9), (-8.454, 51.9), (-8.454, 51.902), (-8.456, 51.9)],
+                type="retail",
+                tags={"building": "retail"},
+            ),
+            Building(id=40, position=(-8.4, 51.94), geometry=[], type="school", tags={}),
+        ],
+        transport_routes=[
+            TransportRoute(id=50, geometry=[WIGGLE, [(-8.40, 51.94)]], tags={"route": "bus"})
+        ],
+    )
+
+
+def ids(response: NetworkResponse) -> dict[str, list[int]]:
+    layers = NetworkResponse.model_fields
+    return {layer: [f.id for f in getattr(response, layer)] for layer in layers}
+
+
+def test_parse_region_accepts_city_ids_and_bboxes():
+    assert parse_region("cork") == REGION
+    assert parse_region("1,2,3,4") == (1, 2, 3, 4)
+    with pytest.raises(ValueError):
+        parse_region("3,2,1,4")
+
+
+def test_full_detail_matches_the_bbox():
+    index = RegionIndex(REGION, network())
+
+    response = index.network(51.89, -8.48, 51.91, -8.45)
+
+    assert ids(response) == {
+        "nodes": [1, 2, 3],
+        "links": [10, 20],
+        "buildings": [30],
+        "transport_routes": [50],
+    }
+    assert response.links[0].geometry == WIGGLE
+    assert index.covers(51.89, -8.48, 51.91, -8.45) and not index.covers(50, -8.48, 51.91, -8.45)
+
+
+def test_filters_and_known_boxes_drop_features():
+    index = RegionIndex(REGION, network())
+
+    response = index.network(
+        *REGION,
+        layers=("buildings", "links"),
+        building_types=("school",),
+        known=[(51.89, -8.455, 51.91, -8.44)],
+    )
+
+    assert ids(response) == {"nodes": [], "links": [10], "buildings": [40], "transport_routes": []}
+
+
+def test_low_detail_simplifies_and_keeps_major_roads():
+    index = RegionIndex(REGION, network())
+
+    response = index.network(*REGION, lod=10)
+
+    assert ids(response)["links"] == [10] and ids(response)["nodes"] == [1, 2]
+    assert response.links[0].geometry == [WIGGLE[0], WIGGLE[-1]]
+    assert response.buildings[0].geometry == []
+    assert response.transport_routes[0].geometry == [[WIGGLE[0], WIGGLE[-1]]]
+
+
+def test_variants_are_bounded():
+    index = RegionIndex(REGION, network(), cache_bytes=200)
+
+    for lod in range(5, 15):
+        index.network(*REGION, lod=lod)
+
+    assert 0 < index.variants.size <= 200
+
+
+def test_variant_cache_evicts_least_recently_used():
+    cache = _VariantCache(max_bytes=6)
+    cache.put("a", b"aa")
+    cache.put("b", b"bb")
+    cache.get("a")
+    cache.put("c", b"cccc")
+
+    assert cache.get("a") == b"aa" and cache.get("b") is None and cache.get("c") == b"cccc"
+    cache.put("d", b"toolarge")
+    assert cache.get("d") is None and len(cache) == 2
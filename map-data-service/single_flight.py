@@ -0,0 +1,29 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    def __init__(self):
+        self._flights: dict[Hashable, asyncio.Task[T]] = {}
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        self._flights.pop(key, None)
+        if not task.cancelled():
+            task.exception()
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._flights.get(key)
+        if task is None:
+            task = asyncio.create_task(fn())
+            self._flights[key] = task
+            task.add_done_callback(lambda _: self._done(key, task))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
@@ -0,0 +1,82 @@
+import asyncio
+
+from single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_run():
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "tile"
+
+    async def main():
+        flights = SingleFlight()
+        results = await asyncio.gather(*(flights.run("key", load) for _ in range(5)))
+        return flights, results
+
+    flights, results = asyncio.run(main())
+
+    assert results == ["tile"] * 5
+    assert calls == 1
+    assert flights.coalesced == 4
+    assert len(flights) == 0
+
+
+def test_different_keys_run_separately():
+    async def main():
+        flights = SingleFlight()
+
+        async def load(value):
+            await asyncio.sleep(0)
+            return value
+
+        results = await asyncio.gather(
+            flights.run("a", lambda: load("a")), flights.run("b", lambda: load("b"))
+        )
+        return flights, results
+
+    flights, results = asyncio.run(main())
+
+    assert results == ["a", "b"]
+    assert flights.coalesced == 0
+
+
+def test_exception_reaches_every_caller_and_the_key_runs_again():
+    async def fail():
+        await asyncio.sleep(0)
+        raise RuntimeError("db down")
+
+    async def ok():
+        return "tile"
+
+    async def main():
+        flights = SingleFlight()
+        results = await asyncio.gather(
+            flights.run("key", fail), flights.run("key", fail), return_exceptions=True
+        )
+        return results, await flights.run("key", ok)
+
+    results, again = asyncio.run(main())
+
+    assert [type(r) for r in results] == [RuntimeError, RuntimeError]
+    assert results[0] is results[1]
+    assert again == "tile"
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    async def load():
+        await asyncio.sleep(0.01)
+        return "tile"
+
+    async def main():
+        flights = SingleFlight()
+        first = asyncio.create_task(flights.run("key", load))
+        second = asyncio.create_task(flights.run("key", load))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second, first.cancelled()
+
+    assert asyncio.run(main()) == ("tile", True)
@@ -0,0 +1,143 @@
+import math
+import re
+from dataclasses import dataclass
+
+from constants import DETAIL_ZOOM, HIGHWAY_MIN_ZOOM, VALID_BUILDING_TYPES
+
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+MAX_ZOOM = 22
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+TILE_SIZE = 256
+
+LOD_VIEWPORT_TILES = 8
+
+
+@dataclass(frozen=True)
+class TileLayer:
+    name: str
+    table: str
+    columns: str
+    min_zoom: int
+    where: str = "TRUE"
+
+
+TILE_LAYERS = {
+    layer.name: layer
+    for layer in (
+        TileLayer(
+            name="links",
+            table="links",
+            columns="id, from_node, to_node, highway, lanes, maxspeed, oneway, name, ref",
+            min_zoom=0,
+            where="(CAST(:highways AS text[]) IS NULL OR t.highway = ANY(CAST(:highways AS text[])))",
+        ),
+        TileLayer(
+            name="buildings",
+            table="buildings",
+            columns="id, type, building, name",
+            min_zoom=14,
+            where="t.type = ANY(CAST(:building_types AS text[]))",
+        ),
+        TileLayer(
+            name="nodes",
+            table="nodes",
+            columns="id, connection_count",
+            min_zoom=DETAIL_ZOOM,
+        ),
+        TileLayer(
+            name="transport_routes",
+            table="transport_routes",
+            columns='id, route, ref, name, colour, operator, network, "from", "to"',
+            min_zoom=10,
+        ),
+    )
+}
+
+
+def validate_tile(z: int, x: int, y: int) -> None:
+    if not 0 <= z <= MAX_ZOOM:
+        raise ValueError(f"Zoom must be between 0 and {MAX_ZOOM}")
+    if not (0 <= x < 2**z and 0 <= y < 2**z):
+        raise ValueError(f"Tile {x}/{y} is outside zoom level {z}")
+
+
+def tile_for(lat: float, lng: float, z: int) -> tuple[int, int]:
+    n = 2**z
+    lat = max(min(lat, 85.0511), -85.0511)
+    x = int((lng + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_bounds(z: int, x: int, y: int) -> tuple[float, float, float, float]:
+    n = 2**z
+
+    def lat(row: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return lat(y + 1), x / n * 360.0 - 180.0, lat(y), (x + 1) / n * 360.0 - 180.0
+
+
+def tiles_covering(
+    min_lat: float, min_lng: float, max_lat: float, max_lng: float, z: int
+) -> list[tuple[int, int]]:
+    min_x, min_y = tile_for(max_lat, min_lng, z)
+    max_x, max_y = tile_for(min_lat, max_lng, z)
+    return [(x, y) for x in range(min_x, max_x + 1) for y in range(min_y, max_y + 1)]
+
+
+def highways_for_zoom(z: int) -> list[str] | None:
+    if z >= DETAIL_ZOOM:
+        return None
+    return sorted(h for h, min_zoom in HIGHWAY_MIN_ZOOM.items() if min_zoom <= z)
+
+
+def lod_for_bbox(min_lat: float, min_lng: float, max_lat: float, max_lng: float) -> int:
+    for z in range(DETAIL_ZOOM, 0, -1):
+        min_x, min_y = tile_for(max_lat, min_lng, z)
+        max_x, max_y = tile_for(min_lat, max_lng, z)
+        if max(max_x - min_x, max_y - min_y) + 1 <= LOD_VIEWPORT_TILES:
+            return z
+    return 0
+
+
+def simplify_tolerance(z: int) -> float:
+    if z >= DETAIL_ZOOM:
+        return 0.0
+    return 360.0 / (TILE_SIZE * 2**z)
+
+
+def tile_sql(layer: TileLayer) -> str:
+    columns = ", ".join(f"t.{c.strip()}" for c in layer.columns.split(","))
+    return f"""
+        WITH bounds AS (
+            SELECT ST_TileEnvelope(:z, :x, :y) AS merc,
+                   ST_Transform(ST_TileEnvelope(:z, :x, :y, margin => :margin), 4326) AS wgs
+        ),
+        features AS (
+            SELECT ST_AsMVTGeom(ST_Transform(t.geom, 3857), bounds.merc, :extent, :buffer, true) AS geom,
+                   {columns}
+            FROM {layer.table} t, bounds
+            WHERE t.geom && bounds.wgs AND {layer.where}
+        )
+        SELECT ST_AsMVT(features.*, :layer, :extent, 'geom', 'id')
+        FROM features
+        WHERE geom IS NOT NULL
+    """
+
+
+def tile_params(layer: TileLayer, z: int, x: int, y: int) -> dict:
+    params = {
+        "z": z,
+        "x": x,
+        "y": y,
+        "margin": TILE_BUFFER / TILE_EXTENT,
+        "extent": TILE_EXTENT,
+        "buffer": TILE_BUFFER,
+        "layer": layer.name,
+        "highways": highways_for_zoom(z),
+        "building_types": sorted(VALID_BUILDING_TYPES),
+    }
+    used = set(re.findall(r"(?<!:):(\w+)", tile_sql(layer)))
+    return {name: value for name, value in params.items() if name in used}
@@ -0,0 +1,92 @@
+import pytest
+
+from constants import DETAIL_ZOOM
+from tiles import (
+    TILE_LAYERS,
+    highways_for_zoom,
+    lod_for_bbox,
+    simplify_tolerance,
+    tile_bounds,
+    tile_for,
+    tile_params,
+    tiles_covering,
+    validate_tile,
+)
+
+
+def test_validate_tile():
+    validate_tile(0, 0, 0)
+    validate_tile(14, 2**14 - 1, 0)
+    for z, x, y in [(-1, 0, 0), (23, 0, 0), (2, 4, 0), (2, 0, -1)]:
+        with pytest.raises(ValueError):
+            validate_tile(z, x, y)
+
+
+def test_highways_by_zoom():
+    assert highways_for_zoom(DETAIL_ZOOM) is None
+    low, high = highways_for_zoom(5), highways_for_zoom(DETAIL_ZOOM - 1)
+    assert set(low) <= set(high)
+
+
+def test_tile_params_only_bind_what_the_query_uses():
+    links = tile_params(TILE_LAYERS["links"], 10, 1, 2)
+    nodes = tile_params(TILE_LAYERS["nodes"], DETAIL_ZOOM, 1, 2)
+
+    assert "highways" in links and "building_types" not in links
+    assert "highways" not in nodes and "building_types" not in nodes
+    assert nodes["z"] == DETAIL_ZOOM and nodes["layer"] == "nodes"
+
+
+def test_tile_for_known_tiles():
+    assert tile_for(0.0, 0.0, 0) == (0, 0)
+    assert tile_for(0.0, 0.0, 1) == (1, 1)
+    assert tile_for(51.8985, -8.4756, 14) == (7806, 5419)
+
+
+def test_tile_for_clamps_to_the_mercator_range():
+    assert tile_for(90.0, -180.0, 3) == (0, 0)
+    assert tile_for(-90.0, 180.0, 3) == (7, 7)
+
+
+@pytest.mark.parametrize("z, x, y", [(0, 0, 0), (5, 3, 17), (14, 7806, 5419)])
+def test_tile_bounds_contain_their_tile(z, x, y):
+    min_lat, min_lng, max_lat, max_lng = tile_bounds(z, x, y)
+
+    assert min_lat < max_lat and min_lng < max_lng
+    assert tile_for((min_lat + max_lat) / 2, (min_lng + max_lng) / 2, z) == (x, y)
+
+
+def test_whole_world_tile_bounds():
+    min_lat, min_lng, max_lat, max_lng = tile_bounds(0, 0, 0)
+
+    assert (min_lng, max_lng) == (-180.0, 180.0)
+    assert max_lat == pytest.approx(85.0511, abs=1e-4)
+    assert min_lat == pytest.approx(-85.0511, abs=1e-4)
+
+
+def test_tiles_covering():
+    assert tiles_covering(-10.0, -10.0, 10.0, 10.0, 1) == [(0, 0), (0, 1), (1, 0), (1, 1)]
+    assert tiles_covering(51.8984, -8.476, 51.8986, -8.4755, 14) == [(7806, 5419)]
+
+    bounds = tile_bounds(14, 7806, 5419)
+    assert (7806, 5419) in tiles_covering(*bounds, 14)
+
+
+def test_lod_for_bbox():
+    assert lod_for_bbox(51.89, -8.48, 51.91, -8.46) == DETAIL_ZOOM
+    assert lod_for_bbox(51.4, -10.5, 55.4, -5.4) < DETAIL_ZOOM
+    assert lod_for_bbox(-85.0, -180.0, 85.0, 180.0) <= 3
+
+
+def test_lod_for_bbox_spans_about_a_screen_of_tiles():
+    bbox = (51.4, -10.5, 55.4, -5.4)
+    z = lod_for_bbox(*bbox)
+
+    assert len(tiles_covering(*bbox, z)) <= 8 * 8
+    assert len(tiles_covering(*bbox, z + 1)) > 8
+
+
+def test_simplify_tolerance():
+    assert simplify_tolerance(DETAIL_ZOOM) == 0.0
+    assert simplify_tolerance(5) > simplify_tolerance(10) > 0
+    assert simplify_tolerance(0) == 360.0 / 256
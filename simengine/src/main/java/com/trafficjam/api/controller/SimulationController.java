@@ -44,7 +44,11 @@ public class SimulationController {
       @Parameter(description = "Number of simulation iterations") @RequestParam(value = "iterations", required = false, defaultValue = "1") Integer iterations,
       @Parameter(description = "Random seed for the simulation") @RequestParam(value = "randomSeed", required = false) Long randomSeed,
       @Parameter(description = "Optional scenario ID") @RequestParam(value = "scenarioId", required = false) String scenarioId,
-      @Parameter(description = "Optional run ID") @RequestParam(value = "runId", required = false) String runId) {
+      @Parameter(description = "Optional run ID") @RequestParam(value = "runId", required = false) String runId,
+      @Parameter(description = "QSim flow capacity factor, matching the population sample rate") @RequestParam(value = "flowCapacityFactor", required = false, defaultValue = "1.0") Double flowCapacityFactor,
+      @Parameter(description = "QSim storage capacity factor, matching the population sample rate") @RequestParam(value = "storageCapacityFactor", required = false, defaultValue = "1.0") Double storageCapacityFactor,
+      @Parameter(description = "CRS of the plans coordinates, e.g. EPSG:2157; the network is always read as WGS 84") @RequestParam(value = "coordinateSystem", required = false, defaultValue = "EPSG:4326") String coordinateSystem,
+      @Parameter(description = "Optional MatSim facilities.xml referenced by activities in the plans") @RequestParam(value = "facilitiesFile", required = false) MultipartFile facilitiesFile) {
 
     // Use a random seed if not provided
     if (randomSeed == null) {
@@ -53,7 +57,9 @@ public class SimulationController {
 
     try {
       SimulationService.SimulationStartResult result = simulationService.startSimulation(
-          networkFile, plansFile, iterations, randomSeed, scenarioId, runId);
+          networkFile, plansFile, iterations, randomSeed, scenarioId, runId,
+          new SimulationService.CapacityFactors(flowCapacityFactor, storageCapacityFactor), coordinateSystem,
+          facilitiesFile);
 
       SimulationResponse response = new SimulationResponse(
           result.simulationId(),
@@ -18,6 +18,9 @@ import java.util.stream.Collectors;
  * - {{OUTPUT_DIR}} - Output directory for simulation results
  * - {{ITERATIONS}} - Number of iterations to run
  * - {{RANDOM_SEED}} - Random seed for reproducibility
+ * - {{FLOW_CAPACITY_FACTOR}} - QSim flow capacity scaling (population sample rate)
+ * - {{STORAGE_CAPACITY_FACTOR}} - QSim storage capacity scaling (population sample rate)
+ * - {{FACILITIES_SOURCE}} / {{FACILITIES_FILE}} - Optional facilities XML
  * 
  * All other configuration (scoring, routing, qsim, etc.) is static and defined
  * in the template file: src/main/resources/config-template.xml
@@ -37,6 +40,7 @@ public class ConfigGenerator {
 
     private static final int DEFAULT_RANDOM_SEED = generateRandomSeed();
     private static final String DEFAULT_OUTPUT_DIR = "./output";
+    private static final double DEFAULT_CAPACITY_FACTOR = 1.0;
 
     /**
      * Generate a MatSim config.xml with default settings.
@@ -55,10 +59,33 @@ public class ConfigGenerator {
     }
 
     /**
-     * Generate a MatSim config.xml with full customization.
+     * Generate a MatSim config.xml with unscaled network capacities.
      */
     public String generateConfig(String networkXml, String plansXml, String coordinateSystem,
             String outputDir, int iterations, int randomSeed) {
+        return generateConfig(networkXml, plansXml, coordinateSystem, outputDir, iterations, randomSeed,
+                DEFAULT_CAPACITY_FACTOR, DEFAULT_CAPACITY_FACTOR);
+    }
+
+    /**
+     * Generate a MatSim config.xml with full customization.
+     * Capacity factors should match the population sample rate (e.g. 0.1 for a
+     * 10% sample) so that congestion behaves like the full population.
+     */
+    public String generateConfig(String networkXml, String plansXml, String coordinateSystem,
+            String outputDir, int iterations, int randomSeed, double flowCapacityFactor,
+            double storageCapacityFactor) {
+        return generateConfig(networkXml, plansXml, coordinateSystem, outputDir, iterations, randomSeed,
+                flowCapacityFactor, storageCapacityFactor, null);
+    }
+
+    /**
+     * Generate a MatSim config.xml that also loads facilities from
+     * {@code facilitiesXml} (no facilities when null).
+     */
+    public String generateConfig(String networkXml, String plansXml, String coordinateSystem,
+            String outputDir, int iterations, int randomSeed, double flowCapacityFactor,
+            double storageCapacityFactor, String facilitiesXml) {
         // Load the template from resources
         String template = loadTemplate();
 
@@ -69,7 +96,11 @@ public class ConfigGenerator {
                 .replace("{{PLANS_FILE}}", plansXml)
                 .replace("{{OUTPUT_DIR}}", outputDir)
                 .replace("{{ITERATIONS}}", String.valueOf(iterations))
-                .replace("{{RANDOM_SEED}}", String.valueOf(randomSeed));
+                .replace("{{RANDOM_SEED}}", String.valueOf(randomSeed))
+                .replace("{{FLOW_CAPACITY_FACTOR}}", String.valueOf(flowCapacityFactor))
+                .replace("{{STORAGE_CAPACITY_FACTOR}}", String.valueOf(storageCapacityFactor))
+                .replace("{{FACILITIES_SOURCE}}", facilitiesXml == null ? "none" : "fromFile")
+                .replace("{{FACILITIES_FILE}}", facilitiesXml == null ? "null" : facilitiesXml);
 
         return config;
     }
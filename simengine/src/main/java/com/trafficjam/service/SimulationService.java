@@ -36,11 +36,39 @@ public class SimulationService {
     this.simWrapperNatsPublisher = simWrapperNatsPublisher;
   }
 
+  private static final String WGS84 = "EPSG:4326";
+
   public record SimulationStartResult(String simulationId, String scenarioId, String runId) {
   }
 
+  /**
+   * QSim capacity scaling for sampled populations (1.0 = full population).
+   */
+  public record CapacityFactors(double flow, double storage) {
+    public static final CapacityFactors UNSCALED = new CapacityFactors(1.0, 1.0);
+  }
+
   public SimulationStartResult startSimulation(MultipartFile networkFile, MultipartFile plansFile, Integer iterations,
       Long randomSeed, String scenarioId, String runId) throws IOException {
+    return startSimulation(networkFile, plansFile, iterations, randomSeed, scenarioId, runId,
+        CapacityFactors.UNSCALED);
+  }
+
+  public SimulationStartResult startSimulation(MultipartFile networkFile, MultipartFile plansFile, Integer iterations,
+      Long randomSeed, String scenarioId, String runId, CapacityFactors capacityFactors) throws IOException {
+    return startSimulation(networkFile, plansFile, iterations, randomSeed, scenarioId, runId, capacityFactors,
+        WGS84, null);
+  }
+
+  /**
+   * Starts a simulation whose plans are in {@code coordinateSystem}. The
+   * uploaded network is always WGS 84 and is reprojected by MatSim on read.
+   * {@code facilitiesFile} is optional; when present, activities in the plans
+   * may reference its facilities instead of carrying coordinates.
+   */
+  public SimulationStartResult startSimulation(MultipartFile networkFile, MultipartFile plansFile, Integer iterations,
+      Long randomSeed, String scenarioId, String runId, CapacityFactors capacityFactors, String coordinateSystem,
+      MultipartFile facilitiesFile) throws IOException {
     if (!natsClient.isConnected()) {
       throw new IllegalStateException("Cannot start simulation: NATS JetStream is not connected");
     }
@@ -49,7 +77,8 @@ public class SimulationService {
         : scenarioId;
     final String finalRunId = (runId == null || runId.isEmpty()) ? UUID.randomUUID().toString() : runId;
 
-    Path configPath = prepareSimulationFiles(finalScenarioId, networkFile, plansFile, iterations, randomSeed);
+    Path configPath = prepareSimulationFiles(finalScenarioId, networkFile, plansFile, iterations, randomSeed,
+        capacityFactors, coordinateSystem, facilitiesFile);
 
     natsClient.publishStatus(finalScenarioId, finalRunId, MatsimRunner.SimulationState.RUNNING.name());
 
@@ -69,16 +98,26 @@ public class SimulationService {
   }
 
   private Path prepareSimulationFiles(String scenarioId, MultipartFile networkFile, MultipartFile plansFile,
-      Integer iterations, Long randomSeed) throws IOException {
+      Integer iterations, Long randomSeed, CapacityFactors capacityFactors, String coordinateSystem,
+      MultipartFile facilitiesFile) throws IOException {
     Path simDir = Paths.get(tempDirectory, scenarioId);
     Files.createDirectories(simDir);
 
     Path networkPath = simDir.resolve("network.xml");
     networkFile.transferTo(networkPath.toFile());
 
-    Path plansPath = simDir.resolve("plans.xml");
+    // Keep the .gz suffix for precompressed plans so MatSim decompresses them on read
+    String plansName = isGzipped(plansFile) ? "plans.xml.gz" : "plans.xml";
+    Path plansPath = simDir.resolve(plansName);
     plansFile.transferTo(plansPath.toFile());
 
+    String facilitiesPath = null;
+    if (facilitiesFile != null && !facilitiesFile.isEmpty()) {
+      Path path = simDir.resolve(isGzipped(facilitiesFile) ? "facilities.xml.gz" : "facilities.xml");
+      facilitiesFile.transferTo(path.toFile());
+      facilitiesPath = path.toString();
+    }
+
     Path outputPath = Paths.get(outputDirectory, scenarioId);
     Files.createDirectories(outputPath);
 
@@ -87,15 +126,23 @@ public class SimulationService {
     String configContent = generator.generateConfig(
         networkPath.toString(),
         plansPath.toString(),
-        "EPSG:4326",
+        coordinateSystem,
         outputPath.toString(),
         iterations,
-        randomSeed.intValue());
+        randomSeed.intValue(),
+        capacityFactors.flow(),
+        capacityFactors.storage(),
+        facilitiesPath);
 
     Files.writeString(configPath, configContent);
     return configPath;
   }
 
+  private static boolean isGzipped(MultipartFile file) {
+    String name = file.getOriginalFilename();
+    return name != null && name.endsWith(".gz");
+  }
+
   private void handleOutputEvent(String scenarioId, String runId, EventHandler.TransformedEvent event) {
     natsClient.publishEvent(scenarioId, runId, event);
   }
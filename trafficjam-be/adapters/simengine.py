@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Protocol
+from typing import IO, Protocol
 
 import httpx
 
@@ -17,9 +17,14 @@ class SimulationEnginePort(Protocol):
         network_filename: str,
         network_file: bytes,
         network_content_type: str,
-        plans_xml: str,
+        plans_xml: str | IO[bytes],
         iterations: int,
         random_seed: int | None,
+        flow_capacity_factor: float = 1.0,
+        storage_capacity_factor: float = 1.0,
+        plans_filename: str = "plans.xml",
+        coordinate_system: str = "EPSG:4326",
+        facilities_xml: IO[bytes] | None = None,
     ) -> SimulationStartResult: ...
 
 
@@ -34,15 +39,32 @@ class HttpSimEngineAdapter:
         network_filename: str,
         network_file: bytes,
         network_content_type: str,
-        plans_xml: str,
+        plans_xml: str | IO[bytes],
         iterations: int,
         random_seed: int | None,
+        flow_capacity_factor: float = 1.0,
+        storage_capacity_factor: float = 1.0,
+        plans_filename: str = "plans.xml",
+        coordinate_system: str = "EPSG:4326",
+        facilities_xml: IO[bytes] | None = None,
     ) -> SimulationStartResult:
+        plans_content_type = (
+            "application/gzip" if plans_filename.endswith(".gz") else "application/xml"
+        )
         files = {
             "networkFile": (network_filename, network_file, network_content_type),
-            "plansFile": ("plans.xml", plans_xml, "application/xml"),
+            "plansFile": (plans_filename, plans_xml, plans_content_type),
+        }
+        if facilities_xml is not None:
+            files["facilitiesFile"] = ("facilities.xml", facilities_xml, "application/xml")
+        data = {
+            "iterations": iterations,
+            "scenarioId": scenario_id,
+            "runId": run_id,
+            "flowCapacityFactor": flow_capacity_factor,
+            "storageCapacityFactor": storage_capacity_factor,
+            "coordinateSystem": coordinate_system,
         }
-        data = {"iterations": iterations, "scenarioId": scenario_id, "runId": run_id}
         if random_seed is not None:
             data["randomSeed"] = random_seed
 
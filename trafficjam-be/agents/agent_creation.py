@@ -1,10 +1,11 @@
 import logging
 import random
 import uuid
+from collections.abc import Iterator
 
 from .models import Building, Child, Adult, Agent, TransportMode
 from .geo import calculate_area_wgs84
-from .population import estimate_population
+from .population import PopulationSample, estimate_population, sample_population
 from .work_assignment import assign_work_location
 from .school_assignment import assign_school_to_child, get_schools_from_buildings
 from .agent_attributes import (
@@ -25,6 +26,13 @@ def calculate_population_from_bounds(
     return estimate_population(area_km2, agent_config)
 
 
+def plan_population(
+    bounds: dict[str, float], agent_config: AgentConfig, max_agents: int | None
+) -> PopulationSample:
+    full_population = calculate_population_from_bounds(bounds, agent_config)
+    return sample_population(full_population, agent_config, max_agents)
+
+
 def create_child(
     home: Building,
     schools: list[Building],
@@ -117,18 +125,30 @@ def create_household(
     return household
 
 
-def create_agents_from_network(
+def iter_households(
     bounds: dict[str, float],
     buildings: list[Building],
     transport_routes: list,
     country_code: str = "IRL",
     agent_config: AgentConfig | None = None,
-    max_agents: int = 1000,
-) -> list[Agent]:
+    max_agents: int | None = None,
+    shard: tuple[int, int] | None = None,
+) -> Iterator[list[Agent]]:
+    """Lazily yield one household at a time so callers can plan and serialize
+    agents without holding the whole population in memory.
+
+    ``shard=(index, count)`` yields only every ``count``-th household starting
+    at ``index``, so parallel workers can split one population between them.
+    """
     cfg = agent_config or default_config
-    total_population = calculate_population_from_bounds(bounds, cfg)
-    total_population = min(total_population, max_agents)
-    logger.info(f"Creating ~{total_population} agents for {country_code}")
+    sample = plan_population(
+        bounds, cfg, max_agents if max_agents is not None else cfg.max_agents
+    )
+    total_population = sample.agent_count
+    logger.info(
+        f"Creating ~{total_population} agents for {country_code} "
+        f"({sample.sample_rate:.2%} sample of {sample.full_population})"
+    )
 
     residential_buildings = [
         b for b in buildings if b.type in [None, "residential", "apartments", "house"]
@@ -139,16 +159,38 @@ def create_agents_from_network(
     schools, kindergartens = get_schools_from_buildings(buildings)
     has_transport = len(transport_routes) > 0
 
-    agents: list[Agent] = []
     avg_household_size = 2.5
     num_households = int(total_population / avg_household_size)
+    if total_population > 0:
+        num_households = max(1, num_households)
 
-    for _ in range(num_households):
+    households = range(num_households)
+    if shard is not None:
+        index, count = shard
+        households = households[index::count]
+
+    for _ in households:
         home = random.choice(residential_buildings)
-        household = create_household(
+        yield create_household(
             home, buildings, schools, kindergartens, has_transport, cfg
         )
+
+
+def create_agents_from_network(
+    bounds: dict[str, float],
+    buildings: list[Building],
+    transport_routes: list,
+    country_code: str = "IRL",
+    agent_config: AgentConfig | None = None,
+    max_agents: int | None = None,
+) -> list[Agent]:
+    agents: list[Agent] = []
+    num_households = 0
+    for household in iter_households(
+        bounds, buildings, transport_routes, country_code, agent_config, max_agents
+    ):
         agents.extend(household)
+        num_households += 1
 
     children = [a for a in agents if isinstance(a, Child)]
     adults = [a for a in agents if isinstance(a, Adult)]
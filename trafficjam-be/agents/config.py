@@ -1,5 +1,8 @@
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+DEFAULT_MAX_AGENTS = 1000
+
 
 class AgentConfig(BaseSettings):
     model_config = SettingsConfigDict(
@@ -19,6 +22,9 @@ class AgentConfig(BaseSettings):
     errand_max_minutes: int = 120
     child_dropoff_min_minutes: int = 5
     child_dropoff_max_minutes: int = 10
+    sample_rate: float = Field(default=1.0, gt=0, le=1)
+    scale_capacity: bool = False
+    max_agents: int | None = DEFAULT_MAX_AGENTS
 
     @classmethod
     def from_plan_params(cls, plan_params: dict) -> "AgentConfig":
@@ -34,6 +40,12 @@ class AgentConfig(BaseSettings):
             errand_max_minutes=plan_params.get("errandMaxMinutes", 120),
             child_dropoff_min_minutes=plan_params.get("childDropoffMinMinutes", 5),
             child_dropoff_max_minutes=plan_params.get("childDropoffMaxMinutes", 10),
+            sample_rate=plan_params.get("sampleRate", 1.0),
+            scale_capacity="sampleRate" in plan_params,
+            max_agents=plan_params.get(
+                "maxAgents",
+                None if "sampleRate" in plan_params else DEFAULT_MAX_AGENTS,
+            ),
         )
 
 
@@ -53,6 +65,8 @@ POPULATION_DENSITY: dict[str, int] = {
 }
 
 ADULT_DEPARTURE_CUMULATIVE_PROBS = [0.05, 0.15, 0.35, 0.65, 0.85, 0.95]
+ADULT_DEPARTURE_BIN_START_MINUTES = [360, 390, 420, 450, 480, 510, 540]
+ADULT_DEPARTURE_BIN_WIDTH_MINUTES = 30
 
 ELDERLY_DEPARTURE_HOURS = [9, 10, 11]
 ELDERLY_DEPARTURE_WEIGHTS = [0.4, 0.4, 0.2]
@@ -1,9 +1,12 @@
+import bisect
 import random
 from datetime import time
 
 from ..config import (
     AgentConfig,
     ADULT_DEPARTURE_CUMULATIVE_PROBS,
+    ADULT_DEPARTURE_BIN_START_MINUTES,
+    ADULT_DEPARTURE_BIN_WIDTH_MINUTES,
     ELDERLY_DEPARTURE_HOURS,
     ELDERLY_DEPARTURE_WEIGHTS,
     WORK_HOURS,
@@ -15,25 +18,10 @@ from ..config import (
 
 
 def generate_departure_time_adult() -> time:
-    rand = random.random()
-    p = ADULT_DEPARTURE_CUMULATIVE_PROBS
-
-    if rand < p[0]:
-        hour, minute = 6, random.randint(0, 29)
-    elif rand < p[1]:
-        hour, minute = 6, random.randint(30, 59)
-    elif rand < p[2]:
-        hour, minute = 7, random.randint(0, 29)
-    elif rand < p[3]:
-        hour, minute = 7, random.randint(30, 59)
-    elif rand < p[4]:
-        hour, minute = 8, random.randint(0, 29)
-    elif rand < p[5]:
-        hour, minute = 8, random.randint(30, 59)
-    else:
-        hour, minute = 9, random.randint(0, 29)
-
-    return time(hour, minute)
+    bin_index = bisect.bisect_right(ADULT_DEPARTURE_CUMULATIVE_PROBS, random.random())
+    start = ADULT_DEPARTURE_BIN_START_MINUTES[bin_index]
+    minutes = start + random.randint(0, ADULT_DEPARTURE_BIN_WIDTH_MINUTES - 1)
+    return time(minutes // 60, minutes % 60)
 
 
 def generate_departure_time_elderly() -> time:
@@ -75,3 +63,36 @@ def generate_errand_duration(agent_config: AgentConfig) -> time:
 
 def should_go_shopping(agent_config: AgentConfig) -> bool:
     return random.random() < agent_config.shopping_probability
+
+
+class DrawnSchedule:
+    """Per-agent draws with the attributes of `batch_scheduler.AgentSchedule`,
+    for plans generated one agent at a time. Each attribute draws anew."""
+
+    def __init__(self, age: int, agent_config: AgentConfig):
+        self.age = age
+        self.agent_config = agent_config
+
+    @property
+    def adult_departure(self) -> time:
+        return generate_departure_time_adult()
+
+    @property
+    def elderly_departure(self) -> time:
+        return generate_departure_time_elderly()
+
+    @property
+    def school_departure(self) -> time:
+        return generate_departure_time_school(self.age, self.agent_config)
+
+    @property
+    def work_duration(self) -> time:
+        return generate_work_duration()
+
+    @property
+    def school_duration(self) -> time:
+        return generate_school_duration(self.age, self.agent_config)
+
+    @property
+    def errand_duration(self) -> time:
+        return generate_errand_duration(self.agent_config)
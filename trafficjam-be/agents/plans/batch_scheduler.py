@@ -0,0 +1,174 @@
+"""Column-wise sampling of activity timings for many agents at once.
+
+Mirrors the per-agent draws in ``activity_scheduler`` but returns NumPy arrays
+of seconds since midnight, using inverse-CDF lookups over the distributions in
+``agents.config``. Plan generation samples one batch of agents at a time and
+hands each agent its row as an ``AgentSchedule``.
+"""
+from dataclasses import dataclass
+from datetime import time
+
+import numpy as np
+
+from ..config import (
+    AgentConfig,
+    ADULT_DEPARTURE_CUMULATIVE_PROBS,
+    ADULT_DEPARTURE_BIN_START_MINUTES,
+    ADULT_DEPARTURE_BIN_WIDTH_MINUTES,
+    ELDERLY_DEPARTURE_HOURS,
+    ELDERLY_DEPARTURE_WEIGHTS,
+    WORK_HOURS,
+    WORK_HOURS_WEIGHTS,
+    WORK_MINUTES_CHOICES,
+    SCHOOL_DEPARTURE_HOURS,
+    SCHOOL_DEPARTURE_WEIGHTS,
+)
+
+_ADULT_CDF = np.asarray(ADULT_DEPARTURE_CUMULATIVE_PROBS)
+_ADULT_BIN_STARTS = np.asarray(ADULT_DEPARTURE_BIN_START_MINUTES)
+_ELDERLY_HOURS = np.asarray(ELDERLY_DEPARTURE_HOURS)
+_WORK_HOURS = np.asarray(WORK_HOURS)
+_WORK_MINUTES = np.asarray(WORK_MINUTES_CHOICES)
+_SCHOOL_HOURS = np.asarray(SCHOOL_DEPARTURE_HOURS)
+
+
+def _cdf(weights: list[float]) -> np.ndarray:
+    cumulative = np.cumsum(np.asarray(weights, dtype=float))
+    return cumulative / cumulative[-1]
+
+
+_ELDERLY_CDF = _cdf(ELDERLY_DEPARTURE_WEIGHTS)
+_WORK_HOURS_CDF = _cdf(WORK_HOURS_WEIGHTS)
+_SCHOOL_HOURS_CDF = _cdf(SCHOOL_DEPARTURE_WEIGHTS)
+
+
+def _inverse_cdf(cdf: np.ndarray, u: np.ndarray) -> np.ndarray:
+    return np.minimum(np.searchsorted(cdf, u, side="right"), len(cdf) - 1)
+
+
+def sample_adult_departures(n: int, rng: np.random.Generator) -> np.ndarray:
+    bins = np.searchsorted(_ADULT_CDF, rng.random(n), side="right")
+    minutes = _ADULT_BIN_STARTS[bins] + rng.integers(
+        0, ADULT_DEPARTURE_BIN_WIDTH_MINUTES, n
+    )
+    return minutes * 60
+
+
+def sample_elderly_departures(n: int, rng: np.random.Generator) -> np.ndarray:
+    hours = _ELDERLY_HOURS[_inverse_cdf(_ELDERLY_CDF, rng.random(n))]
+    return (hours * 60 + rng.integers(0, 60, n)) * 60
+
+
+def sample_school_departures(
+    ages: np.ndarray, agent_config: AgentConfig, rng: np.random.Generator
+) -> np.ndarray:
+    n = len(ages)
+    hours = _SCHOOL_HOURS[_inverse_cdf(_SCHOOL_HOURS_CDF, rng.random(n))]
+    independent_minutes = np.where(
+        hours == 7, 7 * 60 + rng.integers(30, 60, n), 8 * 60 + rng.integers(0, 16, n)
+    )
+    accompanied_minutes = 8 * 60 + rng.integers(0, 31, n)
+    minutes = np.where(
+        ages < agent_config.min_independent_school_age,
+        accompanied_minutes,
+        independent_minutes,
+    )
+    return minutes * 60
+
+
+def sample_work_durations(n: int, rng: np.random.Generator) -> np.ndarray:
+    hours = _WORK_HOURS[_inverse_cdf(_WORK_HOURS_CDF, rng.random(n))]
+    minutes = _WORK_MINUTES[rng.integers(0, len(_WORK_MINUTES), n)]
+    return (hours * 60 + minutes) * 60
+
+
+def sample_school_durations(
+    ages: np.ndarray, agent_config: AgentConfig, rng: np.random.Generator
+) -> np.ndarray:
+    n = len(ages)
+    hours = np.select(
+        [
+            ages < agent_config.kindergarten_age,
+            ages < agent_config.min_independent_school_age,
+        ],
+        [rng.integers(4, 7, n), rng.integers(5, 7, n)],
+        default=rng.integers(6, 8, n),
+    )
+    return (hours * 60 + rng.integers(0, 2, n) * 30) * 60
+
+
+def sample_errand_durations(
+    n: int, agent_config: AgentConfig, rng: np.random.Generator
+) -> np.ndarray:
+    minutes = rng.integers(
+        agent_config.errand_min_minutes, agent_config.errand_max_minutes + 1, n
+    )
+    return minutes * 60
+
+
+def seconds_to_time(seconds: int) -> time:
+    seconds = int(seconds)
+    return time(seconds // 3600, (seconds // 60) % 60, seconds % 60)
+
+
+@dataclass(frozen=True)
+class AgentSchedule:
+    """One agent's timings, as read by the plan generators."""
+
+    adult_departure: time
+    elderly_departure: time
+    school_departure: time
+    work_duration: time
+    school_duration: time
+    errand_duration: time
+
+
+@dataclass
+class ScheduleColumns:
+    adult_departure: np.ndarray
+    elderly_departure: np.ndarray
+    school_departure: np.ndarray
+    work_duration: np.ndarray
+    school_duration: np.ndarray
+    errand_duration: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.adult_departure)
+
+    def rows(self) -> list[AgentSchedule]:
+        columns = [
+            self.adult_departure,
+            self.elderly_departure,
+            self.school_departure,
+            self.work_duration,
+            self.school_duration,
+            self.errand_duration,
+        ]
+        return [
+            AgentSchedule(*(seconds_to_time(value) for value in row))
+            for row in zip(*(column.tolist() for column in columns))
+        ]
+
+
+class BatchScheduler:
+    """Draws every timing column for ``len(ages)`` agents in one pass.
+
+    Row ``i`` of each column belongs to agent ``i``; callers pick the columns
+    that apply to the agent's plan type and ignore the rest.
+    """
+
+    def __init__(self, agent_config: AgentConfig, seed: int | None = None):
+        self.agent_config = agent_config
+        self.rng = np.random.default_rng(seed)
+
+    def sample(self, ages: np.ndarray | list[int]) -> ScheduleColumns:
+        ages = np.asarray(ages, dtype=np.int64)
+        n = len(ages)
+        return ScheduleColumns(
+            adult_departure=sample_adult_departures(n, self.rng),
+            elderly_departure=sample_elderly_departures(n, self.rng),
+            school_departure=sample_school_departures(ages, self.agent_config, self.rng),
+            work_duration=sample_work_durations(n, self.rng),
+            school_duration=sample_school_durations(ages, self.agent_config, self.rng),
+            errand_duration=sample_errand_durations(n, self.agent_config, self.rng),
+        )
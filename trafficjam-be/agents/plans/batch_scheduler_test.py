@@ -0,0 +1,154 @@
+from datetime import time
+
+import numpy as np
+
+from agents.config import AgentConfig, ADULT_DEPARTURE_CUMULATIVE_PROBS
+from agents.models import ActivityType, Building
+from agents.plans import population
+from agents.plans.batch_scheduler import (
+    AgentSchedule,
+    BatchScheduler,
+    sample_adult_departures,
+    sample_errand_durations,
+    sample_school_departures,
+    sample_school_durations,
+    sample_work_durations,
+    seconds_to_time,
+)
+from agents.plans.plan_generator import generate_plan_for_agent
+from agents.plans.strategies_test import SCHOOL, make_adult, make_child
+
+CONFIG = AgentConfig()
+N = 20_000
+
+
+def rng() -> np.random.Generator:
+    return np.random.default_rng(42)
+
+
+class TestAdultDepartures:
+    def test_within_morning_window(self):
+        departures = sample_adult_departures(N, rng())
+        assert departures.min() >= 6 * 3600
+        assert departures.max() < 9 * 3600 + 30 * 60
+
+    def test_bin_shares_follow_cumulative_probs(self):
+        departures = sample_adult_departures(N, rng())
+        share_before_7 = np.mean(departures < 7 * 3600)
+        assert abs(share_before_7 - ADULT_DEPARTURE_CUMULATIVE_PROBS[1]) < 0.02
+
+
+class TestSchoolColumns:
+    def test_young_children_leave_between_8_and_830(self):
+        ages = np.full(N, CONFIG.min_independent_school_age - 1)
+        departures = sample_school_departures(ages, CONFIG, rng())
+        assert departures.min() >= 8 * 3600
+        assert departures.max() <= 8 * 3600 + 30 * 60
+
+    def test_older_children_leave_between_730_and_815(self):
+        ages = np.full(N, CONFIG.min_independent_school_age)
+        departures = sample_school_departures(ages, CONFIG, rng())
+        assert departures.min() >= 7 * 3600 + 30 * 60
+        assert departures.max() <= 8 * 3600 + 15 * 60
+
+    def test_durations_depend_on_age(self):
+        ages = np.array([CONFIG.kindergarten_age - 1] * N + [17] * N)
+        durations = sample_school_durations(ages, CONFIG, rng())
+        assert durations[:N].min() >= 4 * 3600
+        assert durations[:N].max() <= 6 * 3600 + 30 * 60
+        assert durations[N:].min() >= 6 * 3600
+
+
+def test_work_durations_use_configured_hours():
+    durations = sample_work_durations(N, rng())
+    assert set(np.unique(durations // 3600)) == {7, 8, 9}
+    assert set(np.unique((durations // 60) % 60)) == {0, 15, 30, 45}
+
+
+def test_errand_durations_respect_config_bounds():
+    durations = sample_errand_durations(N, CONFIG, rng())
+    assert durations.min() >= CONFIG.errand_min_minutes * 60
+    assert durations.max() <= CONFIG.errand_max_minutes * 60
+
+
+def test_scheduler_returns_one_row_per_agent_and_is_seeded():
+    ages = [8, 14, 35, 70]
+    first = BatchScheduler(CONFIG, seed=7).sample(ages)
+    second = BatchScheduler(CONFIG, seed=7).sample(ages)
+    assert len(first) == len(ages)
+    assert np.array_equal(first.adult_departure, second.adult_departure)
+    assert np.array_equal(first.school_duration, second.school_duration)
+
+
+def test_seconds_to_time():
+    assert seconds_to_time(7 * 3600 + 45 * 60) == time(7, 45)
+
+
+SCHEDULE = AgentSchedule(
+    adult_departure=time(7, 5),
+    elderly_departure=time(10, 20),
+    school_departure=time(8, 10),
+    work_duration=time(8, 15),
+    school_duration=time(6, 30),
+    errand_duration=time(0, 40),
+)
+
+
+def test_rows_convert_columns_to_times():
+    columns = BatchScheduler(CONFIG, seed=3).sample([9, 40])
+    rows = columns.rows()
+    assert len(rows) == 2
+    assert rows[1].work_duration == seconds_to_time(columns.work_duration[1])
+
+
+class TestPlansUseSchedule:
+    def test_work_plan(self):
+        plan = generate_plan_for_agent(make_adult(), [], CONFIG, SCHEDULE)
+        assert plan.activities[0].end_time == time(7, 5)
+        assert plan.activities[1].duration == time(8, 15)
+
+    def test_child_plan(self):
+        plan = generate_plan_for_agent(make_child(), [], CONFIG, SCHEDULE)
+        assert plan.activities[0].end_time == time(8, 10)
+        assert plan.activities[1].duration == time(6, 30)
+
+    def test_dropoff_plan(self):
+        adult = make_adult(
+            needs_to_dropoff_children=True,
+            children=[make_child(age=6, needs_dropoff=True)],
+        )
+        plan = generate_plan_for_agent(adult, [], CONFIG, SCHEDULE)
+        assert plan.activities[0].end_time == time(8, 10)
+        assert plan.activities[2].duration == time(8, 15)
+
+    def test_elderly_plan(self):
+        elderly = make_adult(age=75, employed=False)
+        plan = generate_plan_for_agent(elderly, [SCHOOL], CONFIG, SCHEDULE)
+        assert plan.activities[0].end_time == time(10, 20)
+
+
+def test_population_plans_come_from_batched_samples(monkeypatch):
+    sampled: list[AgentSchedule] = []
+
+    class RecordingScheduler(BatchScheduler):
+        def sample(self, ages):
+            columns = super().sample(ages)
+            sampled.extend(columns.rows())
+            return columns
+
+    monkeypatch.setattr(population, "BatchScheduler", RecordingScheduler)
+    monkeypatch.setattr(population, "SCHEDULE_BATCH_AGENTS", 10)
+    home = Building(id="h", osm_id=1, position=(51.9, -8.47), geometry=[], type="house", tags={})
+    bounds = {"south": 51.89, "west": -8.48, "north": 51.91, "east": -8.46}
+
+    agent_plans = list(population.iter_agent_plans(bounds, [home], CONFIG, max_agents=40))
+
+    assert len(sampled) == len(agent_plans) > 10
+    for (_, plan), schedule in zip(agent_plans, sampled):
+        if plan is not None:
+            assert plan.activities[0].type == ActivityType.HOME
+            assert plan.activities[0].end_time in (
+                schedule.adult_departure,
+                schedule.elderly_departure,
+                schedule.school_departure,
+            )
@@ -0,0 +1,222 @@
+"""Offline bulk generation of plans, population and stats files.
+
+Used by ``cli.py`` for precomputing large populations outside the API. Each
+worker process generates one shard of households and writes its own gzip
+member; the members are concatenated into a single valid ``.gz`` file.
+"""
+import csv
+import gzip
+import io
+import json
+import logging
+import random
+import shutil
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from agents.agent_creation import plan_population
+from agents.config import AgentConfig
+from agents.models import Adult, Agent, Building, Child, DailyPlan
+from agents.plans.population import iter_agent_plans
+from agents.plans.projection import WGS84, projector_for_buildings
+from agents.plans.xml_writer import PLANS_DOCTYPE, XML_DECLARATION, MATSimXMLWriter
+
+logger = logging.getLogger(__name__)
+
+PLANS_FILENAME = "plans.xml.gz"
+POPULATION_FILENAME = "population.csv.gz"
+STATS_FILENAME = "stats.json"
+
+POPULATION_COLUMNS = [
+    "id",
+    "kind",
+    "age",
+    "home_id",
+    "home_lat",
+    "home_lon",
+    "employed",
+    "work_id",
+    "work_type",
+    "school_id",
+    "preferred_transport",
+    "has_plan",
+]
+
+
+@dataclass
+class BulkResult:
+    plans_path: Path
+    population_path: Path
+    stats_path: Path
+    stats: dict = field(default_factory=dict)
+
+
+def _agent_kind(agent: Agent, agent_config: AgentConfig) -> str:
+    if isinstance(agent, Child):
+        return "child"
+    assert isinstance(agent, Adult)
+    if agent.age >= agent_config.elderly_age_threshold:
+        return "elderly"
+    return "employed_adult" if agent.employed else "non_employed_adult"
+
+
+def _population_row(agent: Agent, kind: str, has_plan: bool) -> list:
+    work = agent.work if isinstance(agent, Adult) else None
+    work_type = agent.work_type if isinstance(agent, Adult) else None
+    school = agent.school if isinstance(agent, Child) else None
+    return [
+        agent.id,
+        kind,
+        agent.age,
+        agent.home.id,
+        agent.home.position[0],
+        agent.home.position[1],
+        isinstance(agent, Adult) and agent.employed,
+        work.id if work else "",
+        work_type or "",
+        school.id if school else "",
+        agent.preferred_transport.value,
+        has_plan,
+    ]
+
+
+def _count_plan(stats: Counter, plan: DailyPlan) -> None:
+    stats["persons"] += 1
+    for activity in plan.activities:
+        stats[f"activities.{activity.type.value}"] += 1
+    for leg in plan.transport:
+        stats[f"legs.{leg.mode}"] += 1
+
+
+def _generate_shard(
+    shard_index: int,
+    shard_count: int,
+    bounds: dict,
+    buildings: list[Building],
+    agent_config: AgentConfig,
+    seed: int | None,
+    work_dir: Path,
+    crs: str,
+) -> tuple[dict, Path, Path]:
+    if seed is not None:
+        random.seed(seed + shard_index)
+
+    writer = MATSimXMLWriter(crs, projector_for_buildings(crs, buildings))
+    stats: Counter = Counter()
+    plans_part = work_dir / f"plans.part{shard_index:04d}.gz"
+    population_part = work_dir / f"population.part{shard_index:04d}.gz"
+
+    with (
+        gzip.open(plans_part, "wt", encoding="utf-8") as plans_out,
+        gzip.open(population_part, "wt", encoding="utf-8", newline="") as pop_out,
+    ):
+        population = csv.writer(pop_out)
+        for agent, plan in iter_agent_plans(
+            bounds,
+            buildings,
+            agent_config,
+            agent_config.max_agents,
+            shard=(shard_index, shard_count),
+        ):
+            kind = _agent_kind(agent, agent_config)
+            stats["agents"] += 1
+            stats[f"agents.{kind}"] += 1
+            stats[f"modes.{agent.preferred_transport.value}"] += 1
+            population.writerow(_population_row(agent, kind, plan is not None))
+            if plan is not None:
+                _count_plan(stats, plan)
+                plans_out.write(writer.serialize_person(agent.id, plan))
+
+    return dict(stats), plans_part, population_part
+
+
+def _gzip_member(text: str) -> bytes:
+    return gzip.compress(text.encode("utf-8"))
+
+
+def _concat_members(target: Path, head: bytes, parts: list[Path], tail: bytes = b"") -> None:
+    with open(target, "wb") as out:
+        out.write(head)
+        for part in parts:
+            with open(part, "rb") as f:
+                shutil.copyfileobj(f, out)
+        out.write(tail)
+
+
+def generate_bulk(
+    bounds: dict,
+    buildings: list[Building],
+    agent_config: AgentConfig,
+    out_dir: str | Path,
+    workers: int = 1,
+    seed: int | None = None,
+    crs: str = WGS84,
+) -> BulkResult:
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+
+    sample = plan_population(bounds, agent_config, agent_config.max_agents)
+    shard_count = max(1, workers)
+    # A fresh directory per run, so parts left behind by a crashed run are
+    # never concatenated into this one
+    work_dir = Path(tempfile.mkdtemp(prefix=".parts-", dir=out_dir))
+    try:
+        shard_args = [
+            (i, shard_count, bounds, buildings, agent_config, seed, work_dir, crs)
+            for i in range(shard_count)
+        ]
+        if shard_count == 1:
+            shards = [_generate_shard(*shard_args[0])]
+        else:
+            with ProcessPoolExecutor(max_workers=shard_count) as pool:
+                shards = list(pool.map(_generate_shard, *zip(*shard_args)))
+
+        totals: Counter = Counter()
+        for stats, _, _ in shards:
+            totals.update(stats)
+
+        plans_path = out_dir / PLANS_FILENAME
+        _concat_members(
+            plans_path,
+            _gzip_member(XML_DECLARATION + PLANS_DOCTYPE + "<plans>\n"),
+            [plans_part for _, plans_part, _ in shards],
+            _gzip_member("</plans>\n"),
+        )
+
+        header = io.StringIO()
+        csv.writer(header).writerow(POPULATION_COLUMNS)
+        population_path = out_dir / POPULATION_FILENAME
+        _concat_members(
+            population_path,
+            _gzip_member(header.getvalue()),
+            [population_part for _, _, population_part in shards],
+        )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    stats = {
+        "bounds": bounds,
+        "buildings": len(buildings),
+        "full_population": sample.full_population,
+        "target_agents": sample.agent_count,
+        "sample_rate": sample.sample_rate,
+        "workers": shard_count,
+        "seed": seed,
+        "crs": crs,
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+        "counts": dict(sorted(totals.items())),
+        "agent_config": agent_config.model_dump(),
+    }
+    stats_path = out_dir / STATS_FILENAME
+    stats_path.write_text(json.dumps(stats, indent=2))
+    logger.info(
+        f"Wrote {totals['persons']} plans for {totals['agents']} agents "
+        f"to {out_dir} in {stats['elapsed_seconds']}s"
+    )
+
+    return BulkResult(plans_path, population_path, stats_path, stats)
@@ -0,0 +1,31 @@
+import gzip
+
+from agents.config import AgentConfig
+from agents.models import Building
+from agents.plans.bulk import generate_bulk
+
+BOUNDS = {"south": 51.89, "west": -8.48, "north": 51.91, "east": -8.46}
+BUILDINGS = [
+    Building(id="1", osm_id=1, position=(51.9001, -8.471), geometry=[], type="house", tags={}),
+    Building(id="2", osm_id=2, position=(51.9003, -8.4705), geometry=[], type="retail", tags={}),
+]
+
+
+def test_leftover_parts_are_not_concatenated(tmp_path):
+    # Parts left behind by a crashed run with more workers
+    stale = tmp_path / ".parts"
+    stale.mkdir()
+    with gzip.open(stale / "plans.part0007.gz", "wt") as f:
+        f.write('<person id="stale"></person>\n')
+    with gzip.open(stale / "population.part0007.gz", "wt") as f:
+        f.write("stale\n")
+
+    result = generate_bulk(BOUNDS, BUILDINGS, AgentConfig(max_agents=3), tmp_path, seed=1)
+
+    with gzip.open(result.plans_path, "rt") as f:
+        assert "stale" not in f.read()
+    with gzip.open(result.population_path, "rt") as f:
+        rows = f.read().splitlines()
+    assert "stale" not in rows
+    assert len(rows) == 1 + result.stats["counts"]["agents"]
+    assert [p.name for p in tmp_path.iterdir() if p.name.startswith(".parts-")] == []
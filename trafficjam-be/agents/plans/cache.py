@@ -0,0 +1,73 @@
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+from agents.config import AgentConfig
+from agents.models import Building
+from agents.plans.projection import WGS84
+
+PLANS_FILENAME = "plans.xml.gz"
+BOUNDS_PRECISION = 6
+POSITION_PRECISION = 7
+
+
+def _building_identity(building: Building) -> tuple:
+    """The parts of a building that plan generation reads. `osm_id`, the
+    fallback outline and unused tags differ between the CLI and the
+    frontend's `start_run` payload for the same building, so they are left
+    out."""
+    return (
+        building.id,
+        round(building.position[0], POSITION_PRECISION),
+        round(building.position[1], POSITION_PRECISION),
+        building.type or "",
+        building.get_tag("shop") or "",
+        building.get_tag("amenity") or "",
+        building.hotspot.model_dump_json() if building.hotspot else "",
+    )
+
+
+def plans_cache_key(
+    bounds: dict,
+    buildings: list[Building],
+    agent_config: AgentConfig,
+    crs: str = WGS84,
+    seed: int | None = None,
+) -> str:
+    digest = hashlib.sha256()
+    digest.update(crs.encode())
+    digest.update(repr(seed).encode())
+    normalized_bounds = {k: round(float(v), BOUNDS_PRECISION) for k, v in bounds.items()}
+    digest.update(json.dumps(normalized_bounds, sort_keys=True).encode())
+    digest.update(agent_config.model_dump_json(exclude={"scale_capacity"}).encode())
+    identities = sorted(_building_identity(building) for building in buildings)
+    digest.update(json.dumps(identities).encode())
+    return digest.hexdigest()
+
+
+class PlansCache:
+    """On-disk store of gzipped plans documents keyed by generation inputs,
+    seeded by the offline CLI and read by `start_run`."""
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.directory / key[:2] / key
+
+    def get(self, key: str) -> Path | None:
+        path = self._entry_dir(key) / PLANS_FILENAME
+        return path if path.is_file() else None
+
+    def put(self, key: str, plans_gz: str | Path, metadata: dict | None = None) -> Path:
+        entry = self._entry_dir(key)
+        entry.mkdir(parents=True, exist_ok=True)
+        tmp = entry / f".{PLANS_FILENAME}.{os.getpid()}.tmp"
+        shutil.copyfile(plans_gz, tmp)
+        if metadata is not None:
+            (entry / "metadata.json").write_text(json.dumps(metadata, indent=2))
+        target = entry / PLANS_FILENAME
+        os.replace(tmp, target)
+        return target
@@ -0,0 +1,117 @@
+import json
+
+import httpx
+
+import cli
+from agents.config import AgentConfig
+from agents.models import Building
+from agents.plans.cache import PLANS_FILENAME, PlansCache, plans_cache_key
+from agents.plans.population import parse_buildings_and_bounds
+from services.plan_files import prepare_plan_files
+
+BOUNDS = {"south": 51.85, "west": -8.55, "north": 51.95, "east": -8.38}
+BUILDINGS = [
+    Building(id="1", osm_id=1, position=(51.9, -8.47), geometry=[], tags={}),
+]
+
+
+def test_key_is_stable_and_sensitive_to_plan_params():
+    key = plans_cache_key(BOUNDS, BUILDINGS, AgentConfig())
+    assert key == plans_cache_key(dict(BOUNDS), list(BUILDINGS), AgentConfig())
+    assert key != plans_cache_key(BOUNDS, BUILDINGS, AgentConfig(sample_rate=0.1))
+
+
+def test_key_depends_on_the_seed():
+    key = plans_cache_key(BOUNDS, BUILDINGS, AgentConfig(), seed=1)
+    assert key == plans_cache_key(BOUNDS, BUILDINGS, AgentConfig(), seed=1)
+    assert key != plans_cache_key(BOUNDS, BUILDINGS, AgentConfig(), seed=2)
+    assert key != plans_cache_key(BOUNDS, BUILDINGS, AgentConfig())
+
+
+def test_put_then_get(tmp_path):
+    plans = tmp_path / "plans.xml.gz"
+    plans.write_bytes(b"plans")
+    cache = PlansCache(tmp_path / "cache")
+
+    assert cache.get("abc123") is None
+    stored = cache.put("abc123", plans, metadata={"persons": 1})
+    assert cache.get("abc123") == stored
+    assert stored.read_bytes() == b"plans"
+
+
+MAP_DATA_BUILDINGS = [
+    {
+        "id": 11,
+        "position": [-8.471, 51.9001],
+        "geometry": [],
+        "type": "house",
+        "tags": {"building": "house", "addr:street": "Main St"},
+    },
+    {
+        "id": 12,
+        "position": [-8.4705, 51.9003],
+        "geometry": [],
+        "type": "retail",
+        "tags": {"shop": "bakery"},
+    },
+    {"id": 13, "position": [-8.4702, 51.9005], "geometry": [], "type": None, "tags": {}},
+]
+
+
+def _start_run_buildings() -> str:
+    """The buildings form field as the frontend builds it from the same
+    `/network` response (`decoders.ts` and `buildStartRunForm`)."""
+    return json.dumps(
+        [
+            {
+                "id": str(b["id"]),
+                "osm_id": 0,
+                "position": [b["position"][1], b["position"][0]],
+                "geometry": [[b["position"][1], b["position"][0]]],
+                "type": b["type"],
+                "tags": {
+                    k: v for k, v in b["tags"].items() if k in ("name", "building", "shop", "amenity")
+                },
+                "hotspot": None,
+            }
+            for b in reversed(MAP_DATA_BUILDINGS)
+            if b["type"]
+        ]
+    )
+
+
+def test_cli_seeded_entry_is_hit_by_start_run(tmp_path, monkeypatch):
+    def fake_get(url, params, timeout):
+        return httpx.Response(
+            200, json={"buildings": MAP_DATA_BUILDINGS}, request=httpx.Request("GET", url)
+        )
+
+    monkeypatch.setattr(cli.httpx, "get", fake_get)
+    cache_dir = tmp_path / "cache"
+    argv = [
+        "--bbox", "51.9,-8.472,51.901,-8.47",
+        "--max-agents", "3",
+        "--seed", "1",
+        "--crs", "EPSG:4326",
+        "--out", str(tmp_path / "out"),
+        "--seed-cache", str(cache_dir),
+    ]
+    assert cli.main(argv) == 0
+
+    buildings, bounds = parse_buildings_and_bounds(
+        _start_run_buildings(),
+        json.dumps({"south": 51.9, "west": -8.472, "north": 51.901, "east": -8.47}),
+    )
+    plan_files = prepare_plan_files(
+        bounds,
+        buildings,
+        AgentConfig.from_plan_params({"maxAgents": 3}),
+        "EPSG:4326",
+        b"",
+        PlansCache(cache_dir),
+        seed=1,
+    )
+    try:
+        assert plan_files.plans_filename == PLANS_FILENAME
+    finally:
+        plan_files.close()
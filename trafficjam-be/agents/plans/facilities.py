@@ -0,0 +1,69 @@
+"""MATSim facilities for the buildings used by a run's plans.
+
+Activities written against a `FacilityRegistry` reference a facility id
+instead of repeating coordinates; MATSim takes the coordinate and link of each
+activity from its facility, so the XY-to-link lookup happens once per building
+rather than once per activity.
+"""
+import xml.etree.ElementTree as ET
+from typing import TextIO
+
+from agents.models import Activity, Building
+from agents.plans.network import LinkSnapper
+from agents.plans.projection import CoordinateProjector
+
+FACILITIES_DOCTYPE = (
+    '<!DOCTYPE facilities SYSTEM "http://www.matsim.org/files/dtd/facilities_v1.dtd">\n'
+)
+
+
+class FacilityRegistry:
+    """Maps activity locations to building facilities and records which
+    buildings and activity types the written plans actually use."""
+
+    def __init__(self, buildings: list[Building]):
+        self._by_location: dict[tuple[float, float], Building] = {}
+        for building in buildings:
+            self._by_location.setdefault(tuple(building.position), building)
+        self._used: dict[str, tuple[Building, set[str]]] = {}
+
+    def facility_id(self, activity: Activity) -> str | None:
+        building = self._by_location.get(tuple(activity.location))
+        if building is None:
+            return None
+        _, types = self._used.setdefault(building.id, (building, set()))
+        types.add(activity.type.value)
+        return building.id
+
+    def __len__(self) -> int:
+        return len(self._used)
+
+    def write_stream(
+        self,
+        stream: TextIO,
+        projector: CoordinateProjector,
+        links: LinkSnapper | None = None,
+    ) -> int:
+        """Write a facilities document with one facility per used building,
+        linked to its nearest car link when `links` is given."""
+        used = list(self._used.values())
+        positions = [tuple(building.position) for building, _ in used]
+        projector.prefetch(positions)
+        if links is not None:
+            links.prefetch(positions)
+
+        stream.write('<?xml version="1.0" ?>\n')
+        stream.write(FACILITIES_DOCTYPE)
+        stream.write('<facilities name="trafficjam">\n')
+        for building, types in used:
+            x, y = projector.project(*building.position)
+            facility = ET.Element("facility", id=building.id)
+            facility.set("x", f"{x:.{projector.precision}f}")
+            facility.set("y", f"{y:.{projector.precision}f}")
+            if links is not None:
+                facility.set("linkId", links.link_for(*building.position))
+            for activity_type in sorted(types):
+                ET.SubElement(facility, "activity", type=activity_type)
+            stream.write("  " + ET.tostring(facility, encoding="unicode") + "\n")
+        stream.write("</facilities>\n")
+        return len(used)
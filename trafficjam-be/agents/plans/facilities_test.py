@@ -0,0 +1,59 @@
+from io import StringIO
+
+from agents.models import Activity, ActivityType, Building, DailyPlan
+from agents.plans.facilities import FacilityRegistry
+from agents.plans.network import LinkSnapper, parse_network
+from agents.plans.network_test import NETWORK_XML
+from agents.plans.projection import CoordinateProjector
+from agents.plans.xml_writer import MATSimXMLWriter
+
+HOME = Building(id="home-1", osm_id=1, position=(51.8995, -8.475), geometry=[], tags={})
+WORK = Building(id="work-1", osm_id=2, position=(51.905, -8.4695), geometry=[], tags={})
+UNUSED = Building(id="unused", osm_id=3, position=(51.95, -8.4), geometry=[], tags={})
+
+
+def make_plan() -> DailyPlan:
+    plan = DailyPlan()
+    plan.add_activity(Activity(type=ActivityType.HOME, location=HOME.position))
+    plan.add_activity(Activity(type=ActivityType.WORK, location=WORK.position), "car")
+    plan.add_activity(Activity(type=ActivityType.SHOPPING, location=(51.0, -8.0)), "car")
+    return plan
+
+
+def test_activities_reference_facilities():
+    registry = FacilityRegistry([HOME, WORK, UNUSED])
+    out = StringIO()
+    MATSimXMLWriter(facilities=registry).write_stream(out, [("p1", make_plan())])
+
+    xml = out.getvalue()
+    assert '<act type="home" facility="home-1"' in xml
+    assert '<act type="work" facility="work-1"' in xml
+    # Locations without a building fall back to coordinates
+    assert '<act type="shopping" x="-8.0000" y="51.0000"' in xml
+    assert len(registry) == 2
+
+
+def test_facilities_document_lists_used_buildings_with_links():
+    registry = FacilityRegistry([HOME, WORK, UNUSED])
+    MATSimXMLWriter(facilities=registry).write_stream(StringIO(), [("p1", make_plan())])
+
+    out = StringIO()
+    count = registry.write_stream(
+        out, CoordinateProjector(), LinkSnapper(parse_network(NETWORK_XML))
+    )
+
+    xml = out.getvalue()
+    assert count == 2
+    assert '<facility id="home-1" x="-8.4750" y="51.8995" linkId="ab"><activity type="home" /></facility>' in xml
+    assert 'id="work-1"' in xml and 'linkId="bc"' in xml
+    assert "unused" not in xml
+
+
+def test_snapped_links_are_written_for_coordinate_activities():
+    links = LinkSnapper(parse_network(NETWORK_XML))
+    out = StringIO()
+    MATSimXMLWriter(links=links).write_stream(out, [("p1", make_plan())])
+
+    xml = out.getvalue()
+    assert '<act type="home" x="-8.4750" y="51.8995" link="ab"' in xml
+    assert '<act type="work" x="-8.4695" y="51.9050" link="bc"' in xml
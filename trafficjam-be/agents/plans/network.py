@@ -0,0 +1,206 @@
+"""Parsed view of the MATSim network uploaded with a run.
+
+The frontend serializes networks in WGS 84 (node x=lon, y=lat) with straight
+links between nodes, so a link is fully described by its two end nodes.
+"""
+import gzip
+import io
+import xml.etree.ElementTree as ET
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import IO
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+CAR_MODE = "car"
+EARTH_RADIUS_M = 6_371_000.0
+
+
+@dataclass
+class Network:
+    node_ids: list[str]
+    node_lon_lat: np.ndarray
+    link_ids: list[str]
+    link_from: np.ndarray
+    link_to: np.ndarray
+    link_length: np.ndarray
+    link_freespeed: np.ndarray
+    link_car: np.ndarray
+
+    @property
+    def link_count(self) -> int:
+        return len(self.link_ids)
+
+
+def _open_xml(source: bytes | IO[bytes]) -> IO[bytes]:
+    stream = io.BytesIO(source) if isinstance(source, bytes) else source
+    if stream.read(2) == b"\x1f\x8b":
+        stream.seek(0)
+        return gzip.GzipFile(fileobj=stream)
+    stream.seek(0)
+    return stream
+
+
+def parse_network(source: bytes | IO[bytes]) -> Network:
+    """Parse a network.xml(.gz) into flat node and link arrays."""
+    node_index: dict[str, int] = {}
+    node_coords: list[tuple[float, float]] = []
+    link_ids: list[str] = []
+    link_nodes: list[tuple[str, str]] = []
+    link_values: list[tuple[float, float, bool]] = []
+
+    for _, elem in ET.iterparse(_open_xml(source), events=("end",)):
+        if elem.tag == "node":
+            node_index[elem.get("id")] = len(node_coords)
+            node_coords.append((float(elem.get("x")), float(elem.get("y"))))
+        elif elem.tag == "link":
+            modes = {m.strip() for m in elem.get("modes", CAR_MODE).split(",")}
+            link_ids.append(elem.get("id"))
+            link_nodes.append((elem.get("from"), elem.get("to")))
+            link_values.append(
+                (
+                    float(elem.get("length", 0)),
+                    float(elem.get("freespeed", 0)),
+                    CAR_MODE in modes,
+                )
+            )
+        else:
+            continue
+        elem.clear()
+
+    try:
+        endpoints = np.array(
+            [(node_index[a], node_index[b]) for a, b in link_nodes], dtype=np.int64
+        ).reshape(-1, 2)
+    except KeyError as e:
+        raise ValueError(f"Link references unknown node {e}")
+    values = np.array(link_values, dtype=np.float64).reshape(-1, 3)
+
+    return Network(
+        node_ids=list(node_index),
+        node_lon_lat=np.array(node_coords, dtype=np.float64).reshape(-1, 2),
+        link_ids=link_ids,
+        link_from=endpoints[:, 0],
+        link_to=endpoints[:, 1],
+        link_length=values[:, 0],
+        link_freespeed=values[:, 1],
+        link_car=values[:, 2].astype(bool),
+    )
+
+
+def _local_metres(lon_lat: np.ndarray, ref_lat: float) -> np.ndarray:
+    """Equirectangular projection around `ref_lat`, accurate to well under a
+    metre at city scale and much cheaper than a full CRS transform."""
+    scale = np.radians(1.0) * EARTH_RADIUS_M
+    return np.column_stack(
+        (lon_lat[:, 0] * scale * np.cos(np.radians(ref_lat)), lon_lat[:, 1] * scale)
+    )
+
+
+def _segment_distances(points: np.ndarray, starts: np.ndarray, deltas: np.ndarray) -> np.ndarray:
+    """Row-wise distance from each point to the segment `start + t * delta`."""
+    lengths_sq = np.maximum((deltas**2).sum(axis=1), 1e-12)
+    t = np.clip(((points - starts) * deltas).sum(axis=1) / lengths_sq, 0.0, 1.0)
+    return np.hypot(*(points - starts - t[:, None] * deltas).T)
+
+
+class SegmentIndex:
+    """Nearest-link lookup over the straight segments of a network.
+
+    Links are split into pieces of at most `MAX_PIECE_LENGTH_M`, and piece
+    midpoints go into a KD-tree. For each point the nearest midpoint's piece
+    gives an upper bound `d` on the true distance; any closer piece has its
+    midpoint within `d` plus half the longest piece, so only those candidates
+    are measured exactly. Splitting keeps that margin small even when the
+    network has a few very long links (motorways, ferries).
+    """
+
+    MAX_PIECE_LENGTH_M = 100.0
+
+    def __init__(self, network: Network, car_only: bool = True):
+        self.network = network
+        self._links = (
+            np.flatnonzero(network.link_car) if car_only else np.arange(network.link_count)
+        )
+        if not len(self._links):
+            raise ValueError("Network has no links to snap to")
+        self._ref_lat = float(network.node_lon_lat[:, 1].mean())
+        nodes = _local_metres(network.node_lon_lat, self._ref_lat)
+        starts = nodes[network.link_from[self._links]]
+        deltas = nodes[network.link_to[self._links]] - starts
+
+        lengths = np.hypot(*deltas.T)
+        pieces = np.maximum(1, np.ceil(lengths / self.MAX_PIECE_LENGTH_M)).astype(np.int64)
+        # Position of each piece in `self._links`, and its index along the link
+        self._owners = np.repeat(np.arange(len(self._links)), pieces)
+        offsets = np.arange(len(self._owners)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+        fractions = (1.0 / pieces)[self._owners]
+        self._deltas = deltas[self._owners] * fractions[:, None]
+        self._starts = starts[self._owners] + self._deltas * offsets[:, None]
+        self._max_half_length = float((lengths / pieces).max()) / 2
+        self._tree = cKDTree(self._starts + self._deltas / 2)
+
+    def _distances(self, points: np.ndarray, pieces: np.ndarray) -> np.ndarray:
+        return _segment_distances(points, self._starts[pieces], self._deltas[pieces])
+
+    def _points(self, locations: list[tuple[float, float]]) -> np.ndarray:
+        lon_lat = np.asarray(locations, dtype=np.float64).reshape(-1, 2)[:, ::-1]
+        return _local_metres(lon_lat, self._ref_lat)
+
+    def nearest(self, locations: list[tuple[float, float]]) -> np.ndarray:
+        """Return network link indices nearest to each `(lat, lon)` location."""
+        if not locations:
+            return np.empty(0, dtype=np.int64)
+        points = self._points(locations)
+
+        _, first_guess = self._tree.query(points)
+        bounds = self._distances(points, first_guess)
+        candidates = self._tree.query_ball_point(
+            points, bounds + self._max_half_length + 1e-6
+        )
+
+        counts = np.fromiter((len(c) for c in candidates), dtype=np.int64, count=len(points))
+        owners = np.repeat(np.arange(len(points)), counts)
+        segments = np.fromiter(
+            (i for c in candidates for i in c), dtype=np.int64, count=int(counts.sum())
+        )
+        distances = self._distances(points[owners], segments)
+        order = np.lexsort((distances, owners))
+        group_starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        return self._links[self._owners[segments[order[group_starts]]]]
+
+
+class LinkSnapper:
+    """Maps `(lat, lon)` locations to nearest link ids, caching results so a
+    run's building positions are snapped in one batch."""
+
+    def __init__(self, network: Network, car_only: bool = True):
+        self.network = network
+        self._index = SegmentIndex(network, car_only)
+        self._snapped: dict[tuple[float, float], str] = {}
+
+    def prefetch(self, locations: Iterable[tuple[float, float]]) -> None:
+        pending = list({loc for loc in locations if loc not in self._snapped})
+        if not pending:
+            return
+        link_ids = self.network.link_ids
+        self._snapped.update(
+            zip(pending, (link_ids[i] for i in self._index.nearest(pending)))
+        )
+
+    def link_for(self, lat: float, lon: float) -> str:
+        link_id = self._snapped.get((lat, lon))
+        if link_id is None:
+            self.prefetch([(lat, lon)])
+            link_id = self._snapped[(lat, lon)]
+        return link_id
+
+
+def nearest_links(
+    network: Network, locations: list[tuple[float, float]], car_only: bool = True
+) -> list[str]:
+    """Return the id of the nearest link for each `(lat, lon)` location,
+    measured as point-to-segment distance."""
+    indices = SegmentIndex(network, car_only).nearest(locations)
+    return [network.link_ids[i] for i in indices]
@@ -0,0 +1,108 @@
+import gzip
+
+import numpy as np
+import pytest
+
+from agents.plans.network import (
+    Network,
+    SegmentIndex,
+    _local_metres,
+    _segment_distances,
+    nearest_links,
+    parse_network,
+)
+
+NETWORK_XML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<network>
+  <nodes>
+    <node id="a" x="-8.4800" y="51.9000" />
+    <node id="b" x="-8.4700" y="51.9000" />
+    <node id="c" x="-8.4700" y="51.9100" />
+  </nodes>
+  <links>
+    <link id="ab" from="a" to="b" length="687.00" freespeed="13.89" capacity="1200" permlanes="1" oneway="1" modes="car" />
+    <link id="bc" from="b" to="c" length="1112.00" freespeed="13.89" capacity="1200" permlanes="1" oneway="1" modes="car" />
+    <link id="ca" from="c" to="a" length="1300.00" freespeed="1.39" capacity="1200" permlanes="1" oneway="1" modes="walk" />
+  </links>
+</network>
+"""
+
+
+def test_parse_network_arrays():
+    network = parse_network(NETWORK_XML)
+    assert network.node_ids == ["a", "b", "c"]
+    assert network.link_ids == ["ab", "bc", "ca"]
+    assert network.link_from.tolist() == [0, 1, 2]
+    assert network.link_to.tolist() == [1, 2, 0]
+    assert network.link_car.tolist() == [True, True, False]
+    assert network.node_lon_lat[1].tolist() == [-8.47, 51.9]
+
+
+def test_parse_gzipped_network():
+    assert parse_network(gzip.compress(NETWORK_XML)).link_ids == ["ab", "bc", "ca"]
+
+
+def test_unknown_node_is_rejected():
+    with pytest.raises(ValueError):
+        parse_network(b'<network><links><link id="x" from="a" to="b" /></links></network>')
+
+
+def test_nearest_links_skip_walk_only_links():
+    network = parse_network(NETWORK_XML)
+    locations = [(51.8995, -8.475), (51.905, -8.4695), (51.906, -8.476)]
+    assert nearest_links(network, locations) == ["ab", "bc", "bc"]
+    assert nearest_links(network, locations[2:], car_only=False) == ["ca"]
+
+
+def _random_network(rng: np.random.Generator, nodes: int, links: int) -> Network:
+    return Network(
+        node_ids=[str(i) for i in range(nodes)],
+        node_lon_lat=np.column_stack(
+            (rng.uniform(-8.55, -8.38, nodes), rng.uniform(51.85, 51.95, nodes))
+        ),
+        link_ids=[str(i) for i in range(links)],
+        link_from=rng.integers(0, nodes, links),
+        link_to=rng.integers(0, nodes, links),
+        link_length=np.ones(links),
+        link_freespeed=np.ones(links),
+        link_car=np.ones(links, dtype=bool),
+    )
+
+
+def _assert_nearest(index: SegmentIndex, locations) -> None:
+    """The chosen links are as close as the nearest link found by brute force
+    (links sharing a nearest node tie)."""
+    network = index.network
+    nodes = _local_metres(network.node_lon_lat, index._ref_lat)
+    starts = nodes[network.link_from]
+    deltas = nodes[network.link_to] - starts
+    for point, link in zip(index._points(locations), index.nearest(locations)):
+        distances = _segment_distances(np.tile(point, (network.link_count, 1)), starts, deltas)
+        assert distances[link] == pytest.approx(distances.min(), abs=1e-6)
+
+
+def test_segment_index_matches_brute_force():
+    rng = np.random.default_rng(1)
+    network = _random_network(rng, nodes=200, links=600)
+    locations = list(zip(rng.uniform(51.85, 51.95, 500), rng.uniform(-8.55, -8.38, 500)))
+    index = SegmentIndex(network)
+
+    _assert_nearest(index, locations)
+
+
+def test_long_links_do_not_widen_every_query():
+    rng = np.random.default_rng(2)
+    # Short links in a city centre plus one ~12 km link across it
+    network = _random_network(rng, nodes=400, links=1000)
+    network.node_lon_lat[:398] = np.column_stack(
+        (rng.uniform(-8.48, -8.46, 398), rng.uniform(51.89, 51.9, 398))
+    )
+    network.node_lon_lat[398:] = [(-8.55, 51.85), (-8.38, 51.95)]
+    network.link_from[:999] %= 398
+    network.link_to[:999] %= 398
+    network.link_from[999], network.link_to[999] = 398, 399
+    locations = list(zip(rng.uniform(51.85, 51.95, 300), rng.uniform(-8.55, -8.38, 300)))
+    index = SegmentIndex(network)
+
+    assert index._max_half_length <= SegmentIndex.MAX_PIECE_LENGTH_M / 2
+    _assert_nearest(index, locations)
@@ -14,15 +14,8 @@ from ..models import (
     DailyPlan,
     ActivityType,
 )
-from .activity_scheduler import (
-    generate_departure_time_adult,
-    generate_departure_time_elderly,
-    generate_departure_time_school,
-    generate_work_duration,
-    generate_school_duration,
-    generate_errand_duration,
-    should_go_shopping,
-)
+from .activity_scheduler import DrawnSchedule, should_go_shopping
+from .batch_scheduler import AgentSchedule
 from ..config import AgentConfig
 from .strategies import PlanStrategy
 from ..constants import SHOP_TYPES
@@ -53,6 +46,20 @@ def _add(
     )
 
 
+def schedule_age(agent: Agent) -> int:
+    """Age an agent's school timings are drawn for: a parent's drop-off
+    follows their first child's school run."""
+    if isinstance(agent, Adult) and agent.children:
+        return agent.children[0].age
+    return agent.age
+
+
+def _schedule(
+    agent: Agent, agent_config: AgentConfig, schedule: AgentSchedule | None
+) -> AgentSchedule | DrawnSchedule:
+    return schedule or DrawnSchedule(schedule_age(agent), agent_config)
+
+
 def _minutes_to_time(minutes: int) -> time:
     return time(hour=minutes // 60, minute=minutes % 60)
 
@@ -80,11 +87,12 @@ def _find_nearby_shopping(
 
 
 def generate_plan_adult_dropoff_work(
-    adult: Adult, agent_config: AgentConfig
+    adult: Adult, agent_config: AgentConfig, schedule: AgentSchedule | None = None
 ) -> DailyPlan:
     child = adult.children[0]
     mode = _get_mode(adult)
     plan = DailyPlan()
+    timings = _schedule(adult, agent_config, schedule)
 
     assert child.school is not None
     assert adult.work is not None
@@ -93,7 +101,7 @@ def generate_plan_adult_dropoff_work(
         plan,
         ActivityType.HOME,
         adult.home.position,
-        end_time=generate_departure_time_school(child.age, agent_config),
+        end_time=timings.school_departure,
     )
     _add(
         plan,
@@ -112,7 +120,7 @@ def generate_plan_adult_dropoff_work(
         ActivityType.WORK,
         adult.work.position,
         mode,
-        duration=generate_work_duration(),
+        duration=timings.work_duration,
     )
     _add(
         plan,
@@ -136,25 +144,27 @@ def generate_plan_adult_work(
     buildings: list[Building],
     agent_config: AgentConfig,
     with_shopping: bool = True,
+    schedule: AgentSchedule | None = None,
 ) -> DailyPlan | None:
     if not adult.employed or not adult.work:
         return None
 
     mode = _get_mode(adult)
     plan = DailyPlan()
+    timings = _schedule(adult, agent_config, schedule)
 
     _add(
         plan,
         ActivityType.HOME,
         adult.home.position,
-        end_time=generate_departure_time_adult(),
+        end_time=timings.adult_departure,
     )
     _add(
         plan,
         ActivityType.WORK,
         adult.work.position,
         mode,
-        duration=generate_work_duration(),
+        duration=timings.work_duration,
     )
 
     if with_shopping and should_go_shopping(agent_config):
@@ -165,7 +175,7 @@ def generate_plan_adult_work(
                 ActivityType.SHOPPING,
                 shop.position,
                 mode,
-                duration=generate_errand_duration(agent_config),
+                duration=timings.errand_duration,
             )
 
     _add(plan, ActivityType.HOME, adult.home.position, mode)
@@ -176,6 +186,7 @@ def generate_plan_adult_work(
 def generate_plan_child(
     child: Child,
     agent_config: AgentConfig,
+    schedule: AgentSchedule | None = None,
 ) -> DailyPlan | None:
     if (
         child.needs_dropoff
@@ -186,19 +197,20 @@ def generate_plan_child(
 
     mode = _get_mode(child)
     plan = DailyPlan()
+    timings = _schedule(child, agent_config, schedule)
 
     _add(
         plan,
         ActivityType.HOME,
         child.home.position,
-        end_time=generate_departure_time_school(child.age, agent_config),
+        end_time=timings.school_departure,
     )
     _add(
         plan,
         ActivityType.EDUCATION,
         child.school.position,
         mode,
-        duration=generate_school_duration(child.age, agent_config),
+        duration=timings.school_duration,
     )
     _add(plan, ActivityType.HOME, child.home.position, mode)
 
@@ -210,15 +222,17 @@ def _generate_errand_plan(
     buildings: list[Building],
     agent_config: AgentConfig,
     healthcare_chance: float = 0.0,
+    schedule: AgentSchedule | None = None,
 ) -> DailyPlan:
     mode = _get_mode(adult)
     plan = DailyPlan()
+    timings = _schedule(adult, agent_config, schedule)
 
     _add(
         plan,
         ActivityType.HOME,
         adult.home.position,
-        end_time=generate_departure_time_elderly(),
+        end_time=timings.elderly_departure,
     )
 
     shop = _find_nearby_shopping(adult.home, buildings, agent_config)
@@ -233,7 +247,7 @@ def _generate_errand_plan(
             act_type,
             shop.position,
             mode,
-            duration=generate_errand_duration(agent_config),
+            duration=timings.errand_duration,
         )
 
     _add(plan, ActivityType.HOME, adult.home.position, mode)
@@ -242,20 +256,30 @@ def _generate_errand_plan(
 
 
 def generate_plan_non_employed(
-    adult: Adult, buildings: list[Building], agent_config: AgentConfig
+    adult: Adult,
+    buildings: list[Building],
+    agent_config: AgentConfig,
+    schedule: AgentSchedule | None = None,
 ) -> DailyPlan | None:
     if adult.employed or adult.age >= agent_config.elderly_age_threshold:
         return None
-    return _generate_errand_plan(adult, buildings, agent_config)
+    return _generate_errand_plan(adult, buildings, agent_config, schedule=schedule)
 
 
 def generate_plan_elderly(
-    adult: Adult, buildings: list[Building], agent_config: AgentConfig
+    adult: Adult,
+    buildings: list[Building],
+    agent_config: AgentConfig,
+    schedule: AgentSchedule | None = None,
 ) -> DailyPlan | None:
     if adult.age < agent_config.elderly_age_threshold:
         return None
     return _generate_errand_plan(
-        adult, buildings, agent_config, healthcare_chance=agent_config.healthcare_chance
+        adult,
+        buildings,
+        agent_config,
+        healthcare_chance=agent_config.healthcare_chance,
+        schedule=schedule,
     )
 
 
@@ -352,8 +376,14 @@ class ChildPlanStrategy:
     def supports(self, agent: Agent, config: AgentConfig) -> bool:
         return isinstance(agent, Child)
 
-    def generate(self, agent: Agent, buildings: list[Building], config: AgentConfig) -> DailyPlan | None:
-        return generate_plan_child(agent, config)  # type: ignore[arg-type]
+    def generate(
+        self,
+        agent: Agent,
+        buildings: list[Building],
+        config: AgentConfig,
+        schedule: AgentSchedule | None = None,
+    ) -> DailyPlan | None:
+        return generate_plan_child(agent, config, schedule)  # type: ignore[arg-type]
 
 
 class AdultDropoffWorkStrategy:
@@ -366,32 +396,56 @@ class AdultDropoffWorkStrategy:
             and agent.children[0].school is not None
         )
 
-    def generate(self, agent: Agent, buildings: list[Building], config: AgentConfig) -> DailyPlan | None:
-        return generate_plan_adult_dropoff_work(agent, config)  # type: ignore[arg-type]
+    def generate(
+        self,
+        agent: Agent,
+        buildings: list[Building],
+        config: AgentConfig,
+        schedule: AgentSchedule | None = None,
+    ) -> DailyPlan | None:
+        return generate_plan_adult_dropoff_work(agent, config, schedule)  # type: ignore[arg-type]
 
 
 class ElderlyStrategy:
     def supports(self, agent: Agent, config: AgentConfig) -> bool:
         return isinstance(agent, Adult) and agent.age >= config.elderly_age_threshold
 
-    def generate(self, agent: Agent, buildings: list[Building], config: AgentConfig) -> DailyPlan | None:
-        return generate_plan_elderly(agent, buildings, config)  # type: ignore[arg-type]
+    def generate(
+        self,
+        agent: Agent,
+        buildings: list[Building],
+        config: AgentConfig,
+        schedule: AgentSchedule | None = None,
+    ) -> DailyPlan | None:
+        return generate_plan_elderly(agent, buildings, config, schedule)  # type: ignore[arg-type]
 
 
 class EmployedAdultStrategy:
     def supports(self, agent: Agent, config: AgentConfig) -> bool:
         return isinstance(agent, Adult) and agent.employed
 
-    def generate(self, agent: Agent, buildings: list[Building], config: AgentConfig) -> DailyPlan | None:
-        return generate_plan_adult_work(agent, buildings, config)  # type: ignore[arg-type]
+    def generate(
+        self,
+        agent: Agent,
+        buildings: list[Building],
+        config: AgentConfig,
+        schedule: AgentSchedule | None = None,
+    ) -> DailyPlan | None:
+        return generate_plan_adult_work(agent, buildings, config, schedule=schedule)  # type: ignore[arg-type]
 
 
 class NonEmployedAdultStrategy:
     def supports(self, agent: Agent, config: AgentConfig) -> bool:
         return isinstance(agent, Adult)
 
-    def generate(self, agent: Agent, buildings: list[Building], config: AgentConfig) -> DailyPlan | None:
-        return generate_plan_non_employed(agent, buildings, config)  # type: ignore[arg-type]
+    def generate(
+        self,
+        agent: Agent,
+        buildings: list[Building],
+        config: AgentConfig,
+        schedule: AgentSchedule | None = None,
+    ) -> DailyPlan | None:
+        return generate_plan_non_employed(agent, buildings, config, schedule)  # type: ignore[arg-type]
 
 
 PLAN_STRATEGIES: list[PlanStrategy] = [
@@ -404,10 +458,15 @@ PLAN_STRATEGIES: list[PlanStrategy] = [
 
 
 def generate_plan_for_agent(
-    agent: Agent, buildings: list[Building], agent_config: AgentConfig
+    agent: Agent,
+    buildings: list[Building],
+    agent_config: AgentConfig,
+    schedule: AgentSchedule | None = None,
 ) -> DailyPlan | None:
+    """Plan for one agent. `schedule` is the agent's row of a
+    `BatchScheduler` sample; without one, timings are drawn per agent."""
     strategy = next((s for s in PLAN_STRATEGIES if s.supports(agent, agent_config)), None)
-    plan = strategy.generate(agent, buildings, agent_config) if strategy else None
+    plan = strategy.generate(agent, buildings, agent_config, schedule) if strategy else None
     if plan is not None:
         _append_hotspot_visit(plan, buildings, _get_agent_type(agent, agent_config), _get_mode(agent))
     return plan
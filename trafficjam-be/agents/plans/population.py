@@ -1,12 +1,24 @@
 import json
-from io import StringIO
+import random
+import tempfile
+from collections.abc import Callable, Iterator
+from io import StringIO, TextIOWrapper
+from typing import IO
 
-from agents.agent_creation import create_agents_from_network
+from agents.agent_creation import iter_households
 from agents.config import AgentConfig
-from agents.models import Building
-from agents.plans.plan_generator import generate_plan_for_agent
+from agents.models import Agent, Building, DailyPlan
+from agents.plans.batch_scheduler import BatchScheduler
+from agents.plans.facilities import FacilityRegistry
+from agents.plans.network import LinkSnapper
+from agents.plans.plan_generator import generate_plan_for_agent, schedule_age
+from agents.plans.projection import WGS84, CoordinateProjector, projector_for_buildings
+from agents.plans.routing import FreeFlowRouter, leg_link_pairs
 from agents.plans.xml_writer import MATSimXMLWriter
 
+SPOOL_MAX_BYTES = 16 * 1024 * 1024
+SCHEDULE_BATCH_AGENTS = 4096
+
 
 def parse_buildings_and_bounds(
     buildings_json: str, bounds_json: str
@@ -16,29 +28,137 @@ def parse_buildings_and_bounds(
     return buildings, bounds
 
 
-def generate_plans_xml(
+def _agent_batches(
+    households: Iterator[list[Agent]], size: int
+) -> Iterator[list[Agent]]:
+    """Whole households, grouped into batches of at least `size` agents."""
+    batch: list[Agent] = []
+    for household in households:
+        batch.extend(household)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_agent_plans(
     bounds: dict,
     buildings: list[Building],
     agent_config: AgentConfig,
-    max_agents: int,
-) -> str:
-    writer = MATSimXMLWriter()
-    writer.create_plans_document()
-
-    agents = create_agents_from_network(
+    max_agents: int | None,
+    shard: tuple[int, int] | None = None,
+) -> Iterator[tuple[Agent, DailyPlan | None]]:
+    households = iter_households(
         bounds=bounds,
         buildings=buildings,
         transport_routes=[],
         country_code="IRL",
         agent_config=agent_config,
         max_agents=max_agents,
+        shard=shard,
     )
+    scheduler = BatchScheduler(agent_config, seed=random.getrandbits(64))
+    for agents in _agent_batches(households, SCHEDULE_BATCH_AGENTS):
+        schedules = scheduler.sample([schedule_age(agent) for agent in agents]).rows()
+        for agent, schedule in zip(agents, schedules):
+            yield agent, generate_plan_for_agent(agent, buildings, agent_config, schedule)
 
-    for agent in agents:
-        plan = generate_plan_for_agent(agent, buildings, agent_config)
+
+def iter_person_plans(
+    bounds: dict,
+    buildings: list[Building],
+    agent_config: AgentConfig,
+    max_agents: int | None,
+    shard: tuple[int, int] | None = None,
+) -> Iterator[tuple[str, DailyPlan]]:
+    for agent, plan in iter_agent_plans(
+        bounds, buildings, agent_config, max_agents, shard
+    ):
         if plan:
-            writer.add_person_plan(agent.id, plan)
+            yield agent.id, plan
+
+
+def write_plans_xml_stream(
+    stream: IO[str],
+    bounds: dict,
+    buildings: list[Building],
+    agent_config: AgentConfig,
+    max_agents: int | None,
+    crs: str = WGS84,
+    facilities: FacilityRegistry | None = None,
+    links: LinkSnapper | None = None,
+    router: FreeFlowRouter | None = None,
+) -> int:
+    if links is not None:
+        links.prefetch(tuple(b.position) for b in buildings)
+    persons = iter_person_plans(bounds, buildings, agent_config, max_agents)
+    routes = None
+    if router is not None:
+        if links is None:
+            raise ValueError("Route precomputation needs snapped activity links")
+        # Routing needs every leg up front to deduplicate OD pairs, so this
+        # mode holds all plans in memory instead of streaming them
+        persons = list(persons)
+        routes = router.route_all(leg_link_pairs((plan for _, plan in persons), links))
+    writer = MATSimXMLWriter(
+        crs, projector_for_buildings(crs, buildings), facilities, links, routes
+    )
+    return writer.write_stream(stream, persons)
 
+
+def _spool(write: Callable[[IO[str]], object]) -> IO[bytes]:
+    """Run `write` against a temporary file (in memory up to SPOOL_MAX_BYTES,
+    then on disk) and return it rewound and ready to upload."""
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    text = TextIOWrapper(spool, encoding="utf-8")
+    write(text)
+    text.flush()
+    text.detach()
+    spool.seek(0)
+    return spool
+
+
+def spool_plans_xml(
+    bounds: dict,
+    buildings: list[Building],
+    agent_config: AgentConfig,
+    max_agents: int | None,
+    crs: str = WGS84,
+    facilities: FacilityRegistry | None = None,
+    links: LinkSnapper | None = None,
+    router: FreeFlowRouter | None = None,
+) -> IO[bytes]:
+    return _spool(
+        lambda stream: write_plans_xml_stream(
+            stream,
+            bounds,
+            buildings,
+            agent_config,
+            max_agents,
+            crs,
+            facilities,
+            links,
+            router,
+        )
+    )
+
+
+def spool_facilities_xml(
+    facilities: FacilityRegistry, crs: str = WGS84, links: LinkSnapper | None = None
+) -> IO[bytes]:
+    """Spool the facilities used by plans already written against `facilities`."""
+    projector = CoordinateProjector(crs)
+    return _spool(lambda stream: facilities.write_stream(stream, projector, links))
+
+
+def generate_plans_xml(
+    bounds: dict,
+    buildings: list[Building],
+    agent_config: AgentConfig,
+    max_agents: int | None,
+    crs: str = WGS84,
+) -> str:
     stream = StringIO()
-    writer.write_to_stream(stream)
+    write_plans_xml_stream(stream, bounds, buildings, agent_config, max_agents, crs)
     return stream.getvalue()
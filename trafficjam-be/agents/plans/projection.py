@@ -0,0 +1,78 @@
+"""Reprojection of activity coordinates from WGS 84 to a metric CRS.
+
+Every activity in a generated plan sits on a building position, so a run's
+coordinates are all known before any plan exists. `CoordinateProjector.prefetch`
+transforms them in one vectorized pyproj call; the writer then only does
+dictionary lookups per activity.
+"""
+import math
+from collections.abc import Iterable
+
+import numpy as np
+from pyproj import Transformer
+
+from agents.models import Building
+
+WGS84 = "EPSG:4326"
+AUTO_CRS = "auto"
+
+# Degrees keep 4 decimals (~10 m); projected metres keep centimetres
+GEOGRAPHIC_PRECISION = 4
+PROJECTED_PRECISION = 2
+
+
+def utm_crs(lat: float, lon: float) -> str:
+    zone = min(int((lon + 180) // 6) + 1, 60)
+    return f"EPSG:{(32600 if lat >= 0 else 32700) + zone}"
+
+
+def resolve_crs(crs: str, bounds: dict) -> str:
+    """Turn the configured plans CRS into a concrete EPSG code; `auto` picks
+    the UTM zone containing the centre of `bounds`."""
+    if crs.lower() != AUTO_CRS:
+        return crs
+    lat = (bounds["south"] + bounds["north"]) / 2
+    lon = (bounds["west"] + bounds["east"]) / 2
+    return utm_crs(lat, lon)
+
+
+class CoordinateProjector:
+    """Maps `(lat, lon)` locations to `(x, y)` in `crs`, caching results."""
+
+    def __init__(self, crs: str = WGS84):
+        self.crs = crs
+        self.is_identity = crs == WGS84
+        self.precision = GEOGRAPHIC_PRECISION if self.is_identity else PROJECTED_PRECISION
+        self._transformer = (
+            None if self.is_identity else Transformer.from_crs(WGS84, crs, always_xy=True)
+        )
+        self._projected: dict[tuple[float, float], tuple[float, float]] = {}
+
+    def prefetch(self, locations: Iterable[tuple[float, float]]) -> None:
+        if self.is_identity:
+            return
+        pending = list({loc for loc in locations if loc not in self._projected})
+        if not pending:
+            return
+        lat_lon = np.asarray(pending, dtype=np.float64)
+        xs, ys = self._transformer.transform(lat_lon[:, 1], lat_lon[:, 0])
+        if not (np.isfinite(xs).all() and np.isfinite(ys).all()):
+            raise ValueError(f"Some locations cannot be projected to {self.crs}")
+        self._projected.update(zip(pending, zip(xs.tolist(), ys.tolist())))
+
+    def project(self, lat: float, lon: float) -> tuple[float, float]:
+        if self.is_identity:
+            return lon, lat
+        projected = self._projected.get((lat, lon))
+        if projected is None:
+            x, y = self._transformer.transform(lon, lat)
+            if not (math.isfinite(x) and math.isfinite(y)):
+                raise ValueError(f"Location ({lat}, {lon}) cannot be projected to {self.crs}")
+            projected = self._projected[(lat, lon)] = (x, y)
+        return projected
+
+
+def projector_for_buildings(crs: str, buildings: list[Building]) -> CoordinateProjector:
+    projector = CoordinateProjector(crs)
+    projector.prefetch(tuple(b.position) for b in buildings)
+    return projector
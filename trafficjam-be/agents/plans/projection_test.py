@@ -0,0 +1,38 @@
+import pytest
+
+from agents.models import Building
+from agents.plans.projection import (
+    WGS84,
+    CoordinateProjector,
+    projector_for_buildings,
+    resolve_crs,
+    utm_crs,
+)
+
+CORK = {"south": 51.85, "west": -8.55, "north": 51.95, "east": -8.38}
+
+
+def test_auto_crs_picks_utm_zone_of_bounds_centre():
+    assert resolve_crs("auto", CORK) == "EPSG:32629"
+    assert resolve_crs("EPSG:2157", CORK) == "EPSG:2157"
+    assert utm_crs(-33.9, 151.2) == "EPSG:32756"
+
+
+def test_identity_projection_swaps_to_lon_lat():
+    assert CoordinateProjector(WGS84).project(51.9, -8.47) == (-8.47, 51.9)
+
+
+def test_batch_matches_single_point_projection():
+    buildings = [
+        Building(id=str(i), osm_id=i, position=(51.9 + i / 1000, -8.47), geometry=[], tags={})
+        for i in range(5)
+    ]
+    batched = projector_for_buildings("EPSG:2157", buildings)
+    single = CoordinateProjector("EPSG:2157")
+
+    for building in buildings:
+        x, y = batched.project(*building.position)
+        assert (x, y) == pytest.approx(single.project(*building.position))
+        # Cork city centre in Irish Transverse Mercator
+        assert 560_000 < x < 575_000
+        assert 565_000 < y < 580_000
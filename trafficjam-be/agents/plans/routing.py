@@ -0,0 +1,125 @@
+"""Free-flow car routes for generated plans.
+
+Routes let MATSim start iteration 0 without routing every leg itself. All
+legs of a run are collected first so that origin/destination link pairs shared
+by many agents are routed once, and all destinations of an origin come out of
+a single one-to-all Dijkstra search.
+"""
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from agents.models import DailyPlan
+from agents.plans.network import CAR_MODE, LinkSnapper, Network
+
+ROUTED_MODES = frozenset({CAR_MODE})
+
+# Origins searched per dijkstra call; bounds the predecessor matrix to
+# ROUTE_BATCH_SIZE * nodes entries
+ROUTE_BATCH_SIZE = 64
+
+
+@dataclass(frozen=True)
+class Route:
+    """Path between the end of the origin link and the start of the
+    destination link, as MATSim v4 plans expect it."""
+
+    node_ids: list[str]
+    distance: float
+    travel_time: float
+
+
+def leg_link_pairs(
+    plans: Iterable[DailyPlan], links: LinkSnapper
+) -> set[tuple[str, str]]:
+    """Distinct (origin link, destination link) pairs of all routed legs."""
+    pairs = set()
+    for plan in plans:
+        for i, leg in enumerate(plan.transport):
+            if leg.mode in ROUTED_MODES:
+                pairs.add(
+                    (
+                        links.link_for(*plan.activities[i].location),
+                        links.link_for(*plan.activities[i + 1].location),
+                    )
+                )
+    return pairs
+
+
+class FreeFlowRouter:
+    """Shortest travel-time paths over the car links of a network."""
+
+    def __init__(self, network: Network):
+        self.network = network
+        self._link_index = {link_id: i for i, link_id in enumerate(network.link_ids)}
+
+        car = np.flatnonzero(network.link_car & (network.link_freespeed > 0))
+        times = network.link_length[car] / network.link_freespeed[car]
+        # Keep the fastest of parallel links between the same pair of nodes
+        order = np.lexsort((times, network.link_to[car], network.link_from[car]))
+        car, times = car[order], times[order]
+        edges = np.column_stack((network.link_from[car], network.link_to[car]))
+        _, first = np.unique(edges, axis=0, return_index=True)
+
+        node_count = len(network.node_ids)
+        self._graph = csr_matrix(
+            # Zero weights would be dropped as missing edges by csgraph
+            (np.maximum(times[first], 1e-6), (edges[first, 0], edges[first, 1])),
+            shape=(node_count, node_count),
+        )
+        self._edge_lookup = {
+            (int(a), int(b)): int(link)
+            for a, b, link in zip(edges[first, 0], edges[first, 1], car[first])
+        }
+
+    def _path(self, predecessors: np.ndarray, source: int, target: int) -> list[int] | None:
+        path = [target]
+        while path[-1] != source:
+            previous = predecessors[path[-1]]
+            if previous < 0:
+                return None
+            path.append(int(previous))
+        return path[::-1]
+
+    def _route(self, nodes: list[int]) -> Route:
+        net = self.network
+        links = [self._edge_lookup[edge] for edge in zip(nodes, nodes[1:])]
+        return Route(
+            node_ids=[net.node_ids[n] for n in nodes],
+            distance=float(net.link_length[links].sum()),
+            travel_time=float((net.link_length[links] / net.link_freespeed[links]).sum()),
+        )
+
+    def route_all(
+        self, pairs: Iterable[tuple[str, str]]
+    ) -> dict[tuple[str, str], Route]:
+        """Route every (origin link, destination link) pair; unreachable pairs
+        are left out so MATSim routes them itself."""
+        net = self.network
+        routes: dict[tuple[str, str], Route] = {}
+        by_source: dict[int, list[tuple[tuple[str, str], int]]] = defaultdict(list)
+        for pair in pairs:
+            if pair[0] == pair[1]:
+                routes[pair] = Route(node_ids=[], distance=0.0, travel_time=0.0)
+                continue
+            origin, destination = (self._link_index[link_id] for link_id in pair)
+            by_source[int(net.link_to[origin])].append(
+                (pair, int(net.link_from[destination]))
+            )
+
+        sources = list(by_source)
+        for offset in range(0, len(sources), ROUTE_BATCH_SIZE):
+            batch = sources[offset : offset + ROUTE_BATCH_SIZE]
+            _, predecessors = dijkstra(
+                self._graph, indices=batch, return_predecessors=True
+            )
+            for row, source in enumerate(batch):
+                for pair, target in by_source[source]:
+                    nodes = self._path(predecessors[row], source, target)
+                    if nodes is not None:
+                        routes[pair] = self._route(nodes)
+        return routes
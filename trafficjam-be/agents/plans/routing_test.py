@@ -0,0 +1,66 @@
+from io import StringIO
+
+from agents.models import Activity, ActivityType, DailyPlan
+from agents.plans.network import LinkSnapper, parse_network
+from agents.plans.routing import FreeFlowRouter, leg_link_pairs
+from agents.plans.xml_writer import MATSimXMLWriter
+
+# a -> b -> c is fast, a -> c directly is shorter but slow; d is a dead end
+NETWORK_XML = b"""<network>
+  <nodes>
+    <node id="a" x="-8.4800" y="51.9000" />
+    <node id="b" x="-8.4700" y="51.9000" />
+    <node id="c" x="-8.4700" y="51.9100" />
+    <node id="d" x="-8.4600" y="51.9100" />
+    <node id="e" x="-8.4800" y="51.8900" />
+  </nodes>
+  <links>
+    <link id="ea" from="e" to="a" length="1100" freespeed="10" modes="car" />
+    <link id="ab" from="a" to="b" length="700" freespeed="20" modes="car" />
+    <link id="bc" from="b" to="c" length="1100" freespeed="20" modes="car" />
+    <link id="ac" from="a" to="c" length="1300" freespeed="2" modes="car" />
+    <link id="cd" from="c" to="d" length="700" freespeed="10" modes="car" />
+    <link id="dd" from="d" to="d" length="10" freespeed="10" modes="walk" />
+  </links>
+</network>
+"""
+
+HOME = (51.895, -8.4801)
+WORK = (51.9100, -8.465)
+
+
+def make_plan(mode: str = "car") -> DailyPlan:
+    plan = DailyPlan()
+    plan.add_activity(Activity(type=ActivityType.HOME, location=HOME))
+    plan.add_activity(Activity(type=ActivityType.WORK, location=WORK), mode)
+    plan.add_activity(Activity(type=ActivityType.HOME, location=HOME), mode)
+    return plan
+
+
+def test_pairs_are_deduplicated_and_only_for_car_legs():
+    links = LinkSnapper(parse_network(NETWORK_XML))
+    pairs = leg_link_pairs([make_plan(), make_plan(), make_plan("walk")], links)
+    assert pairs == {("ea", "cd"), ("cd", "ea")}
+
+
+def test_routes_follow_fastest_path_between_link_ends():
+    router = FreeFlowRouter(parse_network(NETWORK_XML))
+    routes = router.route_all([("ea", "cd"), ("cd", "ea"), ("ab", "ab")])
+
+    assert routes[("ea", "cd")].node_ids == ["a", "b", "c"]
+    assert routes[("ea", "cd")].distance == 1800
+    assert routes[("ea", "cd")].travel_time == 90
+    assert routes[("ab", "ab")].node_ids == []
+    # Nothing leads back from d
+    assert ("cd", "ea") not in routes
+
+
+def test_writer_emits_routes_for_car_legs():
+    links = LinkSnapper(parse_network(NETWORK_XML))
+    routes = FreeFlowRouter(links.network).route_all(leg_link_pairs([make_plan()], links))
+    out = StringIO()
+    MATSimXMLWriter(links=links, routes=routes).write_stream(out, [("p1", make_plan())])
+
+    xml = out.getvalue()
+    assert '<route dist="1800.00" trav_time="00:01:30">a b c</route>' in xml
+    assert xml.count("<route") == 1
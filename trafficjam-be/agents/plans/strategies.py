@@ -2,8 +2,15 @@ from typing import Protocol
 
 from agents.models import Agent, Building, DailyPlan
 from agents.config import AgentConfig
+from agents.plans.batch_scheduler import AgentSchedule
 
 
 class PlanStrategy(Protocol):
     def supports(self, agent: Agent, config: AgentConfig) -> bool: ...
-    def generate(self, agent: Agent, buildings: list[Building], config: AgentConfig) -> DailyPlan | None: ...
+    def generate(
+        self,
+        agent: Agent,
+        buildings: list[Building],
+        config: AgentConfig,
+        schedule: AgentSchedule | None = None,
+    ) -> DailyPlan | None: ...
@@ -1,13 +1,26 @@
 import xml.etree.ElementTree as ET
+from collections.abc import Iterable, Mapping
 from typing import TextIO
 from pathlib import Path
 from ..models import DailyPlan
+from .facilities import FacilityRegistry
+from .network import LinkSnapper
+from .projection import WGS84, CoordinateProjector
+from .routing import ROUTED_MODES, Route
+
+XML_DECLARATION = '<?xml version="1.0" ?>\n'
+PLANS_DOCTYPE = '<!DOCTYPE plans SYSTEM "http://www.matsim.org/files/dtd/plans_v4.dtd">\n'
 
 
 def _format_coordinate(value: float, precision: int = 4) -> str:
     return f"{value:.{precision}f}"
 
 
+def _format_seconds(seconds: float) -> str:
+    seconds = round(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
 def _indent_xml(elem: ET.Element, level: int = 0) -> None:
     indent = "\n" + "  " * level
     if len(elem):
@@ -25,8 +38,23 @@ def _indent_xml(elem: ET.Element, level: int = 0) -> None:
 
 
 class MATSimXMLWriter:
-    def __init__(self, crs: str = "EPSG:4326"):
+    def __init__(
+        self,
+        crs: str = WGS84,
+        projector: CoordinateProjector | None = None,
+        facilities: FacilityRegistry | None = None,
+        links: LinkSnapper | None = None,
+        routes: Mapping[tuple[str, str], Route] | None = None,
+    ):
+        if routes is not None and links is None:
+            raise ValueError("Routes need snapped activity links")
+        if projector is not None and projector.crs != crs:
+            raise ValueError(f"Projector targets {projector.crs}, writer expects {crs}")
         self.crs = crs
+        self.projector = projector or CoordinateProjector(crs)
+        self.facilities = facilities
+        self.links = links
+        self.routes = routes
         self.plans_element: ET.Element | None = None
         self._person_count = 0
 
@@ -42,7 +70,13 @@ class MATSimXMLWriter:
             self.create_plans_document()
         assert self.plans_element is not None
 
-        person = ET.SubElement(self.plans_element, "person")
+        self.plans_element.append(self._build_person(person_id, plan, selected))
+        self._person_count += 1
+
+    def _build_person(
+        self, person_id: str, plan: DailyPlan, selected: bool = True
+    ) -> ET.Element:
+        person = ET.Element("person")
         person.set("id", person_id)
 
         plan_elem = ET.SubElement(person, "plan")
@@ -52,10 +86,20 @@ class MATSimXMLWriter:
         for i, activity in enumerate(plan.activities):
             act = ET.SubElement(plan_elem, "act")
             act.set("type", activity.type.value)
-            # activity.location is [lat, lon], but MATSim expects x=lon, y=lat
-            lat, lon = activity.location
-            act.set("x", _format_coordinate(lon))
-            act.set("y", _format_coordinate(lat))
+            facility_id = None
+            if self.facilities is not None:
+                facility_id = self.facilities.facility_id(activity)
+            if facility_id is not None:
+                # Coordinates come from the facility when MATSim loads the plans
+                act.set("facility", facility_id)
+            else:
+                # activity.location is [lat, lon], but MATSim expects x=lon, y=lat
+                # (or easting/northing when writing a projected CRS)
+                x, y = self.projector.project(*activity.location)
+                act.set("x", _format_coordinate(x, self.projector.precision))
+                act.set("y", _format_coordinate(y, self.projector.precision))
+            if self.links is not None:
+                act.set("link", self.links.link_for(*activity.location))
 
             if activity.end_time:
                 act.set("end_time", activity.end_time.strftime("%H:%M:%S"))
@@ -65,8 +109,47 @@ class MATSimXMLWriter:
             if i < len(plan.transport):
                 leg = ET.SubElement(plan_elem, "leg")
                 leg.set("mode", plan.transport[i].mode)
+                route = self._leg_route(plan, i)
+                if route is not None:
+                    route_elem = ET.SubElement(leg, "route")
+                    route_elem.set("dist", f"{route.distance:.2f}")
+                    route_elem.set("trav_time", _format_seconds(route.travel_time))
+                    route_elem.text = " ".join(route.node_ids)
+
+        return person
+
+    def _leg_route(self, plan: DailyPlan, leg_index: int) -> Route | None:
+        if self.routes is None or plan.transport[leg_index].mode not in ROUTED_MODES:
+            return None
+        origin = plan.activities[leg_index].location
+        destination = plan.activities[leg_index + 1].location
+        return self.routes.get(
+            (self.links.link_for(*origin), self.links.link_for(*destination))
+        )
 
+    def serialize_person(
+        self, person_id: str, plan: DailyPlan, selected: bool = True
+    ) -> str:
+        """Render a single indented <person> element, for streaming output."""
+        person = self._build_person(person_id, plan, selected)
+        _indent_xml(person, level=1)
+        person.tail = None
         self._person_count += 1
+        return "  " + ET.tostring(person, encoding="unicode") + "\n"
+
+    def write_stream(
+        self, stream: TextIO, persons: Iterable[tuple[str, DailyPlan]]
+    ) -> int:
+        """Write a complete plans document person by person without building
+        the full tree; each person is garbage as soon as it has been written."""
+        self._person_count = 0
+        stream.write(XML_DECLARATION)
+        stream.write(PLANS_DOCTYPE)
+        stream.write("<plans>\n")
+        for person_id, plan in persons:
+            stream.write(self.serialize_person(person_id, plan))
+        stream.write("</plans>\n")
+        return self._person_count
 
     def write_to_file(self, output_path: str | Path) -> None:
         if self.plans_element is None:
@@ -82,10 +165,8 @@ class MATSimXMLWriter:
         xml_str = ET.tostring(self.plans_element, encoding="unicode")
 
         with open(output_path, "w", encoding="utf-8") as f:
-            f.write('<?xml version="1.0" ?>\n')
-            f.write(
-                '<!DOCTYPE plans SYSTEM "http://www.matsim.org/files/dtd/plans_v4.dtd">\n'
-            )
+            f.write(XML_DECLARATION)
+            f.write(PLANS_DOCTYPE)
             f.write(xml_str)
 
     def write_to_stream(self, stream: TextIO) -> None:
@@ -97,10 +178,8 @@ class MATSimXMLWriter:
         _indent_xml(self.plans_element)
         xml_str = ET.tostring(self.plans_element, encoding="unicode")
 
-        stream.write('<?xml version="1.0" ?>\n')
-        stream.write(
-            '<!DOCTYPE plans SYSTEM "http://www.matsim.org/files/dtd/plans_v4.dtd">\n'
-        )
+        stream.write(XML_DECLARATION)
+        stream.write(PLANS_DOCTYPE)
         stream.write(xml_str)
 
     def get_person_count(self) -> int:
@@ -110,9 +189,12 @@ class MATSimXMLWriter:
 def write_plans_xml(
     plans: list[tuple[str, DailyPlan]],
     output_path: str | Path,
-    crs: str = "EPSG:4326",
+    crs: str = WGS84,
 ) -> int:
     writer = MATSimXMLWriter(crs=crs)
+    writer.projector.prefetch(
+        activity.location for _, plan in plans for activity in plan.activities
+    )
     writer.create_plans_document()
 
     for person_id, plan in plans:
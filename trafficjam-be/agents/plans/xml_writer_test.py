@@ -0,0 +1,43 @@
+from datetime import time
+from io import StringIO
+
+from agents.models import Activity, ActivityType, DailyPlan
+from agents.plans.xml_writer import MATSimXMLWriter
+
+
+def make_plan() -> DailyPlan:
+    plan = DailyPlan()
+    plan.add_activity(
+        Activity(type=ActivityType.HOME, location=(51.9, -8.47), end_time=time(7, 30))
+    )
+    plan.add_activity(
+        Activity(type=ActivityType.WORK, location=(51.91, -8.46), duration=time(8)),
+        leg_mode="car",
+    )
+    plan.add_activity(Activity(type=ActivityType.HOME, location=(51.9, -8.47)), "car")
+    return plan
+
+
+def test_streamed_document_matches_tree_document():
+    persons = [("p1", make_plan()), ("p2", make_plan())]
+
+    tree_writer = MATSimXMLWriter()
+    for person_id, plan in persons:
+        tree_writer.add_person_plan(person_id, plan)
+    tree_out = StringIO()
+    tree_writer.write_to_stream(tree_out)
+
+    streamed_out = StringIO()
+    count = MATSimXMLWriter().write_stream(streamed_out, iter(persons))
+
+    assert count == 2
+    assert streamed_out.getvalue() == tree_out.getvalue()
+
+
+def test_projected_output_uses_metres():
+    out = StringIO()
+    MATSimXMLWriter(crs="EPSG:2157").write_stream(out, [("p1", make_plan())])
+
+    xml = out.getvalue()
+    assert 'x="-8.4700"' not in xml
+    assert 'x="56' in xml and 'y="57' in xml
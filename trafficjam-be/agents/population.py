@@ -1,10 +1,28 @@
 import logging
+from dataclasses import dataclass
 
 from .config import AgentConfig
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True)
+class PopulationSample:
+    full_population: int
+    agent_count: int
+    scale_capacity: bool = False
+
+    @property
+    def sample_rate(self) -> float:
+        if self.full_population <= 0:
+            return 1.0
+        return min(1.0, self.agent_count / self.full_population)
+
+    @property
+    def capacity_factor(self) -> float:
+        return self.sample_rate if self.scale_capacity else 1.0
+
+
 def get_population_density(agent_config: AgentConfig) -> int:
     return agent_config.default_population_density
 
@@ -17,3 +35,25 @@ def estimate_population(area_km2: float, agent_config: AgentConfig) -> int:
         f"(area: {area_km2:.2f} km², density: {density}/km²)"
     )
     return estimated_pop
+
+
+def sample_population(
+    full_population: int, agent_config: AgentConfig, max_agents: int | None
+) -> PopulationSample:
+    agent_count = round(full_population * agent_config.sample_rate)
+    if max_agents is not None and agent_count > max_agents:
+        logger.warning(
+            f"Capping {agent_count} sampled agents at maxAgents={max_agents}; "
+            f"effective sample rate drops to {max_agents / full_population:.2%}"
+        )
+        agent_count = max_agents
+    if full_population > 0 and agent_count < 1:
+        logger.warning(
+            f"Sampling {full_population} people yields no agents; generating one instead"
+        )
+        agent_count = 1
+    return PopulationSample(
+        full_population=full_population,
+        agent_count=agent_count,
+        scale_capacity=agent_config.scale_capacity,
+    )
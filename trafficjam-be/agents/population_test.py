@@ -0,0 +1,49 @@
+from agents.config import AgentConfig
+from agents.population import sample_population
+from services.volume_scaling import needs_volume_scaling
+
+
+def test_sample_rate_scales_agent_count():
+    sample = sample_population(100_000, AgentConfig(sample_rate=0.1), max_agents=None)
+    assert sample.agent_count == 10_000
+    assert sample.sample_rate == 0.1
+
+
+def test_max_agents_cap_lowers_effective_sample_rate():
+    sample = sample_population(100_000, AgentConfig(sample_rate=0.1), max_agents=1000)
+    assert sample.agent_count == 1000
+    assert sample.sample_rate == 0.01
+
+
+def test_tiny_samples_keep_one_agent():
+    for sample in (
+        sample_population(3, AgentConfig(sample_rate=0.1), max_agents=None),
+        sample_population(100, AgentConfig(), max_agents=0),
+    ):
+        assert sample.agent_count == 1
+        assert sample.sample_rate > 0
+    assert sample_population(0, AgentConfig(), max_agents=None).sample_rate == 1.0
+
+
+def test_sample_rate_in_plan_params_lifts_default_cap():
+    assert AgentConfig.from_plan_params({"sampleRate": 0.25}).max_agents is None
+    assert AgentConfig.from_plan_params({}).max_agents == 1000
+    assert AgentConfig.from_plan_params({"sampleRate": 0.25, "maxAgents": 50}).max_agents == 50
+
+
+def test_default_scenario_keeps_full_capacity():
+    config = AgentConfig.from_plan_params({})
+    sample = sample_population(500_000, config, config.max_agents)
+
+    assert sample.agent_count == 1000
+    assert sample.sample_rate < 0.01
+    assert sample.capacity_factor == 1.0
+    assert not needs_volume_scaling("output_links.csv.gz", sample.capacity_factor)
+
+
+def test_explicit_sample_rate_scales_capacity():
+    config = AgentConfig.from_plan_params({"sampleRate": 0.1})
+    sample = sample_population(500_000, config, config.max_agents)
+
+    assert sample.capacity_factor == sample.sample_rate == 0.1
+    assert needs_volume_scaling("output_links.csv.gz", sample.capacity_factor)
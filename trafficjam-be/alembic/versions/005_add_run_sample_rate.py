@@ -0,0 +1,24 @@
+"""add sample_rate to runs
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "005"
+down_revision: Union[str, None] = "004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("runs", sa.Column("sample_rate", sa.Float(), nullable=False, server_default="1.0"))
+
+
+def downgrade() -> None:
+    op.drop_column("runs", "sample_rate")
@@ -4,16 +4,23 @@ import uuid
 from typing import Optional
 
 import nats.js.errors as jserrors
+from pydantic import ValidationError
 from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, UploadFile
 import fastapi.responses
 from sse_starlette import EventSourceResponse
 
 from adapters.simengine import SimulationEnginePort
+from agents.agent_creation import plan_population
 from agents.config import AgentConfig
-from agents.plans.population import generate_plans_xml, parse_buildings_and_bounds
+from agents.plans.cache import PlansCache
+from agents.plans.population import parse_buildings_and_bounds
+from agents.plans.projection import resolve_crs
+from config import Settings, get_settings
 from consumers import EventConsumer
 from db import RunRepository, RunStatus, ScenarioRepository
-from dependencies import get_run_repo, get_scenario_repo, get_sim_engine
+from dependencies import get_plans_cache, get_run_repo, get_scenario_repo, get_sim_engine
+from services.plan_files import prepare_plan_files
+from services.volume_scaling import needs_volume_scaling, scale_link_volumes
 
 router = APIRouter(prefix="/scenarios", tags=["runs"])
 logger = logging.getLogger(__name__)
@@ -41,6 +48,7 @@ async def list_runs(
             "iterations": r.iterations,
             "randomSeed": r.random_seed,
             "note": r.note,
+            "sampleRate": r.sample_rate,
             "createdAt": r.created_at.isoformat() if r.created_at else None,
         }
         for r in runs
@@ -96,6 +104,8 @@ async def start_run(
     run_repo: RunRepository = Depends(get_run_repo),
     scenario_repo: ScenarioRepository = Depends(get_scenario_repo),
     sim_engine: SimulationEnginePort = Depends(get_sim_engine),
+    plans_cache: PlansCache | None = Depends(get_plans_cache),
+    settings: Settings = Depends(get_settings),
 ):
     try:
         parsed_scenario_id = uuid.UUID(scenario_id)
@@ -113,16 +123,37 @@ async def start_run(
         raise HTTPException(
             400, "Buildings and bounds are required for plan generation."
         )
+    if not networkFile.filename:
+        raise HTTPException(400, "Network file is required")
+    if not networkFile.content_type:
+        raise HTTPException(400, "Network file content type is required")
 
     scenario = await scenario_repo.get_scenario(parsed_scenario_id)
     plan_params = (scenario.plan_params or {}) if scenario else {}
-    agent_config = AgentConfig.from_plan_params(plan_params)
-    max_agents = plan_params.get("maxAgents", 1000)
+    try:
+        agent_config = AgentConfig.from_plan_params(plan_params)
+    except ValidationError as e:
+        await run_repo.update_status(run.id, RunStatus.FAILED)
+        raise HTTPException(400, f"Invalid plan parameters: {e}")
+    max_agents = agent_config.max_agents
 
+    network_xml = await networkFile.read()
     try:
         buildings_list, bounds_dict = parse_buildings_and_bounds(buildings, bounds)
-        plans_xml = await asyncio.to_thread(
-            generate_plans_xml, bounds_dict, buildings_list, agent_config, max_agents
+        sample = plan_population(bounds_dict, agent_config, max_agents)
+        crs = resolve_crs(settings.plans_crs, bounds_dict)
+        plan_files = await asyncio.to_thread(
+            prepare_plan_files,
+            bounds_dict,
+            buildings_list,
+            agent_config,
+            crs,
+            network_xml,
+            plans_cache,
+            settings.plans_facilities,
+            settings.plans_snap_links,
+            settings.plans_precompute_routes,
+            randomSeed,
         )
     except Exception as e:
         logger.error(f"Failed to generate plans: {e}")
@@ -130,33 +161,37 @@ async def start_run(
         raise HTTPException(500, f"Plan generation failed: {e}")
 
     run_id = str(run.id)
-
-    if not networkFile.filename:
-        raise HTTPException(400, "Network file is required")
-    if not networkFile.content_type:
-        raise HTTPException(400, "Network file content type is required")
+    await run_repo.set_sample_rate(run.id, sample.capacity_factor)
 
     try:
         result = await sim_engine.start(
             scenario_id=scenario_id,
             run_id=run_id,
             network_filename=networkFile.filename,
-            network_file=await networkFile.read(),
+            network_file=network_xml,
             network_content_type=networkFile.content_type,
-            plans_xml=plans_xml,
+            plans_xml=plan_files.plans,
+            plans_filename=plan_files.plans_filename,
+            facilities_xml=plan_files.facilities,
             iterations=iterations,
             random_seed=randomSeed,
+            flow_capacity_factor=sample.capacity_factor,
+            storage_capacity_factor=sample.capacity_factor,
+            coordinate_system=crs,
         )
     except Exception as e:
         logger.error(f"SimEngine request failed: {e}")
         await run_repo.update_status(run.id, RunStatus.FAILED)
         raise HTTPException(500, f"Failed to start simulation in SimEngine: {e}")
+    finally:
+        plan_files.close()
 
     return {
         "scenario_id": scenario_id,
         "run_id": run_id,
         "simulation_id": result.simulation_id,
         "status": "RUNNING",
+        "sample_rate": sample.capacity_factor,
     }
 
 
@@ -194,7 +229,8 @@ async def stream_run_events(
     summary="Get simulation output file",
     description=(
         "Retrieves a simulation output file (CSV, JSON, YAML, etc.) from the NATS Object Store "
-        "for the given run. Responses are cached for 1 hour."
+        "for the given run. Link volumes of sampled runs are scaled back up to the full "
+        "population. Responses are cached for 1 hour."
     ),
     response_description="File contents with appropriate Content-Type",
 )
@@ -218,8 +254,13 @@ async def get_simwrapper_file(
     try:
         obj_store = await request.app.state.js.object_store(f"sim-outputs-{run_id}")
         obj = await obj_store.get(filename)
+        content = obj.data
+        if needs_volume_scaling(filename, run.sample_rate):
+            content = await asyncio.to_thread(
+                scale_link_volumes, content, filename, run.sample_rate
+            )
         return fastapi.responses.Response(
-            content=obj.data,
+            content=content,
             media_type=_content_type_for(filename),
             headers={
                 "Content-Disposition": f'inline; filename="{filename}"',
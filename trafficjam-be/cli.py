@@ -0,0 +1,161 @@
+"""Offline plan generation.
+
+Generates plans for a bounding box or buildings file without going through the
+HTTP `start_run` flow, e.g. for nightly precomputation of large populations:
+
+    python cli.py --bbox 51.85,-8.55,51.95,-8.38 --plan-params params.json \\
+        --out out/cork --workers 8 --sample-rate 0.1 --seed-cache
+"""
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+import httpx
+
+from agents.config import AgentConfig
+from agents.models import Building
+from agents.plans.bulk import generate_bulk
+from agents.plans.cache import PlansCache, plans_cache_key
+from agents.plans.projection import resolve_crs
+from config import get_settings
+
+logger = logging.getLogger("trafficjam.cli")
+
+# map-data-service level of detail with full geometry (its DETAIL_ZOOM)
+MAP_DATA_DETAIL_ZOOM = 15
+
+
+def _parse_bbox(value: str) -> dict[str, float]:
+    try:
+        south, west, north, east = (float(v) for v in value.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError("bbox must be south,west,north,east")
+    if south >= north or west >= east:
+        raise argparse.ArgumentTypeError("bbox must have south < north and west < east")
+    return {"south": south, "west": west, "north": north, "east": east}
+
+
+def _bounds_from_buildings(buildings: list[Building]) -> dict[str, float]:
+    lats = [b.position[0] for b in buildings]
+    lons = [b.position[1] for b in buildings]
+    return {"south": min(lats), "west": min(lons), "north": max(lats), "east": max(lons)}
+
+
+def _swap(coord: list[float]) -> tuple[float, float]:
+    return coord[1], coord[0]
+
+
+def fetch_buildings(map_data_url: str, bounds: dict[str, float]) -> list[Building]:
+    """Fetch buildings from map-data-service, converted to the `[lat, lon]`
+    layout the frontend submits to `start_run`."""
+    params = {
+        "min_lat": bounds["south"],
+        "min_lng": bounds["west"],
+        "max_lat": bounds["north"],
+        "max_lng": bounds["east"],
+        # Plans need buildings only, with full outlines regardless of bbox size
+        "layers": "buildings",
+        "lod": MAP_DATA_DETAIL_ZOOM,
+    }
+    response = httpx.get(f"{map_data_url}/network", params=params, timeout=300.0)
+    response.raise_for_status()
+    return [
+        Building(
+            id=str(b["id"]),
+            osm_id=b["id"],
+            position=_swap(b["position"]),
+            geometry=[_swap(c) for c in b["geometry"]] or [_swap(b["position"])],
+            type=b.get("type"),
+            tags=b.get("tags", {}),
+        )
+        for b in response.json()["buildings"]
+        if b.get("type")
+    ]
+
+
+def load_buildings(path: Path) -> list[Building]:
+    return [Building.model_validate(b) for b in json.loads(path.read_text())]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Generate MATSim plans, population and stats files offline."
+    )
+    parser.add_argument("--bbox", type=_parse_bbox, help="south,west,north,east in WGS 84")
+    parser.add_argument(
+        "--buildings",
+        type=Path,
+        help="JSON array of buildings in the start_run format; fetched from map-data-service when omitted",
+    )
+    parser.add_argument("--plan-params", type=Path, help="JSON file with scenario plan_params")
+    parser.add_argument("--out", type=Path, required=True, help="Output directory")
+    parser.add_argument("--workers", type=int, default=1, help="Parallel worker processes")
+    parser.add_argument("--sample-rate", type=float, help="Override plan_params.sampleRate")
+    parser.add_argument("--max-agents", type=int, help="Override plan_params.maxAgents")
+    parser.add_argument(
+        "--crs", help="Plan coordinate CRS, e.g. EPSG:2157 or auto (defaults to PLANS_CRS)"
+    )
+    parser.add_argument("--seed", type=int, help="Random seed (each worker uses seed + index)")
+    parser.add_argument(
+        "--seed-cache",
+        nargs="?",
+        const="",
+        metavar="DIR",
+        help="Store the plans in the plans cache (defaults to PLANS_CACHE_DIR)",
+    )
+    parser.add_argument("--map-data-url", help="map-data-service base URL (defaults to MAP_DATA_URL)")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    logging.basicConfig(level=logging.INFO)
+    args = build_parser().parse_args(argv)
+    settings = get_settings()
+
+    if args.buildings is None and args.bbox is None:
+        logger.error("Either --bbox or --buildings is required")
+        return 2
+
+    plan_params = json.loads(args.plan_params.read_text()) if args.plan_params else {}
+    if args.sample_rate is not None:
+        plan_params["sampleRate"] = args.sample_rate
+    if args.max_agents is not None:
+        plan_params["maxAgents"] = args.max_agents
+    agent_config = AgentConfig.from_plan_params(plan_params)
+
+    if args.buildings is not None:
+        buildings = load_buildings(args.buildings)
+    else:
+        buildings = fetch_buildings(args.map_data_url or settings.map_data_url, args.bbox)
+    if not buildings:
+        logger.error("No buildings found for plan generation")
+        return 1
+    bounds = args.bbox or _bounds_from_buildings(buildings)
+    crs = resolve_crs(args.crs or settings.plans_crs, bounds)
+
+    result = generate_bulk(
+        bounds,
+        buildings,
+        agent_config,
+        args.out,
+        workers=args.workers,
+        seed=args.seed,
+        crs=crs,
+    )
+
+    if args.seed_cache is not None:
+        cache_dir = args.seed_cache or settings.plans_cache_dir
+        if not cache_dir:
+            logger.error("--seed-cache needs a directory or PLANS_CACHE_DIR")
+            return 2
+        key = plans_cache_key(bounds, buildings, agent_config, crs, args.seed)
+        path = PlansCache(cache_dir).put(key, result.plans_path, metadata=result.stats)
+        logger.info(f"Seeded plans cache entry {key} at {path}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -51,6 +51,14 @@ class RunRepository:
             await session.refresh(run)
             return run
 
+    async def set_sample_rate(self, run_id: uuid.UUID, sample_rate: float) -> None:
+        async with self.session_factory() as session:
+            run = await session.get(Run, run_id)
+            if not run:
+                return
+            run.sample_rate = sample_rate
+            await session.commit()
+
     async def create_run(
         self,
         scenario_id: uuid.UUID,
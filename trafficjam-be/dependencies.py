@@ -1,6 +1,7 @@
 from fastapi import Depends
 
 from adapters.simengine import HttpSimEngineAdapter, SimulationEnginePort
+from agents.plans.cache import PlansCache
 from config import Settings, get_settings
 from db import RunRepository, ScenarioRepository, async_session_factory
 
@@ -15,3 +16,7 @@ def get_scenario_repo() -> ScenarioRepository:
 
 def get_sim_engine(settings: Settings = Depends(get_settings)) -> SimulationEnginePort:
     return HttpSimEngineAdapter(settings.simengine_url)
+
+
+def get_plans_cache(settings: Settings = Depends(get_settings)) -> PlansCache | None:
+    return PlansCache(settings.plans_cache_dir) if settings.plans_cache_dir else None
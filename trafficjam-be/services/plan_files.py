@@ -0,0 +1,82 @@
+import logging
+from dataclasses import dataclass
+from typing import IO
+
+from agents.config import AgentConfig
+from agents.models import Building
+from agents.plans.cache import PlansCache, plans_cache_key
+from agents.plans.facilities import FacilityRegistry
+from agents.plans.network import LinkSnapper, parse_network
+from agents.plans.population import spool_facilities_xml, spool_plans_xml
+from agents.plans.routing import FreeFlowRouter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PlanFiles:
+    """Files uploaded to the simulation engine alongside the network."""
+
+    plans: IO[bytes]
+    plans_filename: str = "plans.xml"
+    facilities: IO[bytes] | None = None
+
+    def close(self) -> None:
+        self.plans.close()
+        if self.facilities is not None:
+            self.facilities.close()
+
+
+def prepare_plan_files(
+    bounds: dict,
+    buildings: list[Building],
+    agent_config: AgentConfig,
+    crs: str,
+    network_xml: bytes,
+    plans_cache: PlansCache | None = None,
+    use_facilities: bool = False,
+    snap_links: bool = False,
+    precompute_routes: bool = False,
+    seed: int | None = None,
+) -> PlanFiles:
+    """Generate (or fetch precomputed) plans for a run. Blocking; call from a
+    worker thread."""
+    max_agents = agent_config.max_agents
+
+    # Routes start and end on the snapped activity links
+    snap_links = snap_links or precompute_routes
+    if not (use_facilities or snap_links):
+        cached_plans = (
+            plans_cache.get(plans_cache_key(bounds, buildings, agent_config, crs, seed))
+            if plans_cache
+            else None
+        )
+        if cached_plans:
+            logger.info(f"Using precomputed plans from {cached_plans}")
+            return PlanFiles(open(cached_plans, "rb"), cached_plans.name)
+        return PlanFiles(
+            spool_plans_xml(bounds, buildings, agent_config, max_agents, crs)
+        )
+
+    # Cache entries hold plain plans only, so network-aware runs always generate.
+    # Building positions are snapped to car links in one batch and shared by
+    # the plans and the facilities file.
+    network = parse_network(network_xml)
+    links = LinkSnapper(network)
+    facilities = FacilityRegistry(buildings) if use_facilities else None
+    plans = spool_plans_xml(
+        bounds,
+        buildings,
+        agent_config,
+        max_agents,
+        crs,
+        facilities,
+        links if snap_links else None,
+        FreeFlowRouter(network) if precompute_routes else None,
+    )
+    if facilities is None:
+        return PlanFiles(plans)
+
+    facilities_xml = spool_facilities_xml(facilities, crs, links)
+    logger.info(f"Wrote {len(facilities)} facilities")
+    return PlanFiles(plans, facilities=facilities_xml)
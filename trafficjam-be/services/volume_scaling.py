@@ -0,0 +1,45 @@
+import csv
+import gzip
+import io
+
+LINK_VOLUME_FILES = ("output_links.csv", "output_links.csv.gz")
+VOLUME_COLUMN_PREFIX = "vol_"
+
+
+def needs_volume_scaling(filename: str, sample_rate: float | None) -> bool:
+    return (
+        sample_rate is not None
+        and 0 < sample_rate < 1
+        and filename.endswith(LINK_VOLUME_FILES)
+    )
+
+
+def scale_link_volumes(data: bytes, filename: str, sample_rate: float) -> bytes:
+    """Scale the `vol_*` columns of a MATSim links CSV from a sampled run up to
+    full-population volumes."""
+    compressed = filename.endswith(".gz")
+    text = (gzip.decompress(data) if compressed else data).decode("utf-8")
+    header = text.split("\n", 1)[0]
+    delimiter = ";" if ";" in header else ","
+
+    reader = csv.reader(io.StringIO(text), delimiter=delimiter)
+    out = io.StringIO()
+    writer = csv.writer(out, delimiter=delimiter, lineterminator="\n")
+
+    columns = next(reader, None)
+    if columns is None:
+        return data
+    writer.writerow(columns)
+    volume_idx = [i for i, c in enumerate(columns) if c.startswith(VOLUME_COLUMN_PREFIX)]
+
+    for row in reader:
+        for i in volume_idx:
+            if i < len(row) and row[i]:
+                try:
+                    row[i] = f"{float(row[i]) / sample_rate:.1f}"
+                except ValueError:
+                    pass
+        writer.writerow(row)
+
+    scaled = out.getvalue().encode("utf-8")
+    return gzip.compress(scaled) if compressed else scaled
@@ -0,0 +1,30 @@
+import gzip
+
+from services.volume_scaling import needs_volume_scaling, scale_link_volumes
+
+LINKS_CSV = (
+    "link;from_node;to_node;length;vol_car;geometry\n"
+    "1;10;11;120.5;3.0;LINESTRING(0 0, 1 1)\n"
+    "2;11;12;80.0;;LINESTRING(1 1, 2 2)\n"
+)
+
+
+def test_needs_volume_scaling_only_for_sampled_link_files():
+    assert needs_volume_scaling("output_links.csv.gz", 0.1)
+    assert not needs_volume_scaling("output_links.csv.gz", 1.0)
+    assert not needs_volume_scaling("output_links.csv.gz", None)
+    assert not needs_volume_scaling("output_trips.csv.gz", 0.1)
+
+
+def test_scale_plain_csv_scales_only_volume_columns():
+    scaled = scale_link_volumes(LINKS_CSV.encode(), "output_links.csv", 0.1).decode()
+    rows = [line.split(";") for line in scaled.strip().split("\n")]
+    assert rows[1][3] == "120.5"
+    assert rows[1][4] == "30.0"
+    assert rows[2][4] == ""
+
+
+def test_scale_gzipped_csv_round_trips_compression():
+    data = gzip.compress(LINKS_CSV.encode())
+    scaled = scale_link_volumes(data, "output_links.csv.gz", 0.25)
+    assert "12.0" in gzip.decompress(scaled).decode()
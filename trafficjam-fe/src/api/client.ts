@@ -18,6 +18,7 @@ import {
   decodeCreateRun,
   decodeEventStream,
 } from "./decoders";
+import { decodeNetworkBinary, NETWORK_BINARY_MEDIA_TYPE } from "./network-binary";
 import { computeLinksDiff, computeBuildingsDiff } from "./network-serializer";
 import type {
   ApiNetworkResponse,
@@ -34,7 +35,15 @@ import type { Network, LngLatBounds } from "../types";
 
 async function fetchNetwork(bounds: LngLatBounds): Promise<Network> {
   const url = `${resolveUrl("network")}?${buildNetworkQuery(bounds)}`;
-  const raw = await getJson<ApiNetworkResponse>(url);
+  const res = await fetch(url, {
+    headers: { Accept: `${NETWORK_BINARY_MEDIA_TYPE}, application/json` },
+  });
+  assertOk(res);
+  const raw: ApiNetworkResponse = res.headers
+    .get("Content-Type")
+    ?.startsWith(NETWORK_BINARY_MEDIA_TYPE)
+    ? decodeNetworkBinary(await res.arrayBuffer())
+    : await res.json();
   return mapNetworkResponse(raw);
 }
 
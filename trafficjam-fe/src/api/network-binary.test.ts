@@ -0,0 +1,119 @@
+import { describe, it, expect, vi, beforeEach } from "vitest";
+import { decodeNetworkBinary, NETWORK_BINARY_MEDIA_TYPE } from "./network-binary";
+import { api } from "./client";
+
+const mockFetch = vi.fn();
+globalThis.fetch = mockFetch;
+
+const ENCODED =
+  "VEpOQgEAAABAQg8AGQAAAA8AAABJAAAACwAAAAAAAABzdHJpbmdzLm9mZnNldHMAAAAAAAcA" +
+  "AAAOAAAAEgAAABkAAAAhAAAAJwAAACwAAAAvAAAAMgAAADQAAAAAAAAADAAAAEIAAAA0AAAA" +
+  "AAAAAHN0cmluZ3MuZGF0YQAAAABoaWdod2F5cHJpbWFyeW5hbWVTdHJhw59lYnVpbGRpbmdy" +
+  "ZXRhaWxyb3V0ZWJ1c3JlZjQyAAAAAAgAAABxAAAAAgAAAAAAAABub2Rlcy5pZAEAAAAAAAAA" +
+  "AAAAAAABAAAOAAAAaQAAAAQAAAAAAAAAbm9kZXMucG9zaXRpb24AAKA3oADgCB4DcC/8/0AN" +
+  "AwAWAAAASQAAAAIAAAAAAAAAbm9kZXMuY29ubmVjdGlvbl9jb3VudAAAAwAAAAEAAAAIAAAA" +
+  "cQAAAAEAAAAAAAAAbGlua3MuaWQCAAAAAAAAAA8AAABxAAAAAQAAAAAAAABsaW5rcy5mcm9t" +
+  "X25vZGUAAQAAAAAAAAANAAAAcQAAAAEAAAAAAAAAbGlua3MudG9fbm9kZQAAAAAAAAAAAQAA" +
+  "FgAAAEkAAAACAAAAAAAAAGxpbmtzLmdlb21ldHJ5X29mZnNldHMAAAAAAAACAAAADgAAAGkA" +
+  "AAAEAAAAAAAAAGxpbmtzLmdlb21ldHJ5AACgN6AA4AgeA3Av/P9ADQMAEQAAAEkAAAACAAAA" +
+  "AAAAAGxpbmtzLnRhZ19vZmZzZXRzAAAAAAAAAAAAAAACAAAACgAAAEkAAAAEAAAAAAAAAGxp" +
+  "bmtzLnRhZ3MAAAAAAAAAAAAAAQAAAAIAAAADAAAADAAAAHEAAAACAAAAAAAAAGJ1aWxkaW5n" +
+  "cy5pZAAAAAAGAAAAAAAAAAgAAAAAAAAAEgAAAGkAAAAEAAAAAAAAAGJ1aWxkaW5ncy5wb3Np" +
+  "dGlvbgAAAAAAAKA3oADgCB4DgOX5/8Dy/P8OAAAAaQAAAAIAAAAAAAAAYnVpbGRpbmdzLnR5" +
+  "cGUAAAUAAAD/////GgAAAEkAAAADAAAAAAAAAGJ1aWxkaW5ncy5nZW9tZXRyeV9vZmZzZXRz" +
+  "AAAAAAAAAAAAAAMAAAADAAAAAAAAABIAAABpAAAABgAAAAAAAABidWlsZGluZ3MuZ2VvbWV0" +
+  "cnkAAAAAAACgN6AA4AgeAwAAAACghgEAoIYBAAAAAAAVAAAASQAAAAMAAAAAAAAAYnVpbGRp" +
+  "bmdzLnRhZ19vZmZzZXRzAAAAAAAAAAEAAAABAAAAAAAAAA4AAABJAAAAAgAAAAAAAABidWls" +
+  "ZGluZ3MudGFncwAABAAAAAUAAAATAAAAcQAAAAEAAAAAAAAAdHJhbnNwb3J0X3JvdXRlcy5p" +
+  "ZAAAAAAABwAAAAAAAAAdAAAASQAAAAIAAAAAAAAAdHJhbnNwb3J0X3JvdXRlcy5saW5lX29m" +
+  "ZnNldHMAAAAAAAAAAgAAACEAAABJAAAAAwAAAAAAAAB0cmFuc3BvcnRfcm91dGVzLmdlb21l" +
+  "dHJ5X29mZnNldHMAAAAAAAAAAAAAAAIAAAAEAAAAAAAAABkAAABpAAAACAAAAAAAAAB0cmFu" +
+  "c3BvcnRfcm91dGVzLmdlb21ldHJ5AAAAAAAAAKA3oADgCB4DoIYBAAAAAAAAAAAAAAAAAKCG" +
+  "AQCghgEAHAAAAEkAAAACAAAAAAAAAHRyYW5zcG9ydF9yb3V0ZXMudGFnX29mZnNldHMAAAAA" +
+  "AAAAAAIAAAAVAAAASQAAAAQAAAAAAAAAdHJhbnNwb3J0X3JvdXRlcy50YWdzAAAABgAAAAcA" +
+  "AAAIAAAACQAAAA==";
+
+function encodedBuffer(): ArrayBuffer {
+  return Uint8Array.from(atob(ENCODED), (c) => c.charCodeAt(0)).buffer;
+}
+
+const bounds = {
+  getSouth: () => 52,
+  getNorth: () => 53,
+  getWest: () => 10,
+  getEast: () => 11,
+} as unknown as Parameters<typeof api.fetchNetwork>[0];
+
+beforeEach(() => {
+  mockFetch.mockReset();
+});
+
+describe("decodeNetworkBinary", () => {
+  it("decodes every layer", () => {
+    expect(decodeNetworkBinary(encodedBuffer())).toEqual({
+      nodes: [
+        { id: 1, position: [10.5, 52.3], connection_count: 3 },
+        { id: 2 ** 40, position: [10.25, 52.5], connection_count: 1 },
+      ],
+      links: [
+        {
+          id: 2,
+          from_node: 1,
+          to_node: 2 ** 40,
+          geometry: [[10.5, 52.3], [10.25, 52.5]],
+          tags: { highway: "primary", name: "Straße" },
+        },
+      ],
+      buildings: [
+        {
+          id: 6,
+          position: [10.5, 52.3],
+          geometry: [[10.5, 52.3], [10.5, 52.4], [10.6, 52.4]],
+          type: "retail",
+          tags: { building: "retail" },
+        },
+        { id: 8, position: [10.1, 52.1], geometry: [], type: null, tags: {} },
+      ],
+      transport_routes: [
+        {
+          id: 7,
+          geometry: [
+            [[10.5, 52.3], [10.6, 52.3]],
+            [[10.6, 52.3], [10.7, 52.4]],
+          ],
+          tags: { route: "bus", ref: "42" },
+        },
+      ],
+    });
+  });
+
+  it("rejects other payloads", () => {
+    expect(() => decodeNetworkBinary(new ArrayBuffer(16))).toThrow(
+      "Not a version 1 binary network",
+    );
+  });
+});
+
+describe("api.fetchNetwork with the binary format", () => {
+  it("asks for the binary format", async () => {
+    mockFetch.mockResolvedValueOnce(
+      new Response(encodedBuffer(), { headers: { "Content-Type": NETWORK_BINARY_MEDIA_TYPE } }),
+    );
+
+    await api.fetchNetwork(bounds);
+
+    const init = mockFetch.mock.calls[0][1] as RequestInit;
+    expect((init.headers as Record<string, string>).Accept).toContain(NETWORK_BINARY_MEDIA_TYPE);
+  });
+
+  it("maps a binary response", async () => {
+    mockFetch.mockResolvedValueOnce(
+      new Response(encodedBuffer(), { headers: { "Content-Type": NETWORK_BINARY_MEDIA_TYPE } }),
+    );
+
+    const network = await api.fetchNetwork(bounds);
+
+    expect(network.nodes.get("1")).toEqual({ id: "1", position: [52.3, 10.5], connectionCount: 3 });
+    expect(network.links.get("2")?.tags.name).toBe("Straße");
+  });
+});
@@ -0,0 +1,166 @@
+import type { ApiNetworkResponse } from "./raw-types"
+
+export const NETWORK_BINARY_MEDIA_TYPE = "application/vnd.trafficjam.network"
+
+const MAGIC = "TJNB"
+const VERSION = 1
+const HEADER_SIZE = 16
+const COLUMN_HEADER_SIZE = 16
+
+type Column = BigInt64Array | Int32Array | Uint32Array | Uint8Array
+type Columns = Map<string, Column>
+type Point = [number, number]
+
+interface ColumnType {
+  new (buffer: ArrayBuffer, offset: number, length: number): Column
+  BYTES_PER_ELEMENT: number
+}
+
+const ARRAYS: Record<string, ColumnType> = {
+  q: BigInt64Array,
+  i: Int32Array,
+  I: Uint32Array,
+  B: Uint8Array,
+}
+
+function pad(n: number): number {
+  return (8 - (n % 8)) % 8
+}
+
+function readColumns(buffer: ArrayBuffer): { scale: number; columns: Columns } {
+  const view = new DataView(buffer)
+  const magic = new TextDecoder().decode(new Uint8Array(buffer, 0, 4))
+  if (magic !== MAGIC || view.getUint32(4, true) !== VERSION) {
+    throw new Error("Not a version 1 binary network")
+  }
+  const scale = view.getUint32(8, true)
+  const count = view.getUint32(12, true)
+  const columns: Columns = new Map()
+  let offset = HEADER_SIZE
+  for (let c = 0; c < count; c++) {
+    const nameLength = view.getUint32(offset, true)
+    const dtype = String.fromCharCode(view.getUint8(offset + 4))
+    const length = view.getUint32(offset + 8, true)
+    offset += COLUMN_HEADER_SIZE
+    const name = new TextDecoder().decode(
+      new Uint8Array(buffer, offset, nameLength),
+    )
+    offset += nameLength + pad(nameLength)
+    const Type = ARRAYS[dtype]
+    if (!Type) throw new Error(`Unknown column type ${dtype}`)
+    columns.set(name, new Type(buffer, offset, length))
+    const size = length * Type.BYTES_PER_ELEMENT
+    offset += size + pad(size)
+  }
+  return { scale, columns }
+}
+
+function column(columns: Columns, name: string): Column {
+  const values = columns.get(name)
+  if (!values) throw new Error(`Missing column ${name}`)
+  return values
+}
+
+function numbers(columns: Columns, name: string): number[] {
+  return Array.from(column(columns, name), Number)
+}
+
+function readStrings(columns: Columns): string[] {
+  const offsets = numbers(columns, "strings.offsets")
+  const data = column(columns, "strings.data") as Uint8Array
+  const decoder = new TextDecoder()
+  return offsets
+    .slice(0, -1)
+    .map((start, i) => decoder.decode(data.subarray(start, offsets[i + 1])))
+}
+
+function points(columns: Columns, name: string, scale: number): Point[] {
+  const values = column(columns, name)
+  const result: Point[] = []
+  let x = 0
+  let y = 0
+  for (let i = 0; i < values.length; i += 2) {
+    x += Number(values[i])
+    y += Number(values[i + 1])
+    result.push([x / scale, y / scale])
+  }
+  return result
+}
+
+function split<T>(items: T[], offsets: number[]): T[][] {
+  return offsets.slice(0, -1).map((start, i) => items.slice(start, offsets[i + 1]))
+}
+
+function lines(columns: Columns, layer: string, scale: number): Point[][] {
+  return split(
+    points(columns, `${layer}.geometry`, scale),
+    numbers(columns, `${layer}.geometry_offsets`),
+  )
+}
+
+function tags(
+  columns: Columns,
+  layer: string,
+  strings: string[],
+): Record<string, string>[] {
+  const pairs = numbers(columns, `${layer}.tags`)
+  const offsets = numbers(columns, `${layer}.tag_offsets`)
+  return offsets.slice(0, -1).map((start, row) => {
+    const result: Record<string, string> = {}
+    for (let i = start; i < offsets[row + 1]; i++) {
+      result[strings[pairs[2 * i]]] = strings[pairs[2 * i + 1]]
+    }
+    return result
+  })
+}
+
+export function decodeNetworkBinary(buffer: ArrayBuffer): ApiNetworkResponse {
+  const { scale, columns } = readColumns(buffer)
+  const strings = readStrings(columns)
+  const ids = (layer: string) => numbers(columns, `${layer}.id`)
+
+  const nodePositions = points(columns, "nodes.position", scale)
+  const connections = numbers(columns, "nodes.connection_count")
+  const nodes = ids("nodes").map((id, i) => ({
+    id,
+    position: nodePositions[i],
+    connection_count: connections[i],
+  }))
+
+  const fromNodes = numbers(columns, "links.from_node")
+  const toNodes = numbers(columns, "links.to_node")
+  const linkLines = lines(columns, "links", scale)
+  const linkTags = tags(columns, "links", strings)
+  const links = ids("links").map((id, i) => ({
+    id,
+    from_node: fromNodes[i],
+    to_node: toNodes[i],
+    geometry: linkLines[i],
+    tags: linkTags[i],
+  }))
+
+  const buildingPositions = points(columns, "buildings.position", scale)
+  const buildingTypes = numbers(columns, "buildings.type")
+  const buildingLines = lines(columns, "buildings", scale)
+  const buildingTags = tags(columns, "buildings", strings)
+  const buildings = ids("buildings").map((id, i) => ({
+    id,
+    position: buildingPositions[i],
+    geometry: buildingLines[i],
+    type: buildingTypes[i] >= 0 ? strings[buildingTypes[i]] : null,
+    tags: buildingTags[i],
+  }))
+
+  const routeLines = split(
+    lines(columns, "transport_routes", scale),
+    numbers(columns, "transport_routes.line_offsets"),
+  )
+  const routeTags = tags(columns, "transport_routes", strings)
+  const transport_routes = ids("transport_routes").map((id, i) => ({
+    id,
+    geometry: routeLines[i],
+    tags: routeTags[i],
+  }))
+
+  return { nodes, links, buildings, transport_routes }
+}
@@ -1,3 +1,5 @@
+import cities from "./cities.json";
+
 export interface CityConfig {
   id: string;
   name: string;
@@ -8,26 +10,16 @@ export interface CityConfig {
   populationDensity: number;
 }
 
-export const CORK: CityConfig = {
-  id: "cork",
-  name: "Cork",
-  center: [-8.47, 51.9],
-  zoom: 15,
-  bounds: { south: 51.85, west: -8.55, north: 51.95, east: -8.38 },
-  population: 224004,
-  populationDensity: 1200,
-};
+export const CITIES = cities as CityConfig[];
+
+function city(id: string): CityConfig {
+  const found = CITIES.find((c) => c.id === id);
+  if (!found) throw new Error(`Unknown city ${id}`);
+  return found;
+}
 
-export const DUBLIN: CityConfig = {
-  id: "dublin",
-  name: "Dublin",
-  center: [-6.26, 53.35],
-  zoom: 14,
-  bounds: { south: 53.28, west: -6.42, north: 53.42, east: -6.1 },
-  population: 592713,
-  populationDensity: 5150,
-};
+export const CORK = city("cork");
 
-export const CITIES: CityConfig[] = [CORK, DUBLIN];
+export const DUBLIN = city("dublin");
 
 export const DEFAULT_CITY = CORK;